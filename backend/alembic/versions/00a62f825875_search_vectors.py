@@ -0,0 +1,51 @@
+"""full-text search vectors
+
+Revision ID: 00a62f825875
+Revises: 398f719d6572
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '00a62f825875'
+down_revision: Union[str, Sequence[str], None] = '398f719d6572'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Generated tsvector per table. The 'simple' configuration only lowercases and
+# splits on non-word characters, so Hangul words are kept intact; queries use
+# prefix matching to see through particles (바다 matches 바다에서).
+SEARCH_VECTORS = [
+    ('videos',
+     "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+     "setweight(to_tsvector('simple', coalesce(user_notes, '')), 'B') || "
+     "setweight(to_tsvector('simple', coalesce(summary, '')), 'C')"),
+    ('scenes',
+     "to_tsvector('simple', coalesce(user_notes, ''))"),
+    ('images',
+     "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+     "setweight(to_tsvector('simple', coalesce(user_notes, '')), 'B') || "
+     "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, expression in SEARCH_VECTORS:
+        op.add_column(table, sa.Column(
+            'search_vector', postgresql.TSVECTOR(), sa.Computed(expression, persisted=True)
+        ))
+        op.create_index(f'ix_{table}_search_vector', table, ['search_vector'], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, _ in SEARCH_VECTORS:
+        op.drop_index(f'ix_{table}_search_vector', table_name=table)
+        op.drop_column(table, 'search_vector')
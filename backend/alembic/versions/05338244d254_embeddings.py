@@ -0,0 +1,36 @@
+"""scene and image embeddings
+
+Revision ID: 05338244d254
+Revises: 00a62f825875
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '05338244d254'
+down_revision: Union[str, Sequence[str], None] = '00a62f825875'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('scenes', 'images'):
+        op.add_column(table, sa.Column('embedding', sa.LargeBinary(), nullable=True))
+        op.add_column(table, sa.Column('embedding_model', sa.String(length=100), nullable=True))
+        op.add_column(table, sa.Column('embedded_at', sa.DateTime(), nullable=True))
+        op.create_index(op.f(f'ix_{table}_embedded_at'), table, ['embedded_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('scenes', 'images'):
+        op.drop_index(op.f(f'ix_{table}_embedded_at'), table_name=table)
+        op.drop_column(table, 'embedded_at')
+        op.drop_column(table, 'embedding_model')
+        op.drop_column(table, 'embedding')
@@ -0,0 +1,29 @@
+"""created_at, id indexes for keyset pagination
+
+Revision ID: 0a528af3c35d
+Revises: 0a6dbb7b22b4
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a528af3c35d'
+down_revision: Union[str, Sequence[str], None] = '0a6dbb7b22b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('videos', 'scenes', 'images'):
+        op.create_index(f'ix_{table}_created_at_id', table, ['created_at', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('videos', 'scenes', 'images'):
+        op.drop_index(f'ix_{table}_created_at_id', table_name=table)
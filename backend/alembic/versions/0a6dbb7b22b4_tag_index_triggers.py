@@ -0,0 +1,68 @@
+"""tag index change notifications
+
+Revision ID: 0a6dbb7b22b4
+Revises: 5a290ba1da2d
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a6dbb7b22b4'
+down_revision: Union[str, Sequence[str], None] = '5a290ba1da2d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, id column announced, search target)
+TABLES = [
+    ('videos', 'id', 'videos'),
+    ('scenes', 'id', 'scenes'),
+    ('images', 'id', 'images'),
+    ('video_tags', 'video_id', 'videos'),
+    ('scene_tags', 'scene_id', 'scenes'),
+    ('image_tags', 'image_id', 'images'),
+]
+
+# Announces inserted/deleted rows on the tag_index channel for the in-process
+# tag bitmap index. Notifications are delivered when the transaction commits.
+TRIGGER_FUNCTION = """
+    CREATE OR REPLACE FUNCTION tag_index_notify() RETURNS trigger AS $$
+    DECLARE
+        row_data jsonb;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            row_data := to_jsonb(OLD);
+        ELSE
+            row_data := to_jsonb(NEW);
+        END IF;
+        PERFORM pg_notify('tag_index', json_build_object(
+            't', TG_ARGV[0],
+            'op', lower(TG_OP),
+            'id', row_data ->> TG_ARGV[1],
+            'tag', row_data ->> 'tag_id'
+        )::text);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(TRIGGER_FUNCTION)
+    for table, owner, target in TABLES:
+        op.execute(f"""
+            CREATE TRIGGER {table}_tag_index
+            AFTER INSERT OR DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION tag_index_notify('{target}', '{owner}')
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, _, _ in TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_tag_index ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS tag_index_notify()")
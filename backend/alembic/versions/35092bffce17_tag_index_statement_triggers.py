@@ -0,0 +1,110 @@
+"""statement-level tag index notifications
+
+Revision ID: 35092bffce17
+Revises: a759e0fe26d4
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '35092bffce17'
+down_revision: Union[str, Sequence[str], None] = 'a759e0fe26d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, id column announced, search target)
+TABLES = [
+    ('videos', 'id', 'videos'),
+    ('scenes', 'id', 'scenes'),
+    ('images', 'id', 'images'),
+    ('video_tags', 'video_id', 'videos'),
+    ('scene_tags', 'scene_id', 'scenes'),
+    ('image_tags', 'image_id', 'images'),
+]
+
+# Rows per notification; keeps payloads well under the 8000 byte NOTIFY limit
+ROWS_PER_NOTIFY = 80
+
+# One notification per ROWS_PER_NOTIFY rows a statement inserted or deleted,
+# instead of one per row: {"t": target, "op": "insert"|"delete", "ids": [...],
+# "tags": [...] (association tables only, parallel to ids)}.
+# EXECUTE lets one function read the owner and tag columns named by the
+# trigger arguments from the transition table.
+STATEMENT_FUNCTION = f"""
+    CREATE OR REPLACE FUNCTION tag_index_notify_rows() RETURNS trigger AS $$
+    DECLARE
+        payload text;
+    BEGIN
+        FOR payload IN EXECUTE format(
+            'SELECT json_build_object(''t'', %L, ''op'', %L, ''ids'', json_agg(%I)%s)::text
+             FROM (SELECT *, (row_number() OVER () - 1) / {ROWS_PER_NOTIFY} AS chunk FROM changed) c
+             GROUP BY chunk',
+            TG_ARGV[0], lower(TG_OP), TG_ARGV[1],
+            CASE WHEN TG_ARGV[2] <> '' THEN format(', ''tags'', json_agg(%I)', TG_ARGV[2]) ELSE '' END
+        ) LOOP
+            PERFORM pg_notify('tag_index', payload);
+        END LOOP;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+# Per-row function of migration 0a6dbb7b22b4, restored on downgrade
+ROW_FUNCTION = """
+    CREATE OR REPLACE FUNCTION tag_index_notify() RETURNS trigger AS $$
+    DECLARE
+        row_data jsonb;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            row_data := to_jsonb(OLD);
+        ELSE
+            row_data := to_jsonb(NEW);
+        END IF;
+        PERFORM pg_notify('tag_index', json_build_object(
+            't', TG_ARGV[0],
+            'op', lower(TG_OP),
+            'id', row_data ->> TG_ARGV[1],
+            'tag', row_data ->> 'tag_id'
+        )::text);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, _, _ in TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_tag_index ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS tag_index_notify()")
+
+    op.execute(STATEMENT_FUNCTION)
+    for table, owner, target in TABLES:
+        tag = 'tag_id' if table.endswith('_tags') else ''
+        for event, transition in (('INSERT', 'NEW'), ('DELETE', 'OLD')):
+            op.execute(f"""
+                CREATE TRIGGER {table}_tag_index_{event.lower()}
+                AFTER {event} ON {table}
+                REFERENCING {transition} TABLE AS changed
+                FOR EACH STATEMENT EXECUTE FUNCTION tag_index_notify_rows('{target}', '{owner}', '{tag}')
+            """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, _, _ in TABLES:
+        for event in ('insert', 'delete'):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_tag_index_{event} ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS tag_index_notify_rows()")
+
+    op.execute(ROW_FUNCTION)
+    for table, owner, target in TABLES:
+        op.execute(f"""
+            CREATE TRIGGER {table}_tag_index
+            AFTER INSERT OR DELETE ON {table}
+            FOR EACH ROW EXECUTE FUNCTION tag_index_notify('{target}', '{owner}')
+        """)
@@ -0,0 +1,89 @@
+"""tag usage counters
+
+Revision ID: 398f719d6572
+Revises: e0cbba18f017
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '398f719d6572'
+down_revision: Union[str, Sequence[str], None] = 'e0cbba18f017'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (counter column on tags, tag association table)
+TABLES = [
+    ('video_count', 'video_tags'),
+    ('scene_count', 'scene_tags'),
+    ('image_count', 'image_tags'),
+]
+
+# Backfill; the app runs the same recount periodically (reconcile_tag_usage)
+RECONCILE = """
+    UPDATE tags t SET
+        video_count = (SELECT count(*) FROM video_tags WHERE tag_id = t.id),
+        scene_count = (SELECT count(*) FROM scene_tags WHERE tag_id = t.id),
+        image_count = (SELECT count(*) FROM image_tags WHERE tag_id = t.id)
+"""
+
+# Statement-level triggers adjust the counters by the number of association
+# rows each statement inserted or deleted per tag. Tag rows are locked in id
+# order first so concurrent statements touching the same tags cannot deadlock.
+USAGE_FUNCTION = """
+    CREATE OR REPLACE FUNCTION tag_usage_apply() RETURNS trigger AS $$
+    BEGIN
+        PERFORM 1 FROM tags WHERE id IN (SELECT tag_id FROM changed) ORDER BY id FOR NO KEY UPDATE;
+        EXECUTE format(
+            'UPDATE tags t SET %1$I = t.%1$I + %2$s * c.n
+             FROM (SELECT tag_id, count(*) AS n FROM changed GROUP BY tag_id) c
+             WHERE t.id = c.tag_id',
+            TG_ARGV[0], TG_ARGV[1]::int
+        );
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for column, _ in TABLES:
+        op.add_column('tags', sa.Column(column, sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('tags', sa.Column(
+        'usage_count', sa.Integer(), sa.Computed('video_count + scene_count + image_count', persisted=True)
+    ))
+    op.execute(RECONCILE)
+    op.create_index('ix_tags_usage_count_name', 'tags', [sa.text('usage_count DESC'), 'name'])
+
+    op.execute(USAGE_FUNCTION)
+    for column, association in TABLES:
+        op.execute(f"""
+            CREATE TRIGGER {association}_tag_usage_insert
+            AFTER INSERT ON {association}
+            REFERENCING NEW TABLE AS changed
+            FOR EACH STATEMENT EXECUTE FUNCTION tag_usage_apply('{column}', '1')
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {association}_tag_usage_delete
+            AFTER DELETE ON {association}
+            REFERENCING OLD TABLE AS changed
+            FOR EACH STATEMENT EXECUTE FUNCTION tag_usage_apply('{column}', '-1')
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for _, association in TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {association}_tag_usage_insert ON {association}")
+        op.execute(f"DROP TRIGGER IF EXISTS {association}_tag_usage_delete ON {association}")
+    op.execute("DROP FUNCTION IF EXISTS tag_usage_apply()")
+    op.drop_index('ix_tags_usage_count_name', table_name='tags')
+    op.drop_column('tags', 'usage_count')
+    for column, _ in TABLES:
+        op.drop_column('tags', column)
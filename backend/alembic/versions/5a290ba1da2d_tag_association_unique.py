@@ -0,0 +1,36 @@
+"""unique tag associations
+
+Revision ID: 5a290ba1da2d
+Revises: 5eafa94639ee
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a290ba1da2d'
+down_revision: Union[str, Sequence[str], None] = '5eafa94639ee'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Remove duplicate associations first, preferring user-defined (confidence=1.0) rows
+    for table, owner in (('video_tags', 'video_id'), ('scene_tags', 'scene_id'), ('image_tags', 'image_id')):
+        op.execute(f"""
+            DELETE FROM {table} a USING {table} b
+            WHERE a.{owner} = b.{owner}
+              AND a.tag_id = b.tag_id
+              AND (coalesce(b.confidence = 1.0, false), b.ctid) > (coalesce(a.confidence = 1.0, false), a.ctid)
+        """)
+        op.create_unique_constraint(f'uq_{table}_{owner}_tag_id', table, [owner, 'tag_id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, owner in (('video_tags', 'video_id'), ('scene_tags', 'scene_id'), ('image_tags', 'image_id')):
+        op.drop_constraint(f'uq_{table}_{owner}_tag_id', table, type_='unique')
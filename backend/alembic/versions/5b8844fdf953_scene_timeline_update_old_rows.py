@@ -0,0 +1,106 @@
+"""scene timeline update notifications cover old rows and skip unrelated columns
+
+Revision ID: 5b8844fdf953
+Revises: cf618326288e
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8844fdf953'
+down_revision: Union[str, Sequence[str], None] = 'cf618326288e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Update triggers now also see the old rows, so a scene (or scene tag) moved
+# to another video announces both videos. Updates that leave every column of
+# the timeline unchanged (embedding, phash or tag_ids backfills) announce
+# nothing. Transition tables cannot be combined with UPDATE OF column lists,
+# hence the comparison inside the function.
+TIMELINE_FUNCTION = """
+    CREATE OR REPLACE FUNCTION scene_timeline_notify() RETURNS trigger AS $$
+    DECLARE
+        changed_video_id uuid;
+    BEGIN
+        IF TG_OP = 'UPDATE' AND TG_TABLE_NAME = 'scenes' THEN
+            FOR changed_video_id IN
+                SELECT DISTINCT unnest(ARRAY[o.video_id, c.video_id])
+                FROM old_rows o JOIN changed c ON c.id = o.id
+                WHERE (o.video_id, o.start_time, o.end_time, o.thumbnail_path, o.clip_path, o.user_notes)
+                    IS DISTINCT FROM (c.video_id, c.start_time, c.end_time, c.thumbnail_path, c.clip_path, c.user_notes)
+            LOOP
+                PERFORM pg_notify('scene_timeline', json_build_object('video_id', changed_video_id)::text);
+            END LOOP;
+        ELSIF TG_OP = 'UPDATE' THEN
+            FOR changed_video_id IN
+                SELECT DISTINCT s.video_id
+                FROM old_rows o JOIN changed c ON c.id = o.id
+                JOIN scenes s ON s.id IN (o.scene_id, c.scene_id)
+                WHERE (o.scene_id, o.tag_id, o.confidence, o.source)
+                    IS DISTINCT FROM (c.scene_id, c.tag_id, c.confidence, c.source)
+            LOOP
+                PERFORM pg_notify('scene_timeline', json_build_object('video_id', changed_video_id)::text);
+            END LOOP;
+        ELSIF TG_TABLE_NAME = 'scenes' THEN
+            FOR changed_video_id IN SELECT DISTINCT video_id FROM changed LOOP
+                PERFORM pg_notify('scene_timeline', json_build_object('video_id', changed_video_id)::text);
+            END LOOP;
+        ELSE
+            FOR changed_video_id IN
+                SELECT DISTINCT s.video_id FROM changed c JOIN scenes s ON s.id = c.scene_id
+            LOOP
+                PERFORM pg_notify('scene_timeline', json_build_object('video_id', changed_video_id)::text);
+            END LOOP;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+PREVIOUS_TIMELINE_FUNCTION = """
+    CREATE OR REPLACE FUNCTION scene_timeline_notify() RETURNS trigger AS $$
+    DECLARE
+        changed_video_id uuid;
+    BEGIN
+        IF TG_TABLE_NAME = 'scenes' THEN
+            FOR changed_video_id IN SELECT DISTINCT video_id FROM changed LOOP
+                PERFORM pg_notify('scene_timeline', json_build_object('video_id', changed_video_id)::text);
+            END LOOP;
+        ELSE
+            FOR changed_video_id IN
+                SELECT DISTINCT s.video_id FROM changed c JOIN scenes s ON s.id = c.scene_id
+            LOOP
+                PERFORM pg_notify('scene_timeline', json_build_object('video_id', changed_video_id)::text);
+            END LOOP;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+
+def _create_update_triggers(transitions: str) -> None:
+    for table in ('scenes', 'scene_tags'):
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_timeline_update ON {table}")
+        op.execute(f"""
+            CREATE TRIGGER {table}_timeline_update
+            AFTER UPDATE ON {table}
+            REFERENCING {transitions}
+            FOR EACH STATEMENT EXECUTE FUNCTION scene_timeline_notify()
+        """)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(TIMELINE_FUNCTION)
+    _create_update_triggers('OLD TABLE AS old_rows NEW TABLE AS changed')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(PREVIOUS_TIMELINE_FUNCTION)
+    _create_update_triggers('NEW TABLE AS changed')
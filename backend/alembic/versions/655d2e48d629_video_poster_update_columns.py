@@ -0,0 +1,98 @@
+"""video poster triggers on poster columns only
+
+Revision ID: 655d2e48d629
+Revises: c9c221b93465
+Create Date: 2026-10-20 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '655d2e48d629'
+down_revision: Union[str, Sequence[str], None] = 'c9c221b93465'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Scene columns videos.poster_path depends on. Other scene updates (tag_ids,
+# notes, embeddings) no longer touch, or lock, the video row.
+POSTER_COLUMNS = ['video_id', 'start_time', 'thumbnail_path']
+
+# Recomputes the poster of the given videos, writing only those that changed
+SYNC_FUNCTION = """
+    CREATE OR REPLACE FUNCTION video_poster_sync(video_ids uuid[]) RETURNS void AS $$
+        UPDATE videos v SET poster_path = p.poster_path
+        FROM (
+            SELECT ids.id, (
+                SELECT s.thumbnail_path FROM scenes s WHERE s.video_id = ids.id ORDER BY s.start_time LIMIT 1
+            ) AS poster_path
+            FROM (SELECT DISTINCT id FROM unnest(video_ids) AS u(id)) ids
+        ) p
+        WHERE v.id = p.id AND v.poster_path IS DISTINCT FROM p.poster_path
+    $$ LANGUAGE sql
+"""
+
+# Used by the INSERT and DELETE statement triggers of migration 878503e7956a
+STATEMENT_FUNCTION = """
+    CREATE OR REPLACE FUNCTION video_poster_refresh() RETURNS trigger AS $$
+    BEGIN
+        PERFORM video_poster_sync(ARRAY(SELECT DISTINCT video_id FROM changed));
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+# UPDATE triggers with a column list cannot have transition tables, so the
+# update trigger is row-level, limited by WHEN to rows whose poster columns
+# changed. A scene moved between videos refreshes both.
+ROW_FUNCTION = """
+    CREATE OR REPLACE FUNCTION video_poster_refresh_row() RETURNS trigger AS $$
+    BEGIN
+        PERFORM video_poster_sync(ARRAY[OLD.video_id, NEW.video_id]);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+OLD_STATEMENT_FUNCTION = """
+    CREATE OR REPLACE FUNCTION video_poster_refresh() RETURNS trigger AS $$
+    BEGIN
+        UPDATE videos v SET poster_path = (
+            SELECT s.thumbnail_path FROM scenes s WHERE s.video_id = v.id ORDER BY s.start_time LIMIT 1
+        )
+        WHERE v.id IN (SELECT DISTINCT video_id FROM changed);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS scenes_video_poster_update ON scenes")
+    op.execute(SYNC_FUNCTION)
+    op.execute(STATEMENT_FUNCTION)
+    op.execute(ROW_FUNCTION)
+    op.execute(f"""
+        CREATE TRIGGER scenes_video_poster_update
+        AFTER UPDATE OF {', '.join(POSTER_COLUMNS)} ON scenes
+        FOR EACH ROW
+        WHEN ({' OR '.join(f'OLD.{column} IS DISTINCT FROM NEW.{column}' for column in POSTER_COLUMNS)})
+        EXECUTE FUNCTION video_poster_refresh_row()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS scenes_video_poster_update ON scenes")
+    op.execute("DROP FUNCTION IF EXISTS video_poster_refresh_row()")
+    op.execute(OLD_STATEMENT_FUNCTION)
+    op.execute("DROP FUNCTION IF EXISTS video_poster_sync(uuid[])")
+    op.execute("""
+        CREATE TRIGGER scenes_video_poster_update
+        AFTER UPDATE ON scenes
+        REFERENCING NEW TABLE AS changed
+        FOR EACH STATEMENT EXECUTE FUNCTION video_poster_refresh()
+    """)
@@ -0,0 +1,62 @@
+"""stored video poster path
+
+Revision ID: 878503e7956a
+Revises: f4e246a79a2c
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '878503e7956a'
+down_revision: Union[str, Sequence[str], None] = 'f4e246a79a2c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# videos.poster_path is the thumbnail of the video's first scene. Statement
+# triggers recompute it for just the videos whose scenes a statement touched,
+# so listings no longer need a scene lookup per video.
+POSTER_FUNCTION = """
+    CREATE OR REPLACE FUNCTION video_poster_refresh() RETURNS trigger AS $$
+    BEGIN
+        UPDATE videos v SET poster_path = (
+            SELECT s.thumbnail_path FROM scenes s WHERE s.video_id = v.id ORDER BY s.start_time LIMIT 1
+        )
+        WHERE v.id IN (SELECT DISTINCT video_id FROM changed);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('videos', sa.Column('poster_path', sa.String(length=1000), nullable=True))
+    op.create_index('ix_scenes_video_id_start_time', 'scenes', ['video_id', 'start_time'])
+    op.execute("""
+        UPDATE videos v SET poster_path = (
+            SELECT s.thumbnail_path FROM scenes s WHERE s.video_id = v.id ORDER BY s.start_time LIMIT 1
+        )
+    """)
+
+    op.execute(POSTER_FUNCTION)
+    for event, table in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+        op.execute(f"""
+            CREATE TRIGGER scenes_video_poster_{event.lower()}
+            AFTER {event} ON scenes
+            REFERENCING {table} TABLE AS changed
+            FOR EACH STATEMENT EXECUTE FUNCTION video_poster_refresh()
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for event in ('insert', 'update', 'delete'):
+        op.execute(f"DROP TRIGGER IF EXISTS scenes_video_poster_{event} ON scenes")
+    op.execute("DROP FUNCTION IF EXISTS video_poster_refresh()")
+    op.drop_index('ix_scenes_video_id_start_time', table_name='scenes')
+    op.drop_column('videos', 'poster_path')
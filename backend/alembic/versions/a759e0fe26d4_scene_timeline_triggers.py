@@ -0,0 +1,63 @@
+"""scene timeline change notifications
+
+Revision ID: a759e0fe26d4
+Revises: 878503e7956a
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a759e0fe26d4'
+down_revision: Union[str, Sequence[str], None] = '878503e7956a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Announces the ids of videos whose scenes or scene tags a statement changed
+# on the scene_timeline channel, so workers drop their cached scene interval
+# index for those videos (app/services/scene_interval_index.py). Scene tags
+# deleted by a scene delete are covered by the scenes trigger.
+TIMELINE_FUNCTION = """
+    CREATE OR REPLACE FUNCTION scene_timeline_notify() RETURNS trigger AS $$
+    DECLARE
+        changed_video_id uuid;
+    BEGIN
+        IF TG_TABLE_NAME = 'scenes' THEN
+            FOR changed_video_id IN SELECT DISTINCT video_id FROM changed LOOP
+                PERFORM pg_notify('scene_timeline', json_build_object('video_id', changed_video_id)::text);
+            END LOOP;
+        ELSE
+            FOR changed_video_id IN
+                SELECT DISTINCT s.video_id FROM changed c JOIN scenes s ON s.id = c.scene_id
+            LOOP
+                PERFORM pg_notify('scene_timeline', json_build_object('video_id', changed_video_id)::text);
+            END LOOP;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(TIMELINE_FUNCTION)
+    for table in ('scenes', 'scene_tags'):
+        for event, transition in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+            op.execute(f"""
+                CREATE TRIGGER {table}_timeline_{event.lower()}
+                AFTER {event} ON {table}
+                REFERENCING {transition} TABLE AS changed
+                FOR EACH STATEMENT EXECUTE FUNCTION scene_timeline_notify()
+            """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('scenes', 'scene_tags'):
+        for event in ('insert', 'update', 'delete'):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_timeline_{event} ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS scene_timeline_notify()")
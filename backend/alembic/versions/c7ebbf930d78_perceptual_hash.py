@@ -0,0 +1,36 @@
+"""add perceptual hashes and image_tags.source
+
+Revision ID: c7ebbf930d78
+Revises: f4d53fd6e75b
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7ebbf930d78'
+down_revision: Union[str, Sequence[str], None] = 'f4d53fd6e75b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('images', sa.Column('phash', sa.BigInteger(), nullable=True))
+    op.create_index(op.f('ix_images_phash'), 'images', ['phash'], unique=False)
+    op.add_column('scenes', sa.Column('phash', sa.BigInteger(), nullable=True))
+    op.create_index(op.f('ix_scenes_phash'), 'scenes', ['phash'], unique=False)
+    op.add_column('image_tags', sa.Column('source', sa.String(length=50), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('image_tags', 'source')
+    op.drop_index(op.f('ix_scenes_phash'), table_name='scenes')
+    op.drop_column('scenes', 'phash')
+    op.drop_index(op.f('ix_images_phash'), table_name='images')
+    op.drop_column('images', 'phash')
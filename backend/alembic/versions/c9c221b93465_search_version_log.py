@@ -0,0 +1,159 @@
+"""statement-level search version log
+
+Revision ID: c9c221b93465
+Revises: dadc511a3024
+Create Date: 2026-10-20 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9c221b93465'
+down_revision: Union[str, Sequence[str], None] = 'dadc511a3024'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Columns that search results read; UPDATEs touching only others
+# (embeddings, hashes, posters, timestamps) leave cached searches valid
+COLUMNS = {
+    'videos': ['filename', 'title', 'summary', 'user_notes', 'duration', 'status', 'tag_ids'],
+    'scenes': ['video_id', 'start_time', 'end_time', 'thumbnail_path', 'user_notes', 'tag_ids'],
+    'images': ['filename', 'title', 'description', 'user_notes', 'thumbnail_path',
+               'width', 'height', 'status', 'tag_ids'],
+    'video_tags': ['video_id', 'tag_id'],
+    'scene_tags': ['scene_id', 'tag_id'],
+    'image_tags': ['image_id', 'tag_id'],
+    'tags': ['name'],
+}
+
+# Appends one row per writing transaction instead of updating the single
+# search_version row, so concurrent writers never queue on it; readers add
+# the log size to search_version.version. Statements that touch no rows
+# (e.g. ON CONFLICT DO NOTHING) are skipped via the transition table.
+LOG_FUNCTION = """
+    CREATE OR REPLACE FUNCTION search_version_append() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP <> 'UPDATE' THEN
+            IF NOT EXISTS (SELECT 1 FROM changed) THEN
+                RETURN NULL;
+            END IF;
+        END IF;
+        IF current_setting('search_version.bumped', true) = txid_current()::text THEN
+            RETURN NULL;
+        END IF;
+        PERFORM set_config('search_version.bumped', txid_current()::text, true);
+        INSERT INTO search_version_log DEFAULT VALUES;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+# The tag_ids triggers (migration e0cbba18f017) run an UPDATE of the media
+# table even when the association statement touched no rows, which would
+# fire the search_version UPDATE OF tag_ids trigger; the guarded versions skip it.
+ADD_FUNCTION = """
+    CREATE OR REPLACE FUNCTION tag_ids_add() RETURNS trigger AS $$
+    BEGIN
+        EXECUTE format(
+            'UPDATE %1$I e
+             SET tag_ids = ARRAY(SELECT DISTINCT t FROM unnest(e.tag_ids || c.tag_ids) t)
+             FROM (SELECT %2$I AS id, array_agg(tag_id) AS tag_ids FROM changed GROUP BY %2$I) c
+             WHERE e.id = c.id',
+            TG_ARGV[0], TG_ARGV[1]
+        );
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+REMOVE_FUNCTION = """
+    CREATE OR REPLACE FUNCTION tag_ids_remove() RETURNS trigger AS $$
+    BEGIN
+        EXECUTE format(
+            'UPDATE %1$I e
+             SET tag_ids = ARRAY(SELECT t FROM unnest(e.tag_ids) t WHERE t <> ALL(c.tag_ids))
+             FROM (SELECT %2$I AS id, array_agg(tag_id) AS tag_ids FROM changed GROUP BY %2$I) c
+             WHERE e.id = c.id',
+            TG_ARGV[0], TG_ARGV[1]
+        );
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+EMPTY_GUARD = """
+        IF NOT EXISTS (SELECT 1 FROM changed) THEN
+            RETURN NULL;
+        END IF;"""
+
+
+def guarded(function: str) -> str:
+    return function.replace("    BEGIN", "    BEGIN" + EMPTY_GUARD, 1)
+
+
+BUMP_FUNCTION = """
+    CREATE OR REPLACE FUNCTION search_version_bump() RETURNS trigger AS $$
+    BEGIN
+        IF current_setting('search_version.bumped', true) = txid_current()::text THEN
+            RETURN NULL;
+        END IF;
+        PERFORM set_config('search_version.bumped', txid_current()::text, true);
+        UPDATE search_version SET version = version + 1 WHERE id = 1;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'search_version_log',
+        sa.Column('id', sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    for table in COLUMNS:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_search_version ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS search_version_bump()")
+
+    op.execute(guarded(ADD_FUNCTION))
+    op.execute(guarded(REMOVE_FUNCTION))
+    op.execute(LOG_FUNCTION)
+    for table, columns in COLUMNS.items():
+        for event, transition in (('INSERT', 'NEW'), ('DELETE', 'OLD')):
+            op.execute(f"""
+                CREATE TRIGGER {table}_search_version_{event.lower()}
+                AFTER {event} ON {table}
+                REFERENCING {transition} TABLE AS changed
+                FOR EACH STATEMENT EXECUTE FUNCTION search_version_append()
+            """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_search_version_update
+            AFTER UPDATE OF {', '.join(columns)} ON {table}
+            FOR EACH STATEMENT EXECUTE FUNCTION search_version_append()
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in COLUMNS:
+        for event in ('insert', 'delete', 'update'):
+            op.execute(f"DROP TRIGGER IF EXISTS {table}_search_version_{event} ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS search_version_append()")
+    op.execute(ADD_FUNCTION)
+    op.execute(REMOVE_FUNCTION)
+    op.execute("UPDATE search_version SET version = version + (SELECT count(*) FROM search_version_log) WHERE id = 1")
+    op.drop_table('search_version_log')
+
+    op.execute(BUMP_FUNCTION)
+    for table in COLUMNS:
+        op.execute(f"""
+            CREATE CONSTRAINT TRIGGER {table}_search_version
+            AFTER INSERT OR UPDATE OR DELETE ON {table}
+            DEFERRABLE INITIALLY DEFERRED
+            FOR EACH ROW EXECUTE FUNCTION search_version_bump()
+        """)
@@ -0,0 +1,38 @@
+"""tag index triggers disabled unless the bitmap index is on
+
+Revision ID: cf618326288e
+Revises: 655d2e48d629
+Create Date: 2026-10-21 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cf618326288e'
+down_revision: Union[str, Sequence[str], None] = '655d2e48d629'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tables carrying the tag_index triggers of migration 35092bffce17
+TABLES = ['videos', 'scenes', 'images', 'video_tags', 'scene_tags', 'image_tags']
+
+# The triggers only feed the optional bitmap index (search_bitmap_index),
+# and every NOTIFY takes a global lock at commit. They start disabled; the
+# app enables them at startup when the index is on (TagBitmapIndex.sync_triggers).
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in TABLES:
+        for event in ('insert', 'delete'):
+            op.execute(f"ALTER TABLE {table} DISABLE TRIGGER {table}_tag_index_{event}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        for event in ('insert', 'delete'):
+            op.execute(f"ALTER TABLE {table} ENABLE TRIGGER {table}_tag_index_{event}")
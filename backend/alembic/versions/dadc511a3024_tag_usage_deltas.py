@@ -0,0 +1,90 @@
+"""append-only tag usage deltas
+
+Revision ID: dadc511a3024
+Revises: 35092bffce17
+Create Date: 2026-10-20 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'dadc511a3024'
+down_revision: Union[str, Sequence[str], None] = '35092bffce17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# The tag_usage triggers (migration 398f719d6572) now append one delta row per
+# tag per statement instead of updating the tag rows, which locked popular
+# tags until commit and serialized concurrent tagging. The app folds the
+# deltas into the counters periodically (fold_tag_usage).
+DELTA_FUNCTION = """
+    CREATE OR REPLACE FUNCTION tag_usage_apply() RETURNS trigger AS $$
+    BEGIN
+        EXECUTE format(
+            'INSERT INTO tag_usage_deltas (tag_id, %1$I)
+             SELECT tag_id, %2$s * count(*) FROM changed GROUP BY tag_id',
+            TG_ARGV[0], TG_ARGV[1]::int
+        );
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+# Folds pending deltas before the downgrade drops the table
+FOLD = """
+    WITH folded AS (
+        DELETE FROM tag_usage_deltas RETURNING tag_id, video_count, scene_count, image_count
+    )
+    UPDATE tags t SET
+        video_count = t.video_count + d.video_count,
+        scene_count = t.scene_count + d.scene_count,
+        image_count = t.image_count + d.image_count
+    FROM (
+        SELECT tag_id, sum(video_count) AS video_count, sum(scene_count) AS scene_count,
+               sum(image_count) AS image_count
+        FROM folded GROUP BY tag_id
+    ) d
+    WHERE t.id = d.tag_id
+"""
+
+# Function body of migration 398f719d6572, restored on downgrade
+COUNTER_FUNCTION = """
+    CREATE OR REPLACE FUNCTION tag_usage_apply() RETURNS trigger AS $$
+    BEGIN
+        PERFORM 1 FROM tags WHERE id IN (SELECT tag_id FROM changed) ORDER BY id FOR NO KEY UPDATE;
+        EXECUTE format(
+            'UPDATE tags t SET %1$I = t.%1$I + %2$s * c.n
+             FROM (SELECT tag_id, count(*) AS n FROM changed GROUP BY tag_id) c
+             WHERE t.id = c.tag_id',
+            TG_ARGV[0], TG_ARGV[1]::int
+        );
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'tag_usage_deltas',
+        sa.Column('id', sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column('tag_id', sa.UUID(), nullable=False),
+        sa.Column('video_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('scene_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('image_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    # Same trigger names and arguments; only the function body changes
+    op.execute(DELTA_FUNCTION)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(FOLD)
+    op.execute(COUNTER_FUNCTION)
+    op.drop_table('tag_usage_deltas')
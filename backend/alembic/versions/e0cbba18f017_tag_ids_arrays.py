@@ -0,0 +1,101 @@
+"""denormalized tag_ids arrays
+
+Revision ID: e0cbba18f017
+Revises: 0a528af3c35d
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e0cbba18f017'
+down_revision: Union[str, Sequence[str], None] = '0a528af3c35d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (entity table, owner column, tag association table)
+TABLES = [
+    ('videos', 'video_id', 'video_tags'),
+    ('scenes', 'scene_id', 'scene_tags'),
+    ('images', 'image_id', 'image_tags'),
+]
+
+# Statement-level triggers keep entity.tag_ids in step with the association
+# table. The arrays are edited incrementally rather than recomputed, so that
+# concurrent writers to the same entity (which re-evaluate SET against the
+# latest row version) cannot lose each other's tags.
+ADD_FUNCTION = """
+    CREATE OR REPLACE FUNCTION tag_ids_add() RETURNS trigger AS $$
+    BEGIN
+        EXECUTE format(
+            'UPDATE %1$I e
+             SET tag_ids = ARRAY(SELECT DISTINCT t FROM unnest(e.tag_ids || c.tag_ids) t)
+             FROM (SELECT %2$I AS id, array_agg(tag_id) AS tag_ids FROM changed GROUP BY %2$I) c
+             WHERE e.id = c.id',
+            TG_ARGV[0], TG_ARGV[1]
+        );
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+REMOVE_FUNCTION = """
+    CREATE OR REPLACE FUNCTION tag_ids_remove() RETURNS trigger AS $$
+    BEGIN
+        EXECUTE format(
+            'UPDATE %1$I e
+             SET tag_ids = ARRAY(SELECT t FROM unnest(e.tag_ids) t WHERE t <> ALL(c.tag_ids))
+             FROM (SELECT %2$I AS id, array_agg(tag_id) AS tag_ids FROM changed GROUP BY %2$I) c
+             WHERE e.id = c.id',
+            TG_ARGV[0], TG_ARGV[1]
+        );
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for entity, owner, association in TABLES:
+        op.add_column(entity, sa.Column(
+            'tag_ids', postgresql.ARRAY(postgresql.UUID(as_uuid=True)), nullable=False, server_default='{}'
+        ))
+        op.execute(f"""
+            UPDATE {entity} e SET tag_ids = a.tag_ids
+            FROM (SELECT {owner} AS id, array_agg(tag_id) AS tag_ids FROM {association} GROUP BY {owner}) a
+            WHERE e.id = a.id
+        """)
+        op.create_index(f'ix_{entity}_tag_ids', entity, ['tag_ids'], postgresql_using='gin')
+
+    op.execute(ADD_FUNCTION)
+    op.execute(REMOVE_FUNCTION)
+    for entity, owner, association in TABLES:
+        op.execute(f"""
+            CREATE TRIGGER {association}_tag_ids_insert
+            AFTER INSERT ON {association}
+            REFERENCING NEW TABLE AS changed
+            FOR EACH STATEMENT EXECUTE FUNCTION tag_ids_add('{entity}', '{owner}')
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {association}_tag_ids_delete
+            AFTER DELETE ON {association}
+            REFERENCING OLD TABLE AS changed
+            FOR EACH STATEMENT EXECUTE FUNCTION tag_ids_remove('{entity}', '{owner}')
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for entity, _, association in TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {association}_tag_ids_insert ON {association}")
+        op.execute(f"DROP TRIGGER IF EXISTS {association}_tag_ids_delete ON {association}")
+        op.drop_index(f'ix_{entity}_tag_ids', table_name=entity)
+        op.drop_column(entity, 'tag_ids')
+    op.execute("DROP FUNCTION IF EXISTS tag_ids_add()")
+    op.execute("DROP FUNCTION IF EXISTS tag_ids_remove()")
@@ -0,0 +1,28 @@
+"""add scene_tags.source
+
+Revision ID: f4d53fd6e75b
+Revises: 6776fac936bd
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4d53fd6e75b'
+down_revision: Union[str, Sequence[str], None] = '6776fac936bd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('scene_tags', sa.Column('source', sa.String(length=50), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('scene_tags', 'source')
@@ -0,0 +1,66 @@
+"""search result version counter
+
+Revision ID: f4e246a79a2c
+Revises: 05338244d254
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4e246a79a2c'
+down_revision: Union[str, Sequence[str], None] = '05338244d254'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Every table whose writes can change a search result
+TABLES = ['videos', 'scenes', 'images', 'video_tags', 'scene_tags', 'image_tags', 'tags']
+
+# Deferred constraint triggers run at commit, so the counter row is locked
+# only while committing rather than for the whole transaction; the
+# transaction-local flag limits it to one bump per transaction. Because the
+# bump is transactional, a reader never sees the new version before the
+# data it covers (see app/services/search_cache.py).
+BUMP_FUNCTION = """
+    CREATE OR REPLACE FUNCTION search_version_bump() RETURNS trigger AS $$
+    BEGIN
+        IF current_setting('search_version.bumped', true) = txid_current()::text THEN
+            RETURN NULL;
+        END IF;
+        PERFORM set_config('search_version.bumped', txid_current()::text, true);
+        UPDATE search_version SET version = version + 1 WHERE id = 1;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'search_version',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.BigInteger(), server_default='0', nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO search_version (id, version) VALUES (1, 0)")
+    op.execute(BUMP_FUNCTION)
+    for table in TABLES:
+        op.execute(f"""
+            CREATE CONSTRAINT TRIGGER {table}_search_version
+            AFTER INSERT OR UPDATE OR DELETE ON {table}
+            DEFERRABLE INITIALLY DEFERRED
+            FOR EACH ROW EXECUTE FUNCTION search_version_bump()
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.execute(f"DROP TRIGGER IF EXISTS {table}_search_version ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS search_version_bump()")
+    op.drop_table('search_version')
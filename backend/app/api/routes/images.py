@@ -1,18 +1,28 @@
 import os
 import uuid
-import aiofiles
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Response, Query
 from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import select, inspect
+from sqlalchemy.orm import selectinload, noload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional
 from uuid import UUID
 from PIL import Image as PILImage
 
 from app.config import get_settings
-from app.models.database import get_db
+from app.models.database import get_async_db
 from app.models.image import Image
 from app.models.tag import Tag, ImageTag
+from app.schemas.batch import BatchRequest, BatchResponse, build_batch_response, check_batch_fields
 from app.services.image_tagging_service import image_tagging_service
+from app.services.similarity_index import similarity_index
+from app.services.embedding_index import embedding_index
+from app.services.tag_store import tag_entities
+from app.utils.image_hash import compute_dhash, to_signed64
+from app.utils.file_storage import save_upload_file
+from app.utils.media_executor import media_executor
+from app.utils.pagination import fetch_keyset_page
 
 router = APIRouter()
 settings = get_settings()
@@ -30,17 +40,38 @@ def get_thumbnail_path(filename: str) -> str:
     return os.path.join(settings.storage_path, "thumbnails", "images", filename)
 
 
-def image_to_response(image: Image, db: Session) -> dict:
+# Tag links and their tags, loaded in one query each for a whole page of images
+IMAGE_TAGS = selectinload(Image.tags).selectinload(ImageTag.tag)
+
+# Fields of image_to_response, for batch field selection
+IMAGE_FIELDS = frozenset({
+    "id", "filename", "title", "description", "user_notes", "file_path", "thumbnail_path",
+    "width", "height", "file_size", "status", "tags", "created_at", "updated_at",
+})
+
+
+async def image_to_response(image: Image, db: AsyncSession) -> dict:
     """Convert Image model to response dict with resolved tags"""
-    tags = []
-    for image_tag in image.tags:
-        tag = db.query(Tag).filter(Tag.id == image_tag.tag_id).first()
-        if tag:
-            tags.append({
-                "id": str(tag.id),
-                "name": tag.name,
-                "confidence": image_tag.confidence
-            })
+    if "tags" in inspect(image).unloaded:
+        # Images not loaded with IMAGE_TAGS: read the links as plain rows, since
+        # touching image.tags would lazy-load, which async sessions cannot do
+        rows = (await db.execute(
+            select(Tag.id, Tag.name, ImageTag.confidence)
+            .join(ImageTag, ImageTag.tag_id == Tag.id)
+            .where(ImageTag.image_id == image.id)
+            .order_by(ImageTag.created_at)
+        )).all()
+    else:
+        rows = [(image_tag.tag.id, image_tag.tag.name, image_tag.confidence) for image_tag in image.tags]
+
+    tags = [
+        {
+            "id": str(tag_id),
+            "name": name,
+            "confidence": confidence
+        }
+        for tag_id, name, confidence in rows
+    ]
 
     return {
         "id": str(image.id),
@@ -60,8 +91,39 @@ def image_to_response(image: Image, db: Session) -> dict:
     }
 
 
+def process_image_file(file_path: str, thumbnail_path: str) -> tuple:
+    """Read dimensions, compute the perceptual hash and write the thumbnail (blocking)"""
+    # Get image dimensions
+    width, height = None, None
+    try:
+        with PILImage.open(file_path) as img:
+            width, height = img.size
+    except Exception as e:
+        print(f"Warning: Could not get image dimensions: {e}")
+
+    # Compute perceptual hash for near-duplicate lookup
+    fingerprint = compute_dhash(file_path)
+
+    # Create thumbnail
+    try:
+        os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+
+        with PILImage.open(file_path) as img:
+            # Convert to RGB if necessary (for PNG with transparency)
+            if img.mode in ('RGBA', 'P'):
+                img = img.convert('RGB')
+            # Create thumbnail (max 400x400)
+            img.thumbnail((400, 400), PILImage.Resampling.LANCZOS)
+            img.save(thumbnail_path, "JPEG", quality=85)
+    except Exception as e:
+        print(f"Warning: Could not create thumbnail: {e}")
+        thumbnail_path = None
+
+    return width, height, fingerprint, thumbnail_path
+
+
 @router.post("/upload")
-async def upload_image(file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_image(file: UploadFile = File(...), db: AsyncSession = Depends(get_async_db)):
     """Upload an image file"""
     # Validate file extension
     _, ext = os.path.splitext(file.filename)
@@ -79,41 +141,24 @@ async def upload_image(file: UploadFile = File(...), db: Session = Depends(get_d
     # Ensure directory exists
     os.makedirs(os.path.dirname(file_path), exist_ok=True)
 
-    # Save file
+    # Save file (hashed while streaming to disk)
     try:
-        file_size = 0
-        async with aiofiles.open(file_path, 'wb') as out_file:
-            while content := await file.read(1024 * 1024):  # Read 1MB chunks
-                await out_file.write(content)
-                file_size += len(content)
+        file_size, content_hash = await save_upload_file(file, file_path)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
 
-    # Get image dimensions
-    width, height = None, None
-    try:
-        with PILImage.open(file_path) as img:
-            width, height = img.size
-    except Exception as e:
-        print(f"Warning: Could not get image dimensions: {e}")
+    # Identical content already uploaded - link to the existing record
+    existing = await db.scalar(select(Image).where(Image.content_hash == content_hash))
+    if existing:
+        os.remove(file_path)
+        print(f"Duplicate upload of {file.filename}, linking to existing image {existing.id}")
+        return await image_to_response(existing, db)
 
-    # Create thumbnail
-    thumbnail_path = None
-    try:
-        thumb_filename = f"{unique_id}_thumb.jpg"
-        thumbnail_path = get_thumbnail_path(thumb_filename)
-        os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
-
-        with PILImage.open(file_path) as img:
-            # Convert to RGB if necessary (for PNG with transparency)
-            if img.mode in ('RGBA', 'P'):
-                img = img.convert('RGB')
-            # Create thumbnail (max 400x400)
-            img.thumbnail((400, 400), PILImage.Resampling.LANCZOS)
-            img.save(thumbnail_path, "JPEG", quality=85)
-    except Exception as e:
-        print(f"Warning: Could not create thumbnail: {e}")
-        thumbnail_path = None
+    # Dimensions, perceptual hash and thumbnail are computed off the event loop
+    thumbnail_path = get_thumbnail_path(f"{unique_id}_thumb.jpg")
+    width, height, fingerprint, thumbnail_path = await media_executor.run_blocking(
+        "image", process_image_file, file_path, thumbnail_path
+    )
 
     # Create database record
     try:
@@ -125,11 +170,23 @@ async def upload_image(file: UploadFile = File(...), db: Session = Depends(get_d
             width=width,
             height=height,
             file_size=file_size,
+            content_hash=content_hash,
+            phash=to_signed64(fingerprint) if fingerprint is not None else None,
             status="uploaded"
         )
         db.add(image)
-        db.commit()
-        db.refresh(image)
+        await db.commit()
+        await db.refresh(image)
+    except IntegrityError:
+        # A concurrent upload of the same content won the race
+        await db.rollback()
+        for path in (file_path, thumbnail_path):
+            if path and os.path.exists(path):
+                os.remove(path)
+        existing = await db.scalar(select(Image).where(Image.content_hash == content_hash))
+        if not existing:
+            raise HTTPException(status_code=500, detail="Failed to save to database")
+        return await image_to_response(existing, db)
     except Exception as e:
         # Clean up files if DB save fails
         if os.path.exists(file_path):
@@ -138,23 +195,49 @@ async def upload_image(file: UploadFile = File(...), db: Session = Depends(get_d
             os.remove(thumbnail_path)
         raise HTTPException(status_code=500, detail=f"Failed to save to database: {str(e)}")
 
-    return image_to_response(image, db)
+    if fingerprint is not None:
+        similarity_index.add("image", image.id, fingerprint)
+
+    return await image_to_response(image, db)
 
 
 @router.get("")
-async def get_images(db: Session = Depends(get_db)):
-    """Get list of all images"""
-    images = db.query(Image).order_by(Image.created_at.desc()).all()
-    return [image_to_response(img, db) for img in images]
+async def get_images(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get list of images, newest first; with limit, the next page cursor is sent in X-Next-Cursor"""
+    try:
+        images, next_cursor = await fetch_keyset_page(db, Image, select(Image).options(IMAGE_TAGS), limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [await image_to_response(img, db) for img in images]
 
 
 @router.get("/{image_id}")
-async def get_image(image_id: UUID, db: Session = Depends(get_db)):
+async def get_image(image_id: UUID, db: AsyncSession = Depends(get_async_db)):
     """Get image details"""
-    image = db.query(Image).filter(Image.id == image_id).first()
+    image = await db.get(Image, image_id)
     if not image:
         raise HTTPException(status_code=404, detail="Image not found")
-    return image_to_response(image, db)
+    return await image_to_response(image, db)
+
+
+@router.post("/batch", response_model=BatchResponse)
+async def get_images_batch(request: BatchRequest, db: AsyncSession = Depends(get_async_db)):
+    """Get many images by id with tags in a constant number of queries"""
+    try:
+        check_batch_fields(request, IMAGE_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    tags = IMAGE_TAGS if request.fields is None or "tags" in request.fields else noload(Image.tags)
+    images = (await db.scalars(select(Image).where(Image.id.in_(request.ids)).options(tags))).all()
+    items = {image.id: await image_to_response(image, db) for image in images}
+    return build_batch_response(request, items)
 
 
 def parse_hashtags(text: str) -> list[str]:
@@ -165,35 +248,14 @@ def parse_hashtags(text: str) -> list[str]:
     return list(set(matches))
 
 
-def add_user_tags_to_image(image_id: UUID, tag_names: list[str], db: Session) -> None:
+async def add_user_tags_to_image(image_id: UUID, tag_names: list[str], db: AsyncSession) -> None:
     """Add user-defined tags to an image"""
-    for tag_name in tag_names:
-        tag_name = tag_name.strip()
-        if not tag_name:
-            continue
-
-        # Find or create tag
-        tag = db.query(Tag).filter(Tag.name == tag_name).first()
-        if not tag:
-            tag = Tag(name=tag_name)
-            db.add(tag)
-            db.flush()
-
-        # Add to image tags
-        existing_image_tag = db.query(ImageTag).filter(
-            ImageTag.image_id == image_id,
-            ImageTag.tag_id == tag.id
-        ).first()
-
-        if not existing_image_tag:
-            image_tag = ImageTag(image_id=image_id, tag_id=tag.id, confidence=1.0)
-            db.add(image_tag)
-
+    await tag_entities(ImageTag, [image_id], tag_names, db, confidence=1.0)
 
 @router.put("/{image_id}")
-async def update_image(image_id: UUID, data: dict, db: Session = Depends(get_db)):
+async def update_image(image_id: UUID, data: dict, db: AsyncSession = Depends(get_async_db)):
     """Update image metadata"""
-    image = db.query(Image).filter(Image.id == image_id).first()
+    image = await db.get(Image, image_id)
     if not image:
         raise HTTPException(status_code=404, detail="Image not found")
 
@@ -208,17 +270,17 @@ async def update_image(image_id: UUID, data: dict, db: Session = Depends(get_db)
     if image.user_notes:
         hashtags = parse_hashtags(image.user_notes)
         if hashtags:
-            add_user_tags_to_image(image.id, hashtags, db)
+            await add_user_tags_to_image(image.id, hashtags, db)
 
-    db.commit()
-    db.refresh(image)
-    return image_to_response(image, db)
+    await db.commit()
+    await db.refresh(image)
+    return await image_to_response(image, db)
 
 
 @router.delete("/{image_id}")
-async def delete_image(image_id: UUID, db: Session = Depends(get_db)):
+async def delete_image(image_id: UUID, db: AsyncSession = Depends(get_async_db)):
     """Delete an image"""
-    image = db.query(Image).filter(Image.id == image_id).first()
+    image = await db.get(Image, image_id)
     if not image:
         raise HTTPException(status_code=404, detail="Image not found")
 
@@ -229,38 +291,40 @@ async def delete_image(image_id: UUID, db: Session = Depends(get_db)):
         os.remove(image.thumbnail_path)
 
     # Delete from database
-    db.delete(image)
-    db.commit()
+    await db.delete(image)
+    await db.commit()
+    similarity_index.remove("image", image_id)
+    embedding_index.remove("image", image_id)
 
     return {"message": "Image deleted", "image_id": str(image_id)}
 
 
 @router.delete("/{image_id}/tags/{tag_id}")
-async def delete_image_tag(image_id: UUID, tag_id: UUID, db: Session = Depends(get_db)):
+async def delete_image_tag(image_id: UUID, tag_id: UUID, db: AsyncSession = Depends(get_async_db)):
     """Delete a tag from an image"""
-    image = db.query(Image).filter(Image.id == image_id).first()
+    image = await db.get(Image, image_id)
     if not image:
         raise HTTPException(status_code=404, detail="Image not found")
 
     # Find and delete the image-tag association
-    image_tag = db.query(ImageTag).filter(
+    image_tag = await db.scalar(select(ImageTag).where(
         ImageTag.image_id == image_id,
         ImageTag.tag_id == tag_id
-    ).first()
+    ))
 
     if not image_tag:
         raise HTTPException(status_code=404, detail="Tag not found for this image")
 
-    db.delete(image_tag)
-    db.commit()
+    await db.delete(image_tag)
+    await db.commit()
 
     return {"message": "Tag deleted", "image_id": str(image_id), "tag_id": str(tag_id)}
 
 
 @router.post("/{image_id}/tagging/start")
-async def start_image_tagging(image_id: UUID, db: Session = Depends(get_db)):
+async def start_image_tagging(image_id: UUID, db: AsyncSession = Depends(get_async_db)):
     """Start tagging process for an image"""
-    image = db.query(Image).filter(Image.id == image_id).first()
+    image = await db.get(Image, image_id)
     if not image:
         raise HTTPException(status_code=404, detail="Image not found")
 
@@ -270,9 +334,9 @@ async def start_image_tagging(image_id: UUID, db: Session = Depends(get_db)):
 
 
 @router.get("/{image_id}/tagging/status")
-async def get_image_tagging_status(image_id: UUID, db: Session = Depends(get_db)):
+async def get_image_tagging_status(image_id: UUID, db: AsyncSession = Depends(get_async_db)):
     """Get tagging status"""
-    image = db.query(Image).filter(Image.id == image_id).first()
+    image = await db.get(Image, image_id)
     if not image:
         raise HTTPException(status_code=404, detail="Image not found")
 
@@ -280,9 +344,9 @@ async def get_image_tagging_status(image_id: UUID, db: Session = Depends(get_db)
 
 
 @router.get("/{image_id}/file")
-async def get_image_file(image_id: UUID, db: Session = Depends(get_db)):
+async def get_image_file(image_id: UUID, db: AsyncSession = Depends(get_async_db)):
     """Get the actual image file"""
-    image = db.query(Image).filter(Image.id == image_id).first()
+    image = await db.get(Image, image_id)
     if not image:
         raise HTTPException(status_code=404, detail="Image not found")
 
@@ -306,9 +370,9 @@ async def get_image_file(image_id: UUID, db: Session = Depends(get_db)):
 
 
 @router.get("/{image_id}/thumbnail")
-async def get_image_thumbnail(image_id: UUID, db: Session = Depends(get_db)):
+async def get_image_thumbnail(image_id: UUID, db: AsyncSession = Depends(get_async_db)):
     """Get the image thumbnail"""
-    image = db.query(Image).filter(Image.id == image_id).first()
+    image = await db.get(Image, image_id)
     if not image:
         raise HTTPException(status_code=404, detail="Image not found")
 
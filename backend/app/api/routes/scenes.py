@@ -1,17 +1,21 @@
 import os
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from uuid import UUID
 from pydantic import BaseModel
 
-from app.models.database import get_db
+from app.models.database import get_async_db
 from app.models.scene import Scene
 from app.models.video import Video
 from app.models.tag import Tag, SceneTag
 from app.utils.video_processor import video_processor
 from app.config import get_settings
+from app.services.tag_store import tag_entities
+from app.services.scene_timeline import scenes_with_tags, timeline_rows
+from app.schemas.batch import BatchRequest, BatchResponse, build_batch_response, check_batch_fields
 
 router = APIRouter()
 settings = get_settings()
@@ -46,19 +50,23 @@ class SceneUpdate(BaseModel):
     user_notes: Optional[str] = None
 
 
+# Fields of batch scene items, for batch field selection
+SCENE_FIELDS = frozenset(SceneDetailResponse.model_fields)
+
+
 @router.get("/{scene_id}", response_model=SceneDetailResponse)
-async def get_scene(scene_id: UUID, db: Session = Depends(get_db)):
+async def get_scene(scene_id: UUID, db: AsyncSession = Depends(get_async_db)):
     """Get scene details with tags"""
-    scene = db.query(Scene).filter(Scene.id == scene_id).first()
+    scene = await db.get(Scene, scene_id)
     if not scene:
         raise HTTPException(status_code=404, detail="Scene not found")
 
-    video = db.query(Video).filter(Video.id == scene.video_id).first()
+    video = await db.get(Video, scene.video_id)
 
     # Get tags for this scene
-    scene_tags = db.query(Tag).join(SceneTag).filter(
-        SceneTag.scene_id == scene.id
-    ).all()
+    scene_tags = (await db.scalars(
+        select(Tag).join(SceneTag).where(SceneTag.scene_id == scene.id)
+    )).all()
 
     return SceneDetailResponse(
         id=str(scene.id),
@@ -75,6 +83,29 @@ async def get_scene(scene_id: UUID, db: Session = Depends(get_db)):
     )
 
 
+@router.post("/batch", response_model=BatchResponse)
+async def get_scenes_batch(request: BatchRequest, db: AsyncSession = Depends(get_async_db)):
+    """Get many scenes by id with tags in one query"""
+    try:
+        check_batch_fields(request, SCENE_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    stmt = (
+        scenes_with_tags()
+        .add_columns(Video.filename.label("video_filename"))
+        .outerjoin(Video, Video.id == Scene.video_id)
+        .where(Scene.id.in_(request.ids))
+        .group_by(Video.id)
+    )
+    rows = (await db.execute(stmt)).all()
+    items = {}
+    for row, item in zip(rows, timeline_rows(rows)):
+        item["video_filename"] = row.video_filename or "Unknown"
+        item["duration"] = row.end_time - row.start_time
+        items[row.id] = item
+    return build_batch_response(request, items)
+
+
 def parse_hashtags(text: str) -> list[str]:
     """Extract hashtags from text"""
     import re
@@ -84,39 +115,18 @@ def parse_hashtags(text: str) -> list[str]:
     return list(set(matches))  # Remove duplicates
 
 
-def add_scene_user_tags(scene_id: UUID, tag_names: list[str], db: Session) -> None:
+async def add_scene_user_tags(scene_id: UUID, tag_names: list[str], db: AsyncSession) -> None:
     """Add user-defined tags to a scene"""
-    for tag_name in tag_names:
-        tag_name = tag_name.strip()
-        if not tag_name:
-            continue
-
-        # Find or create tag
-        tag = db.query(Tag).filter(Tag.name == tag_name).first()
-        if not tag:
-            tag = Tag(name=tag_name)
-            db.add(tag)
-            db.flush()
-
-        # Add to scene tags if not exists
-        existing_scene_tag = db.query(SceneTag).filter(
-            SceneTag.scene_id == scene_id,
-            SceneTag.tag_id == tag.id
-        ).first()
-
-        if not existing_scene_tag:
-            scene_tag = SceneTag(scene_id=scene_id, tag_id=tag.id, confidence=1.0)
-            db.add(scene_tag)
-
+    await tag_entities(SceneTag, [scene_id], tag_names, db, confidence=1.0)
 
 @router.put("/{scene_id}", response_model=SceneDetailResponse)
-async def update_scene(scene_id: UUID, scene_update: SceneUpdate, db: Session = Depends(get_db)):
+async def update_scene(scene_id: UUID, scene_update: SceneUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update scene metadata and parse user-defined tags"""
-    scene = db.query(Scene).filter(Scene.id == scene_id).first()
+    scene = await db.get(Scene, scene_id)
     if not scene:
         raise HTTPException(status_code=404, detail="Scene not found")
 
-    video = db.query(Video).filter(Video.id == scene.video_id).first()
+    video = await db.get(Video, scene.video_id)
 
     # Update user_notes
     if scene_update.user_notes is not None:
@@ -126,15 +136,15 @@ async def update_scene(scene_id: UUID, scene_update: SceneUpdate, db: Session =
         if scene.user_notes:
             hashtags = parse_hashtags(scene.user_notes)
             if hashtags:
-                add_scene_user_tags(scene.id, hashtags, db)
+                await add_scene_user_tags(scene.id, hashtags, db)
 
-    db.commit()
-    db.refresh(scene)
+    await db.commit()
+    await db.refresh(scene)
 
     # Get tags for this scene
-    scene_tags = db.query(Tag).join(SceneTag).filter(
-        SceneTag.scene_id == scene.id
-    ).all()
+    scene_tags = (await db.scalars(
+        select(Tag).join(SceneTag).where(SceneTag.scene_id == scene.id)
+    )).all()
 
     return SceneDetailResponse(
         id=str(scene.id),
@@ -152,35 +162,35 @@ async def update_scene(scene_id: UUID, scene_update: SceneUpdate, db: Session =
 
 
 @router.delete("/{scene_id}/tags/{tag_id}")
-async def delete_scene_tag(scene_id: UUID, tag_id: UUID, db: Session = Depends(get_db)):
+async def delete_scene_tag(scene_id: UUID, tag_id: UUID, db: AsyncSession = Depends(get_async_db)):
     """Delete a tag from a scene"""
-    scene = db.query(Scene).filter(Scene.id == scene_id).first()
+    scene = await db.get(Scene, scene_id)
     if not scene:
         raise HTTPException(status_code=404, detail="Scene not found")
 
     # Find and delete the scene-tag association
-    scene_tag = db.query(SceneTag).filter(
+    scene_tag = await db.scalar(select(SceneTag).where(
         SceneTag.scene_id == scene_id,
         SceneTag.tag_id == tag_id
-    ).first()
+    ))
 
     if not scene_tag:
         raise HTTPException(status_code=404, detail="Tag not found for this scene")
 
-    db.delete(scene_tag)
-    db.commit()
+    await db.delete(scene_tag)
+    await db.commit()
 
     return {"message": "Tag deleted", "scene_id": str(scene_id), "tag_id": str(tag_id)}
 
 
 @router.get("/{scene_id}/download")
-async def download_scene(scene_id: UUID, db: Session = Depends(get_db)):
+async def download_scene(scene_id: UUID, db: AsyncSession = Depends(get_async_db)):
     """Download scene as video file"""
-    scene = db.query(Scene).filter(Scene.id == scene_id).first()
+    scene = await db.get(Scene, scene_id)
     if not scene:
         raise HTTPException(status_code=404, detail="Scene not found")
 
-    video = db.query(Video).filter(Video.id == scene.video_id).first()
+    video = await db.get(Video, scene.video_id)
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
 
@@ -196,7 +206,7 @@ async def download_scene(scene_id: UUID, db: Session = Depends(get_db)):
         clip_path = os.path.join(clips_dir, clip_filename)
 
         try:
-            video_processor.extract_clip(
+            await video_processor.extract_clip(
                 video.file_path,
                 clip_path,
                 scene.start_time,
@@ -204,7 +214,7 @@ async def download_scene(scene_id: UUID, db: Session = Depends(get_db)):
             )
             # Update scene with clip path
             scene.clip_path = clip_path
-            db.commit()
+            await db.commit()
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to extract clip: {str(e)}")
 
@@ -220,9 +230,9 @@ async def download_scene(scene_id: UUID, db: Session = Depends(get_db)):
 
 
 @router.get("/{scene_id}/thumbnail")
-async def get_scene_thumbnail(scene_id: UUID, db: Session = Depends(get_db)):
+async def get_scene_thumbnail(scene_id: UUID, db: AsyncSession = Depends(get_async_db)):
     """Get scene thumbnail image"""
-    scene = db.query(Scene).filter(Scene.id == scene_id).first()
+    scene = await db.get(Scene, scene_id)
     if not scene:
         raise HTTPException(status_code=404, detail="Scene not found")
 
@@ -247,18 +257,18 @@ class ExportResponse(BaseModel):
 
 
 @router.post("/export", response_model=ExportResponse)
-async def export_scenes(request: ExportRequest, db: Session = Depends(get_db)):
+async def export_scenes(request: ExportRequest, db: AsyncSession = Depends(get_async_db)):
     """Export selected scenes as separate videos or merged"""
     exported_files = []
     clips_to_merge = []
 
     for scene_id_str in request.scene_ids:
         scene_id = UUID(scene_id_str)
-        scene = db.query(Scene).filter(Scene.id == scene_id).first()
+        scene = await db.get(Scene, scene_id)
         if not scene:
             continue
 
-        video = db.query(Video).filter(Video.id == scene.video_id).first()
+        video = await db.get(Video, scene.video_id)
         if not video:
             continue
 
@@ -271,14 +281,14 @@ async def export_scenes(request: ExportRequest, db: Session = Depends(get_db)):
 
         if not os.path.exists(clip_path):
             try:
-                video_processor.extract_clip(
+                await video_processor.extract_clip(
                     video.file_path,
                     clip_path,
                     scene.start_time,
                     scene.end_time
                 )
                 scene.clip_path = clip_path
-                db.commit()
+                await db.commit()
             except Exception as e:
                 continue
 
@@ -306,26 +316,8 @@ async def export_scenes(request: ExportRequest, db: Session = Depends(get_db)):
             merged_filename = f"merged_{uuid.uuid4()}.mp4"
             merged_path = os.path.join(merged_dir, merged_filename)
 
-            # Create concat file for ffmpeg
-            concat_file = os.path.join(merged_dir, f"concat_{uuid.uuid4()}.txt")
-            with open(concat_file, 'w') as f:
-                for clip in clips_to_merge:
-                    f.write(f"file '{clip}'\n")
-
             # Merge using ffmpeg
-            import subprocess
-            cmd = [
-                "ffmpeg", "-y",
-                "-f", "concat",
-                "-safe", "0",
-                "-i", concat_file,
-                "-c", "copy",
-                merged_path
-            ]
-            subprocess.run(cmd, capture_output=True, check=True)
-
-            # Clean up concat file
-            os.remove(concat_file)
+            await video_processor.concat_clips(clips_to_merge, merged_path)
 
             result.merged_file = merged_path
         except Exception as e:
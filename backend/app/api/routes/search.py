@@ -1,25 +1,53 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
-from pydantic import BaseModel
-
-from app.models.database import get_db
+import os
+import asyncio
+import heapq
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select, delete, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import DBAPIError
+from typing import Dict, List, Literal, Optional
+from pydantic import BaseModel, Field
+
+from app.models.database import get_async_db, AsyncSessionLocal
 from app.models.tag import Tag, VideoTag, SceneTag, ImageTag
-from app.models.video import Video
 from app.models.scene import Scene
 from app.models.image import Image
+from app.config import get_settings
+from app.services.similarity_index import similarity_index
+from app.services.embedding_index import embedding_index
+from app.services.tag_store import lookup_tags, reconcile_tag_usage
+from app.services.search_compiler import TagFilter, compile_match, compile_page, compile_rows, compile_count, compile_ranked
+from app.services.tag_bitmap_index import tag_bitmap_index
+from app.services.tag_suggest import tag_suggest_index
+from app.services.tag_cooccurrence import tag_cooccurrence
+from app.services.tag_cache import tag_cache, announce_tag_changes
+from app.services.search_cache import search_cache, cache_key
+from app.utils.embeddings import embed_texts
+from app.utils.image_hash import compute_dhash, to_signed64, from_signed64
+from app.utils.media_executor import media_executor
+from app.utils.pagination import encode_cursor, decode_cursor, estimate_count, capped_count
 
 router = APIRouter()
+settings = get_settings()
 
 
 class SearchQuery(BaseModel):
     and_tags: Optional[List[str]] = None
     or_tags: Optional[List[str]] = None
     not_tags: Optional[List[str]] = None
+    text: Optional[str] = None  # Words matched against titles, AI summaries/descriptions and user notes
     target: List[str] = ["videos", "scenes", "images"]
     page: int = 1
     limit: int = 20
+    cursors: Optional[Dict[str, str]] = None  # Per-target keyset cursors from next_cursors; replace page
+    total_mode: Literal["exact", "estimate", "capped", "none"] = "exact"
+    facets: int = Field(0, ge=0, le=100)  # Top co-occurring tags to count per target; 0 disables
+
+
+class TagFacet(BaseModel):
+    name: str
+    count: int  # Matching results (whole result set, not just this page) that also carry the tag
 
 
 class VideoResult(BaseModel):
@@ -74,219 +102,254 @@ class SearchResponse(BaseModel):
     total_images: int
     page: int
     limit: int
+    next_cursors: Dict[str, Optional[str]] = {}  # Cursor of the next page per target; None on the last page
+    total_mode: str = "exact"  # "capped" totals equal to search_count_cap mean "at least"
+    facets: Dict[str, List[TagFacet]] = {}  # Per target, most frequent first
+
+
+def _search_cache_key(query: SearchQuery) -> str:
+    """Cache key of a search; tag lists are sets and text is case/whitespace-insensitive"""
+    def names(tags):
+        return sorted({t.strip() for t in tags or []})
+
+    params = query.model_dump()
+    params.update(
+        and_tags=names(query.and_tags),
+        or_tags=names(query.or_tags),
+        not_tags=names(query.not_tags),
+        text=" ".join((query.text or "").lower().split()),
+        target=sorted(set(query.target)),
+    )
+    return cache_key(params)
 
 
 @router.post("", response_model=SearchResponse)
-async def search(query: SearchQuery, db: Session = Depends(get_db)):
-    """Search videos, scenes, and images by tags with AND/OR/NOT logic"""
+async def search(query: SearchQuery, db: AsyncSession = Depends(get_async_db)):
+    """Search videos, scenes, and images by tags with AND/OR/NOT logic and free text"""
+    # The bitmap index trails commits by a NOTIFY round trip, so results it
+    # serves could be cached under a version they do not reflect yet
+    if not search_cache.enabled or tag_bitmap_index.ready:
+        return await _run_search(query, db)
+
+    version = await search_cache.version(db)
+    key = _search_cache_key(query)
+    body = await search_cache.get(version, key)
+    if body is None:
+        body = (await _run_search(query, db)).model_dump_json()
+        await search_cache.put(version, key, body)
+    return Response(content=body, media_type="application/json")
+
+
+async def _run_search(query: SearchQuery, db: AsyncSession) -> SearchResponse:
     videos = []
     scenes = []
     images = []
+    totals = {"videos": 0, "scenes": 0, "images": 0}
+    facets = {}
 
-    # Search videos
-    if "videos" in query.target:
-        video_query = db.query(Video)
-
-        # AND tags - video must have ALL these tags
-        if query.and_tags:
-            for tag_name in query.and_tags:
-                tag = db.query(Tag).filter(Tag.name == tag_name).first()
-                if tag:
-                    video_ids_with_tag = db.query(VideoTag.video_id).filter(
-                        VideoTag.tag_id == tag.id
-                    ).subquery()
-                    video_query = video_query.filter(Video.id.in_(video_ids_with_tag))
-                else:
-                    # Tag doesn't exist, no results possible
-                    video_query = video_query.filter(False)
-
-        # OR tags - video must have AT LEAST ONE of these tags
-        if query.or_tags:
-            tag_ids = []
-            for tag_name in query.or_tags:
-                tag = db.query(Tag).filter(Tag.name == tag_name).first()
-                if tag:
-                    tag_ids.append(tag.id)
-            if tag_ids:
-                video_ids_with_any_tag = db.query(VideoTag.video_id).filter(
-                    VideoTag.tag_id.in_(tag_ids)
-                ).subquery()
-                video_query = video_query.filter(Video.id.in_(video_ids_with_any_tag))
-            else:
-                video_query = video_query.filter(False)
-
-        # NOT tags - video must NOT have ANY of these tags
-        if query.not_tags:
-            for tag_name in query.not_tags:
-                tag = db.query(Tag).filter(Tag.name == tag_name).first()
-                if tag:
-                    video_ids_with_tag = db.query(VideoTag.video_id).filter(
-                        VideoTag.tag_id == tag.id
-                    ).subquery()
-                    video_query = video_query.filter(~Video.id.in_(video_ids_with_tag))
-
-        # Get results with pagination
-        total_videos = video_query.count()
-        offset = (query.page - 1) * query.limit
-        video_results = video_query.order_by(Video.created_at.desc()).offset(offset).limit(query.limit).all()
-
-        for video in video_results:
-            video_tags = db.query(Tag.name).join(VideoTag).filter(
-                VideoTag.video_id == video.id
-            ).all()
-            videos.append(VideoResult(
-                id=str(video.id),
-                filename=video.filename,
-                title=video.title,
-                summary=video.summary,
-                duration=video.duration,
-                status=video.status,
-                tags=[t[0] for t in video_tags],
-                created_at=video.created_at.isoformat()
-            ))
-    else:
-        total_videos = 0
-
-    # Search scenes
-    if "scenes" in query.target:
-        scene_query = db.query(Scene)
-
-        # AND tags
-        if query.and_tags:
-            for tag_name in query.and_tags:
-                tag = db.query(Tag).filter(Tag.name == tag_name).first()
-                if tag:
-                    scene_ids_with_tag = db.query(SceneTag.scene_id).filter(
-                        SceneTag.tag_id == tag.id
-                    ).subquery()
-                    scene_query = scene_query.filter(Scene.id.in_(scene_ids_with_tag))
-                else:
-                    scene_query = scene_query.filter(False)
-
-        # OR tags
-        if query.or_tags:
-            tag_ids = []
-            for tag_name in query.or_tags:
-                tag = db.query(Tag).filter(Tag.name == tag_name).first()
-                if tag:
-                    tag_ids.append(tag.id)
-            if tag_ids:
-                scene_ids_with_any_tag = db.query(SceneTag.scene_id).filter(
-                    SceneTag.tag_id.in_(tag_ids)
-                ).subquery()
-                scene_query = scene_query.filter(Scene.id.in_(scene_ids_with_any_tag))
-            else:
-                scene_query = scene_query.filter(False)
-
-        # NOT tags
-        if query.not_tags:
-            for tag_name in query.not_tags:
-                tag = db.query(Tag).filter(Tag.name == tag_name).first()
-                if tag:
-                    scene_ids_with_tag = db.query(SceneTag.scene_id).filter(
-                        SceneTag.tag_id == tag.id
-                    ).subquery()
-                    scene_query = scene_query.filter(~Scene.id.in_(scene_ids_with_tag))
-
-        # Get results with pagination
-        total_scenes = scene_query.count()
-        offset = (query.page - 1) * query.limit
-        scene_results = scene_query.order_by(Scene.created_at.desc()).offset(offset).limit(query.limit).all()
-
-        for scene in scene_results:
-            video = db.query(Video).filter(Video.id == scene.video_id).first()
-            scene_tags = db.query(Tag.name).join(SceneTag).filter(
-                SceneTag.scene_id == scene.id
-            ).all()
-            scenes.append(SceneResult(
-                id=str(scene.id),
-                video_id=str(scene.video_id),
-                video_filename=video.filename if video else "Unknown",
-                start_time=scene.start_time,
-                end_time=scene.end_time,
-                thumbnail_path=scene.thumbnail_path,
-                tags=[t[0] for t in scene_tags]
-            ))
-    else:
-        total_scenes = 0
-
-    # Search images
-    if "images" in query.target:
-        image_query = db.query(Image)
-
-        # AND tags
-        if query.and_tags:
-            for tag_name in query.and_tags:
-                tag = db.query(Tag).filter(Tag.name == tag_name).first()
-                if tag:
-                    image_ids_with_tag = db.query(ImageTag.image_id).filter(
-                        ImageTag.tag_id == tag.id
-                    ).subquery()
-                    image_query = image_query.filter(Image.id.in_(image_ids_with_tag))
-                else:
-                    image_query = image_query.filter(False)
-
-        # OR tags
-        if query.or_tags:
-            tag_ids = []
-            for tag_name in query.or_tags:
-                tag = db.query(Tag).filter(Tag.name == tag_name).first()
-                if tag:
-                    tag_ids.append(tag.id)
-            if tag_ids:
-                image_ids_with_any_tag = db.query(ImageTag.image_id).filter(
-                    ImageTag.tag_id.in_(tag_ids)
-                ).subquery()
-                image_query = image_query.filter(Image.id.in_(image_ids_with_any_tag))
+    # Resolve every tag name once for all targets
+    tag_ids = await lookup_tags(
+        (query.and_tags or []) + (query.or_tags or []) + (query.not_tags or []), db
+    )
+    tag_filter = TagFilter.from_names(tag_ids, query.and_tags, query.or_tags, query.not_tags, query.text)
+    cursors = query.cursors or {}
+    if tag_filter.text_query and any(cursors.values()):
+        # Text results are ordered by relevance, which the created_at cursor cannot follow
+        raise HTTPException(status_code=400, detail="cursors cannot be combined with text search; use page")
+    next_cursors = {}
+    exact = query.total_mode == "exact"
+
+    # One statement per target: matching, total count and result tags together
+    for target in ("videos", "scenes", "images"):
+        if target not in query.target or tag_filter.empty:
+            continue
+
+        after = None
+        if cursors.get(target):
+            try:
+                after = decode_cursor(cursors[target])
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        offset = 0 if after else (query.page - 1) * query.limit
+
+        indexed = None
+        if tag_bitmap_index.ready and not tag_filter.text_query and not query.facets:
+            # Match in memory, then fetch just the page rows
+            indexed = tag_bitmap_index.page(target, tag_filter, offset, query.limit, after[1] if after else None)
+        if indexed is not None:
+            totals[target], ids, has_more = indexed
+            rows = (await db.execute(compile_rows(target, ids))).all() if ids else []
+        else:
+            rows = (await db.execute(compile_page(
+                target, tag_filter, offset, query.limit + 1, after=after, with_total=exact and not after,
+                facets=query.facets
+            ))).all()
+            if query.facets:
+                facets[target] = [TagFacet(name=name, count=n) for name, n in (rows[0].facets or [])] if rows else []
+            has_more = len(rows) > query.limit
+            rows = rows[:query.limit]
+
+            if exact and rows and not after:
+                totals[target] = rows[0].total
+            elif exact and (after or offset > 0):
+                totals[target] = await db.scalar(compile_count(target, tag_filter))
+            elif query.total_mode == "estimate":
+                totals[target] = await estimate_count(db, compile_match(target, tag_filter))
+            elif query.total_mode == "capped":
+                totals[target] = await capped_count(db, compile_match(target, tag_filter), settings.search_count_cap)
+
+        next_cursors[target] = (
+            encode_cursor(rows[-1][0].created_at, rows[-1][0].id)
+            if has_more and rows and not tag_filter.text_query else None
+        )
+
+        for row in rows:
+            if target == "videos":
+                video = row[0]
+                videos.append(VideoResult(
+                    id=str(video.id),
+                    filename=video.filename,
+                    title=video.title,
+                    summary=video.summary,
+                    duration=video.duration,
+                    status=video.status,
+                    tags=row.tags,
+                    created_at=video.created_at.isoformat()
+                ))
+            elif target == "scenes":
+                scene = row[0]
+                scenes.append(SceneResult(
+                    id=str(scene.id),
+                    video_id=str(scene.video_id),
+                    video_filename=row.filename or "Unknown",
+                    start_time=scene.start_time,
+                    end_time=scene.end_time,
+                    thumbnail_path=scene.thumbnail_path,
+                    tags=row.tags
+                ))
             else:
-                image_query = image_query.filter(False)
-
-        # NOT tags
-        if query.not_tags:
-            for tag_name in query.not_tags:
-                tag = db.query(Tag).filter(Tag.name == tag_name).first()
-                if tag:
-                    image_ids_with_tag = db.query(ImageTag.image_id).filter(
-                        ImageTag.tag_id == tag.id
-                    ).subquery()
-                    image_query = image_query.filter(~Image.id.in_(image_ids_with_tag))
-
-        # Get results with pagination
-        total_images = image_query.count()
-        offset = (query.page - 1) * query.limit
-        image_results = image_query.order_by(Image.created_at.desc()).offset(offset).limit(query.limit).all()
-
-        for image in image_results:
-            image_tags = db.query(Tag.name).join(ImageTag).filter(
-                ImageTag.image_id == image.id
-            ).all()
-            images.append(ImageResult(
-                id=str(image.id),
-                filename=image.filename,
-                title=image.title,
-                description=image.description,
-                thumbnail_path=image.thumbnail_path,
-                width=image.width,
-                height=image.height,
-                status=image.status,
-                tags=[t[0] for t in image_tags],
-                created_at=image.created_at.isoformat()
-            ))
-    else:
-        total_images = 0
+                image = row[0]
+                images.append(ImageResult(
+                    id=str(image.id),
+                    filename=image.filename,
+                    title=image.title,
+                    description=image.description,
+                    thumbnail_path=image.thumbnail_path,
+                    width=image.width,
+                    height=image.height,
+                    status=image.status,
+                    tags=row.tags,
+                    created_at=image.created_at.isoformat()
+                ))
 
     return SearchResponse(
         videos=videos,
         scenes=scenes,
         images=images,
-        total_videos=total_videos,
-        total_scenes=total_scenes,
-        total_images=total_images,
+        total_videos=totals["videos"],
+        total_scenes=totals["scenes"],
+        total_images=totals["images"],
         page=query.page,
-        limit=query.limit
+        limit=query.limit,
+        next_cursors=next_cursors,
+        total_mode=query.total_mode,
+        facets=facets
     )
 
 
+class RankedSearchQuery(BaseModel):
+    and_tags: Optional[List[str]] = None
+    or_tags: Optional[List[str]] = None
+    not_tags: Optional[List[str]] = None
+    text: Optional[str] = None
+    target: List[str] = ["videos", "scenes", "images"]
+    limit: int = Field(20, ge=1, le=200)  # Size of the merged top-k list
+    deadline_ms: Optional[int] = Field(None, ge=1)  # Defaults to search_ranked_deadline_ms
+
+
+class RankedResult(BaseModel):
+    type: Literal["video", "scene", "image"]
+    id: str
+    score: float
+    title: Optional[str]  # Title, falling back to the filename (parent video filename for scenes)
+    thumbnail_path: Optional[str]
+    video_id: Optional[str] = None  # Scenes only
+    start_time: Optional[float] = None  # Scenes only
+    tags: List[str]
+
+
+class RankedSearchResponse(BaseModel):
+    results: List[RankedResult]
+    partial: bool  # True when some targets missed the deadline and are not included
+    timed_out: List[str]
+
+
+def _ranked_result(target: str, row) -> RankedResult:
+    entity = row[0]
+    if target == "videos":
+        return RankedResult(
+            type="video", id=str(entity.id), score=row.rank, title=entity.title or entity.filename,
+            thumbnail_path=None, tags=row.tags
+        )
+    if target == "scenes":
+        return RankedResult(
+            type="scene", id=str(entity.id), score=row.rank, title=row.filename,
+            thumbnail_path=entity.thumbnail_path, video_id=str(entity.video_id),
+            start_time=entity.start_time, tags=row.tags
+        )
+    return RankedResult(
+        type="image", id=str(entity.id), score=row.rank, title=entity.title or entity.filename,
+        thumbnail_path=entity.thumbnail_path, tags=row.tags
+    )
+
+
+async def _ranked_branch(target: str, tag_filter: TagFilter, limit: int, deadline_ms: int) -> List[RankedResult]:
+    """Top matches of one target on its own connection, so targets run concurrently"""
+    async with AsyncSessionLocal() as db:
+        # Stop the query server-side too if the deadline passes
+        await db.execute(text(f"SET LOCAL statement_timeout = {int(deadline_ms)}"))
+        rows = (await db.execute(compile_ranked(target, tag_filter, limit))).all()
+        return [_ranked_result(target, row) for row in rows]
+
+
+@router.post("/ranked", response_model=RankedSearchResponse)
+async def ranked_search(query: RankedSearchQuery, db: AsyncSession = Depends(get_async_db)):
+    """Search all targets and merge them into one list ranked by tag matches, confidence and text relevance"""
+    tag_ids = await lookup_tags(
+        (query.and_tags or []) + (query.or_tags or []) + (query.not_tags or []), db
+    )
+    tag_filter = TagFilter.from_names(tag_ids, query.and_tags, query.or_tags, query.not_tags, query.text)
+    targets = [t for t in ("videos", "scenes", "images") if t in query.target]
+    if tag_filter.empty or not targets:
+        return RankedSearchResponse(results=[], partial=False, timed_out=[])
+
+    deadline_ms = query.deadline_ms or settings.search_ranked_deadline_ms
+    tasks = {
+        asyncio.create_task(_ranked_branch(target, tag_filter, query.limit, deadline_ms)): target
+        for target in targets
+    }
+    done, pending = await asyncio.wait(tasks, timeout=deadline_ms / 1000)
+    for task in pending:
+        task.cancel()
+    # Let cancelled branches roll back and return their connections before responding
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    timed_out = [tasks[task] for task in pending]
+    branches = []
+    for task in done:
+        if task.exception() is None:
+            branches.append(task.result())
+        elif isinstance(task.exception(), DBAPIError):
+            # statement_timeout fired just before the client-side deadline
+            timed_out.append(tasks[task])
+        else:
+            raise task.exception()
+
+    # Each branch is already its own top-k, so merging keeps at most k per target
+    results = heapq.nlargest(query.limit, (r for branch in branches for r in branch), key=lambda r: r.score)
+    return RankedSearchResponse(results=results, partial=bool(timed_out), timed_out=sorted(timed_out))
+
+
 class TagResponse(BaseModel):
     id: str
     name: str
@@ -299,48 +362,291 @@ class TagResponse(BaseModel):
 
 
 @router.get("/tags", response_model=List[TagResponse])
-async def get_tags(db: Session = Depends(get_db)):
-    """Get all available tags with usage counts"""
-    # Get all tags with video, scene, and image counts
-    tags = db.query(Tag).all()
-
-    result = []
-    for tag in tags:
-        video_count = db.query(VideoTag).filter(VideoTag.tag_id == tag.id).count()
-        scene_count = db.query(SceneTag).filter(SceneTag.tag_id == tag.id).count()
-        image_count = db.query(ImageTag).filter(ImageTag.tag_id == tag.id).count()
-        result.append(TagResponse(
+async def get_tags(
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    sort: Literal["usage", "name"] = "usage",
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get tags with usage counts, most used first (or by name)"""
+    stmt = select(Tag)
+    if sort == "usage":
+        stmt = stmt.order_by(Tag.usage_count.desc(), Tag.name)
+    else:
+        stmt = stmt.order_by(Tag.name)
+    stmt = stmt.offset(offset)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+
+    tags = (await db.scalars(stmt)).all()
+    return [
+        TagResponse(
             id=str(tag.id),
             name=tag.name,
-            video_count=video_count,
-            scene_count=scene_count,
-            image_count=image_count
-        ))
+            video_count=tag.video_count,
+            scene_count=tag.scene_count,
+            image_count=tag.image_count
+        )
+        for tag in tags
+    ]
 
-    # Sort by total usage (video + scene + image count)
-    result.sort(key=lambda x: x.video_count + x.scene_count + x.image_count, reverse=True)
 
-    return result
+class TagSuggestion(BaseModel):
+    id: str
+    name: str
+    usage_count: int
+
+
+@router.get("/tags/suggest", response_model=List[TagSuggestion])
+async def suggest_tags(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Autocomplete tag names by substring or Hangul initial consonants (e.g. ㅅㄹ -> 사람)"""
+    if tag_suggest_index.ready:
+        matches = tag_suggest_index.suggest(q, limit)
+    else:
+        # Index still loading: plain substring match in SQL
+        pattern = "%" + q.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        rows = await db.execute(
+            select(Tag.id, Tag.name, Tag.usage_count)
+            .where(Tag.name.ilike(pattern))
+            .order_by(Tag.usage_count.desc(), Tag.name)
+            .limit(limit)
+        )
+        matches = rows.all()
+
+    return [TagSuggestion(id=str(tag_id), name=name, usage_count=usage or 0) for tag_id, name, usage in matches]
+
+
+class RelatedTag(BaseModel):
+    id: str
+    name: str
+    score: float
+    count: int  # Scenes and images carrying both tags
+
+
+@router.get("/tags/{tag_id}/related", response_model=List[RelatedTag])
+async def get_related_tags(
+    tag_id: UUID,
+    measure: Literal["pmi", "jaccard"] = "pmi",
+    limit: int = Query(10, ge=1, le=100),
+    min_count: int = Query(2, ge=1),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Tags that most often appear together with a tag (e.g. 바다 -> 해변, 파도)"""
+    if await db.get(Tag, tag_id) is None:
+        raise HTTPException(status_code=404, detail="Tag not found")
+
+    related = tag_cooccurrence.related(tag_id, limit, measure, min_count)
+    if related is None:
+        raise HTTPException(status_code=503, detail="Tag co-occurrence matrix has not been built yet")
+    if not related:
+        return []
+
+    names = dict((await db.execute(select(Tag.id, Tag.name).where(Tag.id.in_([r[0] for r in related])))).all())
+    return [
+        RelatedTag(id=str(other), name=names[other], score=score, count=count)
+        for other, score, count in related if other in names
+    ]
+
+
+@router.post("/tags/reconcile")
+async def reconcile_tags(db: AsyncSession = Depends(get_async_db)):
+    """Recount tag usage counters from the tag associations"""
+    try:
+        fixed = await reconcile_tag_usage(db)
+    except DBAPIError as e:
+        raise HTTPException(status_code=409, detail=f"Tags changed during reconciliation, retry: {e.orig}")
+    return {"message": "Tag usage reconciled", "corrected": fixed}
 
 
-from uuid import UUID
-from fastapi import HTTPException
 
 
 @router.delete("/tags/{tag_id}")
-async def delete_tag(tag_id: UUID, db: Session = Depends(get_db)):
+async def delete_tag(tag_id: UUID, db: AsyncSession = Depends(get_async_db)):
     """Delete a tag and all its associations"""
-    tag = db.query(Tag).filter(Tag.id == tag_id).first()
+    tag = await db.get(Tag, tag_id)
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
 
     # Delete all associations first
-    db.query(VideoTag).filter(VideoTag.tag_id == tag_id).delete()
-    db.query(SceneTag).filter(SceneTag.tag_id == tag_id).delete()
-    db.query(ImageTag).filter(ImageTag.tag_id == tag_id).delete()
+    await db.execute(delete(VideoTag).where(VideoTag.tag_id == tag_id))
+    await db.execute(delete(SceneTag).where(SceneTag.tag_id == tag_id))
+    await db.execute(delete(ImageTag).where(ImageTag.tag_id == tag_id))
 
-    # Delete the tag itself
-    db.delete(tag)
-    db.commit()
+    # Delete the tag itself and drop it from every worker's tag cache
+    await db.delete(tag)
+    await announce_tag_changes(db, "delete", [(tag.id, tag.name)])
+    await db.commit()
+    tag_cache.discard(tag_id=tag.id, name=tag.name)
 
     return {"message": "Tag deleted", "tag_id": str(tag_id), "tag_name": tag.name}
+
+
+class SimilarItem(BaseModel):
+    kind: str  # "image" or "scene"
+    id: str
+    distance: int
+    thumbnail_path: Optional[str]
+    filename: Optional[str] = None
+    video_id: Optional[str] = None
+    start_time: Optional[float] = None
+    end_time: Optional[float] = None
+
+
+class SimilarResponse(BaseModel):
+    id: str
+    kind: str
+    items: List[SimilarItem]
+
+
+@router.get("/similar/{item_id}", response_model=SimilarResponse)
+async def get_similar(item_id: UUID, max_distance: Optional[int] = None, limit: int = 20, db: AsyncSession = Depends(get_async_db)):
+    """Find near-duplicate images and scenes of an image or scene"""
+    image = await db.get(Image, item_id)
+    if image:
+        kind, item, source_path = "image", image, image.file_path
+    else:
+        scene = await db.get(Scene, item_id)
+        if not scene:
+            raise HTTPException(status_code=404, detail="Image or scene not found")
+        kind, item, source_path = "scene", scene, scene.thumbnail_path
+
+    if item.phash is None:
+        # Items stored before hashing existed get their fingerprint on first lookup
+        fingerprint = None
+        if source_path and os.path.exists(source_path):
+            fingerprint = await media_executor.run_blocking("image", compute_dhash, source_path)
+        if fingerprint is None:
+            raise HTTPException(status_code=404, detail="No fingerprint available for this item")
+        item.phash = to_signed64(fingerprint)
+        await db.commit()
+        similarity_index.add(kind, item.id, fingerprint)
+    else:
+        fingerprint = from_signed64(item.phash)
+
+    await similarity_index.ensure_loaded(db)
+    if max_distance is None:
+        max_distance = settings.similar_max_distance
+    matches = [m for m in similarity_index.find(fingerprint, max_distance) if m[2] != item_id][:limit]
+
+    image_ids = [m[2] for m in matches if m[1] == "image"]
+    scene_ids = [m[2] for m in matches if m[1] == "scene"]
+    images = {i.id: i for i in (await db.scalars(select(Image).where(Image.id.in_(image_ids)))).all()} if image_ids else {}
+    scenes = {s.id: s for s in (await db.scalars(select(Scene).where(Scene.id.in_(scene_ids)))).all()} if scene_ids else {}
+
+    items = []
+    for distance, match_kind, match_id in matches:
+        if match_kind == "image" and match_id in images:
+            match = images[match_id]
+            items.append(SimilarItem(
+                kind="image",
+                id=str(match.id),
+                distance=distance,
+                thumbnail_path=match.thumbnail_path,
+                filename=match.filename
+            ))
+        elif match_kind == "scene" and match_id in scenes:
+            match = scenes[match_id]
+            items.append(SimilarItem(
+                kind="scene",
+                id=str(match.id),
+                distance=distance,
+                thumbnail_path=match.thumbnail_path,
+                video_id=str(match.video_id),
+                start_time=match.start_time,
+                end_time=match.end_time
+            ))
+
+    return SimilarResponse(id=str(item_id), kind=kind, items=items)
+
+
+class SemanticItem(BaseModel):
+    kind: str  # "image" or "scene"
+    id: str
+    score: float  # Cosine similarity, 1.0 = same meaning
+    thumbnail_path: Optional[str]
+    filename: Optional[str] = None
+    video_id: Optional[str] = None
+    start_time: Optional[float] = None
+    end_time: Optional[float] = None
+
+
+class SemanticResponse(BaseModel):
+    model: str
+    items: List[SemanticItem]
+
+
+def _semantic_kinds(target: List[str]) -> List[str]:
+    kinds = [kind for kind in ("scene", "image") if f"{kind}s" in target]
+    if not kinds:
+        raise HTTPException(status_code=400, detail="target must include scenes and/or images")
+    return kinds
+
+
+async def _semantic_items(matches, limit: int, db: AsyncSession) -> List[SemanticItem]:
+    """Hydrate (score, kind, id) matches, dropping items deleted since they were indexed"""
+    image_ids = [m[2] for m in matches if m[1] == "image"]
+    scene_ids = [m[2] for m in matches if m[1] == "scene"]
+    images = {i.id: i for i in (await db.scalars(select(Image).where(Image.id.in_(image_ids)))).all()} if image_ids else {}
+    scenes = {s.id: s for s in (await db.scalars(select(Scene).where(Scene.id.in_(scene_ids)))).all()} if scene_ids else {}
+
+    items = []
+    for score, kind, item_id in matches:
+        if kind == "image" and item_id in images:
+            match = images[item_id]
+            items.append(SemanticItem(
+                kind="image", id=str(match.id), score=score,
+                thumbnail_path=match.thumbnail_path, filename=match.filename
+            ))
+        elif kind == "scene" and item_id in scenes:
+            match = scenes[item_id]
+            items.append(SemanticItem(
+                kind="scene", id=str(match.id), score=score, thumbnail_path=match.thumbnail_path,
+                video_id=str(match.video_id), start_time=match.start_time, end_time=match.end_time
+            ))
+    return items[:limit]
+
+
+@router.get("/semantic", response_model=SemanticResponse)
+async def semantic_search(
+    q: str = Query(..., min_length=1),
+    target: List[str] = Query(["scenes", "images"]),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Find scenes and images whose tags and descriptions mean the same as the query (e.g. 자동차 ~ 차량)"""
+    kinds = _semantic_kinds(target)
+    try:
+        vector = (await embed_texts([q]))[0]
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Embedding failed: {e}")
+
+    await embedding_index.sync(db)
+    # Over-fetch a little to make up for items deleted by other workers
+    matches = embedding_index.search(vector, limit + 10, kinds)
+    return SemanticResponse(model=settings.embedding_model, items=await _semantic_items(matches, limit, db))
+
+
+@router.get("/semantic/similar/{item_id}", response_model=SemanticResponse)
+async def semantic_similar(
+    item_id: UUID,
+    target: List[str] = Query(["scenes", "images"]),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Find scenes and images semantically similar to a scene or image"""
+    kinds = _semantic_kinds(target)
+    kind = "image" if await db.get(Image, item_id) else "scene" if await db.get(Scene, item_id) else None
+    if kind is None:
+        raise HTTPException(status_code=404, detail="Image or scene not found")
+
+    await embedding_index.sync(db)
+    vector = embedding_index.get(kind, item_id)
+    if vector is None:
+        raise HTTPException(status_code=404, detail="This item has not been embedded yet")
+
+    matches = [m for m in embedding_index.search(vector, limit + 11, kinds) if m[2] != item_id]
+    return SemanticResponse(model=settings.embedding_model, items=await _semantic_items(matches, limit, db))
@@ -1,19 +1,32 @@
 import os
 import uuid
 import aiofiles
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Request
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Request, Header, Response, Query
 from fastapi.responses import FileResponse, StreamingResponse
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy import select, inspect
+from sqlalchemy.orm import selectinload, noload
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from typing import List, Literal, Optional
 from uuid import UUID
+from pydantic import BaseModel
 
 from app.config import get_settings
-from app.models.database import get_db
+from app.models.database import get_async_db
 from app.models.video import Video
 from app.models.tag import Tag, VideoTag
 from app.schemas.video import VideoResponse, VideoUpdate, TagResponse
+from app.schemas.batch import BatchRequest, BatchResponse, build_batch_response, check_batch_fields
 from app.utils.video_processor import video_processor
+from app.utils.file_storage import save_upload_file
 from app.services.tagging_service import tagging_service
+from app.services.similarity_index import similarity_index
+from app.services.embedding_index import embedding_index
+from app.services.resumable_upload import resumable_upload_store, UploadError
+from app.services.tag_store import upsert_tags, add_tag_links
+from app.services.scene_timeline import fetch_timeline, timeline_rows, timeline_columns
+from app.services.scene_interval_index import scene_interval_index
+from app.utils.pagination import fetch_keyset_page
 
 router = APIRouter()
 settings = get_settings()
@@ -21,24 +34,28 @@ settings = get_settings()
 ALLOWED_EXTENSIONS = {'.mp4', '.mov', '.avi', '.mkv', '.webm', '.wmv', '.flv'}
 
 
-def video_to_response(video: Video, db: Session) -> dict:
+# Tag links and their tags, loaded in one query each for a whole page of videos
+VIDEO_TAGS = selectinload(Video.tags).selectinload(VideoTag.tag)
+
+# Fields of video_to_response, for batch field selection
+VIDEO_FIELDS = frozenset(VideoResponse.model_fields)
+
+
+async def video_to_response(video: Video, db: AsyncSession) -> dict:
     """Convert Video model to response dict with resolved tags"""
-    from app.models.scene import Scene
+    if "tags" in inspect(video).unloaded:
+        # Videos not loaded with VIDEO_TAGS: read the links as plain rows, since
+        # touching video.tags would lazy-load, which async sessions cannot do
+        rows = (await db.execute(
+            select(Tag.id, Tag.name, VideoTag.confidence)
+            .join(VideoTag, VideoTag.tag_id == Tag.id)
+            .where(VideoTag.video_id == video.id)
+            .order_by(VideoTag.created_at)
+        )).all()
+    else:
+        rows = [(video_tag.tag.id, video_tag.tag.name, video_tag.confidence) for video_tag in video.tags]
 
-    # Get tag names for this video
-    tags = []
-    for video_tag in video.tags:
-        tag = db.query(Tag).filter(Tag.id == video_tag.tag_id).first()
-        if tag:
-            tags.append(TagResponse(
-                id=tag.id,
-                name=tag.name,
-                confidence=video_tag.confidence
-            ))
-
-    # Get the first scene's thumbnail as the video thumbnail
-    first_scene = db.query(Scene).filter(Scene.video_id == video.id).order_by(Scene.start_time).first()
-    thumbnail_path = first_scene.thumbnail_path if first_scene else None
+    tags = [TagResponse(id=tag_id, name=name, confidence=confidence) for tag_id, name, confidence in rows]
 
     return {
         "id": video.id,
@@ -47,7 +64,7 @@ def video_to_response(video: Video, db: Session) -> dict:
         "summary": video.summary,
         "user_notes": video.user_notes,
         "file_path": video.file_path,
-        "thumbnail_path": thumbnail_path,
+        "thumbnail_path": video.poster_path,
         "duration": video.duration,
         "file_size": video.file_size,
         "status": video.status,
@@ -62,39 +79,37 @@ def get_video_path(filename: str) -> str:
     return os.path.join(settings.storage_path, "videos", filename)
 
 
-@router.post("/upload", response_model=VideoResponse)
-async def upload_video(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    """Upload a video file"""
-    # Validate file extension
-    _, ext = os.path.splitext(file.filename)
+def validate_video_extension(filename: str) -> str:
+    """Return the lowercased extension or raise if the file type is not allowed"""
+    _, ext = os.path.splitext(filename)
     if ext.lower() not in ALLOWED_EXTENSIONS:
         raise HTTPException(
             status_code=400,
             detail=f"File type not allowed. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"
         )
-
-    # Generate unique filename
-    unique_id = uuid.uuid4()
-    unique_filename = f"{unique_id}{ext.lower()}"
-    file_path = get_video_path(unique_filename)
-
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-
-    # Save file
-    try:
-        file_size = 0
-        async with aiofiles.open(file_path, 'wb') as out_file:
-            while content := await file.read(1024 * 1024):  # Read 1MB chunks
-                await out_file.write(content)
-                file_size += len(content)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
+    return ext.lower()
+
+
+async def register_video_file(
+    video_id: UUID,
+    filename: str,
+    file_path: str,
+    file_size: int,
+    content_hash: str,
+    db: AsyncSession
+) -> dict:
+    """Extract metadata and create the Video record for a stored upload"""
+    # Identical content already uploaded - link to the existing record
+    existing = await db.scalar(select(Video).where(Video.content_hash == content_hash))
+    if existing:
+        os.remove(file_path)
+        print(f"Duplicate upload of {filename}, linking to existing video {existing.id}")
+        return await video_to_response(existing, db)
 
     # Extract video duration using FFmpeg
     duration = None
     try:
-        duration = int(video_processor.get_duration(file_path))
+        duration = int(await video_processor.get_duration(file_path))
     except Exception as e:
         # Log error but continue - duration is optional
         print(f"Warning: Could not extract video duration: {e}")
@@ -102,39 +117,165 @@ async def upload_video(file: UploadFile = File(...), db: Session = Depends(get_d
     # Create database record
     try:
         video = Video(
-            id=unique_id,
-            filename=file.filename,
+            id=video_id,
+            filename=filename,
             file_path=file_path,
             file_size=file_size,
+            content_hash=content_hash,
             duration=duration,
             status="uploaded"
         )
         db.add(video)
-        db.commit()
-        db.refresh(video)
+        await db.commit()
+        await db.refresh(video)
+    except IntegrityError:
+        # A concurrent upload of the same content won the race
+        await db.rollback()
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        existing = await db.scalar(select(Video).where(Video.content_hash == content_hash))
+        if not existing:
+            raise HTTPException(status_code=500, detail="Failed to save to database")
+        return await video_to_response(existing, db)
     except Exception as e:
         # Clean up file if DB save fails
         if os.path.exists(file_path):
             os.remove(file_path)
         raise HTTPException(status_code=500, detail=f"Failed to save to database: {str(e)}")
 
-    return video
+    return await video_to_response(video, db)
+
+
+@router.post("/upload", response_model=VideoResponse)
+async def upload_video(file: UploadFile = File(...), db: AsyncSession = Depends(get_async_db)):
+    """Upload a video file"""
+    ext = validate_video_extension(file.filename)
+
+    # Generate unique filename
+    unique_id = uuid.uuid4()
+    unique_filename = f"{unique_id}{ext}"
+    file_path = get_video_path(unique_filename)
+
+    # Ensure directory exists
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+    # Save file (hashed while streaming to disk)
+    try:
+        file_size, content_hash = await save_upload_file(file, file_path)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
+
+    return await register_video_file(unique_id, file.filename, file_path, file_size, content_hash, db)
+
+
+class ResumableUploadCreate(BaseModel):
+    filename: str
+    file_size: int  # bytes
+    chunk_size: Optional[int] = None  # bytes; server default if omitted
+
+
+@router.post("/uploads")
+async def create_resumable_upload(request: ResumableUploadCreate):
+    """Start a resumable upload; chunks may then be sent in parallel and in any order"""
+    validate_video_extension(request.filename)
+    try:
+        return resumable_upload_store.create(request.filename, request.file_size, request.chunk_size)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+
+@router.get("/uploads/{upload_id}")
+async def get_resumable_upload(upload_id: UUID):
+    """Get received and missing chunks of a resumable upload"""
+    try:
+        return resumable_upload_store.status(upload_id)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+
+@router.put("/uploads/{upload_id}/chunks/{index}")
+async def upload_chunk(
+    upload_id: UUID,
+    index: int,
+    request: Request,
+    x_chunk_sha256: str = Header(..., description="SHA-256 hex digest of the chunk body")
+):
+    """Upload one chunk (raw request body) of a resumable upload"""
+    max_size = settings.upload_max_chunk_size
+    data = bytearray()
+    async for part in request.stream():
+        data.extend(part)
+        if len(data) > max_size:
+            raise HTTPException(status_code=413, detail="Chunk too large")
+
+    try:
+        return await resumable_upload_store.write_chunk(upload_id, index, bytes(data), x_chunk_sha256)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+
+@router.post("/uploads/{upload_id}/finalize", response_model=VideoResponse)
+async def finalize_resumable_upload(upload_id: UUID, db: AsyncSession = Depends(get_async_db)):
+    """Assemble a completed resumable upload and create the video record"""
+    try:
+        meta = resumable_upload_store.get_meta(upload_id)
+        ext = validate_video_extension(meta["filename"])
+        file_path = get_video_path(f"{upload_id}{ext}")
+        file_size, content_hash = await resumable_upload_store.complete(upload_id, file_path)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+
+    return await register_video_file(upload_id, meta["filename"], file_path, file_size, content_hash, db)
+
+
+@router.delete("/uploads/{upload_id}")
+async def abort_resumable_upload(upload_id: UUID):
+    """Abort a resumable upload and discard received chunks"""
+    try:
+        resumable_upload_store.get_meta(upload_id)
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
+    resumable_upload_store.discard(upload_id)
+    return {"message": "Upload aborted", "upload_id": str(upload_id)}
 
 
 @router.get("", response_model=List[VideoResponse])
-async def get_videos(db: Session = Depends(get_db)):
-    """Get list of all videos"""
-    videos = db.query(Video).order_by(Video.created_at.desc()).all()
-    return [video_to_response(v, db) for v in videos]
+async def get_videos(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get list of videos, newest first; with limit, the next page cursor is sent in X-Next-Cursor"""
+    try:
+        videos, next_cursor = await fetch_keyset_page(db, Video, select(Video).options(VIDEO_TAGS), limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [await video_to_response(v, db) for v in videos]
 
 
 @router.get("/{video_id}", response_model=VideoResponse)
-async def get_video(video_id: UUID, db: Session = Depends(get_db)):
+async def get_video(video_id: UUID, db: AsyncSession = Depends(get_async_db)):
     """Get video details"""
-    video = db.query(Video).filter(Video.id == video_id).first()
+    video = await db.get(Video, video_id)
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
-    return video_to_response(video, db)
+    return await video_to_response(video, db)
+
+
+@router.post("/batch", response_model=BatchResponse)
+async def get_videos_batch(request: BatchRequest, db: AsyncSession = Depends(get_async_db)):
+    """Get many videos by id with tags in a constant number of queries"""
+    try:
+        check_batch_fields(request, VIDEO_FIELDS)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    tags = VIDEO_TAGS if request.fields is None or "tags" in request.fields else noload(Video.tags)
+    videos = (await db.scalars(select(Video).where(Video.id.in_(request.ids)).options(tags))).all()
+    items = {video.id: await video_to_response(video, db) for video in videos}
+    return build_batch_response(request, items)
 
 
 def parse_hashtags(text: str) -> list[str]:
@@ -146,52 +287,26 @@ def parse_hashtags(text: str) -> list[str]:
     return list(set(matches))  # Remove duplicates
 
 
-def add_user_tags(video_id: UUID, tag_names: list[str], db: Session) -> None:
+async def add_user_tags(video_id: UUID, tag_names: list[str], db: AsyncSession) -> None:
     """Add user-defined tags to a video and all its scenes"""
     from app.models.scene import Scene
     from app.models.tag import SceneTag
 
     # Get all scenes for this video
-    scenes = db.query(Scene).filter(Scene.video_id == video_id).all()
-
-    for tag_name in tag_names:
-        tag_name = tag_name.strip()
-        if not tag_name:
-            continue
-
-        # Find or create tag
-        tag = db.query(Tag).filter(Tag.name == tag_name).first()
-        if not tag:
-            tag = Tag(name=tag_name)
-            db.add(tag)
-            db.flush()
-
-        # Add to video tags
-        existing_video_tag = db.query(VideoTag).filter(
-            VideoTag.video_id == video_id,
-            VideoTag.tag_id == tag.id
-        ).first()
-
-        if not existing_video_tag:
-            video_tag = VideoTag(video_id=video_id, tag_id=tag.id, confidence=1.0)
-            db.add(video_tag)
-
-        # Add to all scene tags
-        for scene in scenes:
-            existing_scene_tag = db.query(SceneTag).filter(
-                SceneTag.scene_id == scene.id,
-                SceneTag.tag_id == tag.id
-            ).first()
-
-            if not existing_scene_tag:
-                scene_tag = SceneTag(scene_id=scene.id, tag_id=tag.id, confidence=1.0)
-                db.add(scene_tag)
+    scene_ids = (await db.scalars(select(Scene.id).where(Scene.video_id == video_id))).all()
 
+    tag_ids = await upsert_tags(tag_names, db)
+    await add_tag_links(VideoTag, [(video_id, tag_id, 1.0) for tag_id in tag_ids.values()], db)
+    await add_tag_links(
+        SceneTag,
+        [(scene_id, tag_id, 1.0) for scene_id in scene_ids for tag_id in tag_ids.values()],
+        db
+    )
 
 @router.put("/{video_id}", response_model=VideoResponse)
-async def update_video(video_id: UUID, video_update: VideoUpdate, db: Session = Depends(get_db)):
+async def update_video(video_id: UUID, video_update: VideoUpdate, db: AsyncSession = Depends(get_async_db)):
     """Update video metadata and parse user-defined tags"""
-    video = db.query(Video).filter(Video.id == video_id).first()
+    video = await db.get(Video, video_id)
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
 
@@ -203,17 +318,17 @@ async def update_video(video_id: UUID, video_update: VideoUpdate, db: Session =
     if video.user_notes:
         hashtags = parse_hashtags(video.user_notes)
         if hashtags:
-            add_user_tags(video.id, hashtags, db)
+            await add_user_tags(video.id, hashtags, db)
 
-    db.commit()
-    db.refresh(video)
-    return video_to_response(video, db)
+    await db.commit()
+    await db.refresh(video)
+    return await video_to_response(video, db)
 
 
 @router.delete("/{video_id}")
-async def delete_video(video_id: UUID, db: Session = Depends(get_db)):
+async def delete_video(video_id: UUID, db: AsyncSession = Depends(get_async_db)):
     """Delete a video"""
-    video = db.query(Video).filter(Video.id == video_id).first()
+    video = await db.get(Video, video_id)
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
 
@@ -221,17 +336,24 @@ async def delete_video(video_id: UUID, db: Session = Depends(get_db)):
     if os.path.exists(video.file_path):
         os.remove(video.file_path)
 
+    from app.models.scene import Scene
+    scene_ids = (await db.scalars(select(Scene.id).where(Scene.video_id == video_id))).all()
+
     # Delete from database
-    db.delete(video)
-    db.commit()
+    await db.delete(video)
+    await db.commit()
+
+    for scene_id in scene_ids:
+        similarity_index.remove("scene", scene_id)
+        embedding_index.remove("scene", scene_id)
 
     return {"message": "Video deleted", "video_id": str(video_id)}
 
 
 @router.post("/{video_id}/tagging/start")
-async def start_tagging(video_id: UUID, db: Session = Depends(get_db)):
+async def start_tagging(video_id: UUID, db: AsyncSession = Depends(get_async_db)):
     """Start tagging process for a video"""
-    video = db.query(Video).filter(Video.id == video_id).first()
+    video = await db.get(Video, video_id)
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
 
@@ -242,9 +364,9 @@ async def start_tagging(video_id: UUID, db: Session = Depends(get_db)):
 
 
 @router.get("/{video_id}/tagging/status")
-async def get_tagging_status(video_id: UUID, db: Session = Depends(get_db)):
+async def get_tagging_status(video_id: UUID, db: AsyncSession = Depends(get_async_db)):
     """Get tagging status"""
-    video = db.query(Video).filter(Video.id == video_id).first()
+    video = await db.get(Video, video_id)
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
 
@@ -252,72 +374,70 @@ async def get_tagging_status(video_id: UUID, db: Session = Depends(get_db)):
 
 
 @router.get("/{video_id}/scenes")
-async def get_video_scenes(video_id: UUID, db: Session = Depends(get_db)):
-    """Get scenes for a video with tags including confidence values"""
-    from app.models.scene import Scene
-    from app.models.tag import SceneTag
-
-    video = db.query(Video).filter(Video.id == video_id).first()
-    if not video:
+async def get_video_scenes(
+    video_id: UUID,
+    format: Literal["rows", "columnar"] = "rows",
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get scenes for a video with tags including confidence values; format=columnar returns parallel arrays"""
+    scenes = await fetch_timeline(video_id, db)
+    if not scenes and await db.get(Video, video_id) is None:
         raise HTTPException(status_code=404, detail="Video not found")
 
-    # Query scenes explicitly ordered by start_time to ensure chronological order
-    scenes = db.query(Scene).filter(Scene.video_id == video_id).order_by(Scene.start_time).all()
-
-    scenes_with_tags = []
-    for scene in scenes:
-        # Get tags for this scene with confidence values
-        scene_tag_entries = db.query(SceneTag, Tag).join(Tag).filter(
-            SceneTag.scene_id == scene.id
-        ).all()
-
-        tags_list = []
-        for scene_tag, tag in scene_tag_entries:
-            tags_list.append({
-                "id": str(tag.id),
-                "name": tag.name,
-                "confidence": scene_tag.confidence
-            })
-
-        scenes_with_tags.append({
-            "id": str(scene.id),
-            "video_id": str(scene.video_id),
-            "start_time": scene.start_time,
-            "end_time": scene.end_time,
-            "thumbnail_path": scene.thumbnail_path,
-            "clip_path": scene.clip_path,
-            "user_notes": scene.user_notes,
-            "created_at": scene.created_at.isoformat() if scene.created_at else None,
-            "tags": tags_list
-        })
-
-    return {"video_id": str(video_id), "scenes": scenes_with_tags}
+    if format == "columnar":
+        return {"video_id": str(video_id), "format": "columnar", **timeline_columns(scenes)}
+    return {"video_id": str(video_id), "scenes": timeline_rows(scenes)}
+
+
+@router.get("/{video_id}/scenes/at")
+async def get_scenes_at(
+    video_id: UUID,
+    t: float = Query(..., ge=0, description="Playback position in seconds"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get the scene(s) playing at time t, with tags"""
+    intervals = await scene_interval_index.get(video_id, db)
+    if not len(intervals) and await db.get(Video, video_id) is None:
+        raise HTTPException(status_code=404, detail="Video not found")
+    return {"video_id": str(video_id), "t": t, "scenes": intervals.at(t)}
+
+
+@router.get("/{video_id}/scenes/range")
+async def get_scenes_in_range(
+    video_id: UUID,
+    start: float = Query(..., ge=0),
+    end: float = Query(..., ge=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Get scenes overlapping [start, end) seconds, with tags"""
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    intervals = await scene_interval_index.get(video_id, db)
+    if not len(intervals) and await db.get(Video, video_id) is None:
+        raise HTTPException(status_code=404, detail="Video not found")
+    return {"video_id": str(video_id), "start": start, "end": end, "scenes": intervals.between(start, end)}
 
 
 @router.get("/{video_id}/thumbnail")
-async def get_video_thumbnail(video_id: UUID, db: Session = Depends(get_db)):
+async def get_video_thumbnail(video_id: UUID, db: AsyncSession = Depends(get_async_db)):
     """Get video thumbnail (first scene's thumbnail)"""
-    from app.models.scene import Scene
-
-    video = db.query(Video).filter(Video.id == video_id).first()
+    video = await db.get(Video, video_id)
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
 
-    # Get first scene's thumbnail
-    first_scene = db.query(Scene).filter(Scene.video_id == video_id).order_by(Scene.start_time).first()
-    if not first_scene or not first_scene.thumbnail_path:
+    if not video.poster_path:
         raise HTTPException(status_code=404, detail="Thumbnail not found")
 
-    if not os.path.exists(first_scene.thumbnail_path):
+    if not os.path.exists(video.poster_path):
         raise HTTPException(status_code=404, detail="Thumbnail file not found")
 
-    return FileResponse(first_scene.thumbnail_path, media_type="image/jpeg")
+    return FileResponse(video.poster_path, media_type="image/jpeg")
 
 
 @router.get("/{video_id}/stream")
-async def stream_video(video_id: UUID, request: Request, db: Session = Depends(get_db)):
+async def stream_video(video_id: UUID, request: Request, db: AsyncSession = Depends(get_async_db)):
     """Stream video file with range request support"""
-    video = db.query(Video).filter(Video.id == video_id).first()
+    video = await db.get(Video, video_id)
     if not video:
         raise HTTPException(status_code=404, detail="Video not found")
 
@@ -1,17 +1,80 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import get_settings
 from app.api.routes import videos, scenes, images, search, external
+from app.models.database import async_engine, AsyncSessionLocal
+from app.utils.media_executor import media_executor
+from app.services.db_events import db_events
+from app.services.tag_cache import tag_cache
+from app.services.search_cache import search_cache, fold_search_version
+from app.services.tag_bitmap_index import tag_bitmap_index
+from app.services.tag_store import reconcile_tag_usage, fold_tag_usage
+from app.services.resumable_upload import resumable_upload_store
+from app.services.tag_suggest import tag_suggest_index
+from app.services.tag_cooccurrence import tag_cooccurrence
+from app.services.embedding_index import embedding_index, backfill_embeddings
+from app.services.scene_interval_index import scene_interval_index
+from app.utils.periodic import periodic_tasks
 
 settings = get_settings()
 
+
+async def sweep_resumable_uploads_job():
+    removed = resumable_upload_store.sweep_expired()
+    if removed:
+        print(f"Discarded {removed} expired resumable uploads")
+
+
+async def fold_tag_usage_job():
+    async with AsyncSessionLocal() as db:
+        await fold_tag_usage(db)
+
+
+async def fold_search_version_job():
+    async with AsyncSessionLocal() as db:
+        await fold_search_version(db)
+
+
+async def reconcile_tag_usage_job():
+    async with AsyncSessionLocal() as db:
+        fixed = await reconcile_tag_usage(db)
+    if fixed:
+        print(f"Reconciled usage counters of {fixed} tags")
+
+
+periodic_tasks.add("reconcile_tag_usage", settings.tag_usage_reconcile_interval, reconcile_tag_usage_job)
+periodic_tasks.add("fold_tag_usage", settings.tag_usage_fold_interval, fold_tag_usage_job)
+periodic_tasks.add("fold_search_version", settings.search_version_fold_interval, fold_search_version_job)
+periodic_tasks.add("refresh_tag_suggest_usage", settings.tag_suggest_refresh_interval, tag_suggest_index.refresh_usage)
+# Also runs shortly after startup; skipped when a recent build already exists
+periodic_tasks.add(
+    "rebuild_tag_cooccurrence", settings.tag_cooccurrence_rebuild_interval, tag_cooccurrence.rebuild_if_stale,
+    first_delay=30
+)
+periodic_tasks.add("backfill_embeddings", settings.embedding_backfill_interval, backfill_embeddings)
+periodic_tasks.add("sweep_resumable_uploads", settings.upload_sweep_interval, sweep_resumable_uploads_job)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await tag_bitmap_index.sync_triggers()
+    await db_events.start()
+    await periodic_tasks.start()
+    yield
+    await periodic_tasks.stop()
+    await db_events.stop()
+    await async_engine.dispose()
+
+
 app = FastAPI(
     title="MediaTagging API",
     description="Video and image tagging and search API",
     version="0.1.0",
     debug=settings.debug,
-    redirect_slashes=False
+    redirect_slashes=False,
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -21,6 +84,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include routers
@@ -39,3 +103,23 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/health/media")
+async def media_health():
+    """Media executor concurrency limits, queue depth and timings"""
+    return media_executor.metrics()
+
+
+@app.get("/health/caches")
+async def cache_health():
+    """Process-local cache sizes and hit rates"""
+    return {
+        "tags": tag_cache.stats(),
+        "search": search_cache.stats(),
+        "tag_bitmap_index": tag_bitmap_index.stats(),
+        "tag_suggest_index": tag_suggest_index.stats(),
+        "tag_cooccurrence": tag_cooccurrence.stats(),
+        "embedding_index": embedding_index.stats(),
+        "scene_interval_index": scene_interval_index.stats(),
+    }
@@ -2,6 +2,7 @@ from app.models.database import Base, engine
 from app.models.video import Video
 from app.models.scene import Scene
 from app.models.image import Image
-from app.models.tag import Tag, VideoTag, SceneTag, ImageTag
+from app.models.tag import Tag, TagUsageDelta, VideoTag, SceneTag, ImageTag
+from app.models.search_version import SearchVersion, SearchVersionLog
 
-__all__ = ["Base", "engine", "Video", "Scene", "Image", "Tag", "VideoTag", "SceneTag", "ImageTag"]
+__all__ = ["Base", "engine", "Video", "Scene", "Image", "Tag", "TagUsageDelta", "VideoTag", "SceneTag", "ImageTag", "SearchVersion", "SearchVersionLog"]
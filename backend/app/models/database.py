@@ -1,22 +1,48 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from typing import Generator
+from typing import AsyncGenerator, Generator
 
 from app.config import get_settings
 
 settings = get_settings()
 
+
+def get_async_database_url() -> str:
+    """asyncpg URL for the API; derived from database_url unless set explicitly"""
+    if settings.async_database_url:
+        return settings.async_database_url
+    scheme, _, rest = settings.database_url.partition("://")
+    return f"postgresql+asyncpg://{rest}" if scheme.startswith("postgresql") else settings.database_url
+
+
+# Sync engine - used by Alembic and offline jobs
 engine = create_engine(settings.database_url)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine - used by the FastAPI routes and services
+async_engine = create_async_engine(
+    get_async_database_url(),
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_pre_ping=True
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
 def get_db() -> Generator:
-    """Database session dependency"""
+    """Database session dependency (sync)"""
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """Database session dependency (async)"""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,14 +1,19 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Text, Integer, BigInteger, DateTime
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Text, Integer, BigInteger, DateTime, Index, Computed, LargeBinary
+from sqlalchemy.dialects.postgresql import UUID, ARRAY, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 
 from app.models.database import Base
 
 
 class Image(Base):
     __tablename__ = "images"
+    __table_args__ = (
+        Index("ix_images_created_at_id", "created_at", "id"),  # Keyset pagination
+        Index("ix_images_tag_ids", "tag_ids", postgresql_using="gin"),
+        Index("ix_images_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     filename = Column(String(255), nullable=False)
@@ -20,7 +25,19 @@ class Image(Base):
     width = Column(Integer)  # pixels
     height = Column(Integer)  # pixels
     file_size = Column(BigInteger)  # bytes
+    content_hash = Column(String(64), unique=True, index=True)  # SHA-256 of the file, for upload dedup
+    phash = Column(BigInteger, index=True)  # Perceptual hash (dHash) for near-duplicate lookup
     status = Column(String(50), nullable=False, default="uploaded")
+    tag_ids = Column(ARRAY(UUID(as_uuid=True)), nullable=False, server_default="{}")  # Maintained by the tag_ids triggers
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(user_notes, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'C')",
+        persisted=True
+    )))  # Full-text search over title, notes and AI text
+    embedding = deferred(Column(LargeBinary))  # float32 text embedding (see app/utils/embeddings.py)
+    embedding_model = Column(String(100))  # Model that produced embedding
+    embedded_at = Column(DateTime, index=True)  # Lets workers pick up new vectors incrementally
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -1,22 +1,37 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Float, DateTime, ForeignKey, Text
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Float, BigInteger, DateTime, ForeignKey, Text, Index, Computed, LargeBinary
+from sqlalchemy.dialects.postgresql import UUID, ARRAY, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 
 from app.models.database import Base
 
 
 class Scene(Base):
     __tablename__ = "scenes"
+    __table_args__ = (
+        Index("ix_scenes_created_at_id", "created_at", "id"),  # Keyset pagination
+        Index("ix_scenes_video_id_start_time", "video_id", "start_time"),  # Scenes of a video in order
+        Index("ix_scenes_tag_ids", "tag_ids", postgresql_using="gin"),
+        Index("ix_scenes_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     video_id = Column(UUID(as_uuid=True), ForeignKey("videos.id"), nullable=False)
     start_time = Column(Float, nullable=False)  # seconds
     end_time = Column(Float, nullable=False)  # seconds
     thumbnail_path = Column(String(1000))
+    phash = Column(BigInteger, index=True)  # Perceptual hash (dHash) of the thumbnail
     clip_path = Column(String(1000))
     user_notes = Column(Text)  # User-defined tags in #tag format
+    tag_ids = Column(ARRAY(UUID(as_uuid=True)), nullable=False, server_default="{}")  # Maintained by the tag_ids triggers
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "to_tsvector('simple', coalesce(user_notes, ''))",
+        persisted=True
+    )))  # Full-text search over user notes
+    embedding = deferred(Column(LargeBinary))  # float32 text embedding (see app/utils/embeddings.py)
+    embedding_model = Column(String(100))  # Model that produced embedding
+    embedded_at = Column(DateTime, index=True)  # Lets workers pick up new vectors incrementally
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
     # Relationships
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, BigInteger, Identity
+
+from app.models.database import Base
+
+
+class SearchVersion(Base):
+    """Single-row search version base; the current version adds the size of search_version_log"""
+    __tablename__ = "search_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, server_default="0")
+
+
+class SearchVersionLog(Base):
+    """One row per committed transaction that can change search results; folded into SearchVersion"""
+    __tablename__ = "search_version_log"
+
+    id = Column(BigInteger, Identity(), primary_key=True)
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, String, Float, Integer, BigInteger, DateTime, ForeignKey, UniqueConstraint, Computed, Index, Identity
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
@@ -12,6 +12,11 @@ class Tag(Base):
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String(100), unique=True, nullable=False)
+    # Usage counters; the tag_usage triggers queue deltas in tag_usage_deltas and fold_tag_usage adds them up
+    video_count = Column(Integer, nullable=False, server_default="0")
+    scene_count = Column(Integer, nullable=False, server_default="0")
+    image_count = Column(Integer, nullable=False, server_default="0")
+    usage_count = Column(Integer, Computed("video_count + scene_count + image_count", persisted=True))
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
     # Relationships
@@ -20,8 +25,31 @@ class Tag(Base):
     image_tags = relationship("ImageTag", back_populates="tag", cascade="all, delete-orphan")
 
 
+# Serves /api/search/tags sorted by usage
+Index("ix_tags_usage_count_name", Tag.usage_count.desc(), Tag.name)
+
+
+class TagUsageDelta(Base):
+    """
+    Append-only usage counter changes, one row per tag per association statement.
+
+    Writers only insert here, so concurrent tagging never contends on popular
+    tag rows; fold_tag_usage periodically moves the sums into tags. No
+    foreign key, so inserting takes no lock on tags either; deltas of
+    deleted tags are dropped when folded.
+    """
+    __tablename__ = "tag_usage_deltas"
+
+    id = Column(BigInteger, Identity(), primary_key=True)
+    tag_id = Column(UUID(as_uuid=True), nullable=False)
+    video_count = Column(Integer, nullable=False, server_default="0")
+    scene_count = Column(Integer, nullable=False, server_default="0")
+    image_count = Column(Integer, nullable=False, server_default="0")
+
+
 class VideoTag(Base):
     __tablename__ = "video_tags"
+    __table_args__ = (UniqueConstraint("video_id", "tag_id", name="uq_video_tags_video_id_tag_id"),)
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     video_id = Column(UUID(as_uuid=True), ForeignKey("videos.id"), nullable=False)
@@ -36,11 +64,13 @@ class VideoTag(Base):
 
 class SceneTag(Base):
     __tablename__ = "scene_tags"
+    __table_args__ = (UniqueConstraint("scene_id", "tag_id", name="uq_scene_tags_scene_id_tag_id"),)
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     scene_id = Column(UUID(as_uuid=True), ForeignKey("scenes.id"), nullable=False)
     tag_id = Column(UUID(as_uuid=True), ForeignKey("tags.id"), nullable=False)
     confidence = Column(Float)
+    source = Column(String(50))  # "propagated" when copied from a near-identical scene or image
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
     # Relationships
@@ -50,11 +80,13 @@ class SceneTag(Base):
 
 class ImageTag(Base):
     __tablename__ = "image_tags"
+    __table_args__ = (UniqueConstraint("image_id", "tag_id", name="uq_image_tags_image_id_tag_id"),)
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     image_id = Column(UUID(as_uuid=True), ForeignKey("images.id"), nullable=False)
     tag_id = Column(UUID(as_uuid=True), ForeignKey("tags.id"), nullable=False)
     confidence = Column(Float)
+    source = Column(String(50))  # "propagated" when copied from a near-duplicate
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
     # Relationships
@@ -1,14 +1,19 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, Text, Integer, BigInteger, DateTime
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Text, Integer, BigInteger, DateTime, Index, Computed
+from sqlalchemy.dialects.postgresql import UUID, ARRAY, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 
 from app.models.database import Base
 
 
 class Video(Base):
     __tablename__ = "videos"
+    __table_args__ = (
+        Index("ix_videos_created_at_id", "created_at", "id"),  # Keyset pagination
+        Index("ix_videos_tag_ids", "tag_ids", postgresql_using="gin"),
+        Index("ix_videos_search_vector", "search_vector", postgresql_using="gin"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     filename = Column(String(255), nullable=False)
@@ -16,9 +21,18 @@ class Video(Base):
     summary = Column(Text)
     user_notes = Column(Text)
     file_path = Column(String(1000), nullable=False)
+    poster_path = Column(String(1000))  # First scene's thumbnail; maintained by the video_poster triggers
     duration = Column(Integer)  # seconds
     file_size = Column(BigInteger)  # bytes
+    content_hash = Column(String(64), unique=True, index=True)  # SHA-256 of the file, for upload dedup
     status = Column(String(50), nullable=False, default="uploaded")
+    tag_ids = Column(ARRAY(UUID(as_uuid=True)), nullable=False, server_default="{}")  # Maintained by the tag_ids triggers
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(user_notes, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(summary, '')), 'C')",
+        persisted=True
+    )))  # Full-text search over title, notes and AI text
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
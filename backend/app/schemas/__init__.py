@@ -1,9 +1,11 @@
 from app.schemas.video import VideoCreate, VideoUpdate, VideoResponse
 from app.schemas.scene import SceneResponse
 from app.schemas.search import SearchQuery, SearchResponse
+from app.schemas.batch import BatchRequest, BatchResponse
 
 __all__ = [
     "VideoCreate", "VideoUpdate", "VideoResponse",
     "SceneResponse",
-    "SearchQuery", "SearchResponse"
+    "SearchQuery", "SearchResponse",
+    "BatchRequest", "BatchResponse"
 ]
@@ -0,0 +1,57 @@
+from pydantic import BaseModel, Field
+from typing import Any, Collection, Dict, List, Optional
+from uuid import UUID
+
+# Largest number of ids accepted by the /batch endpoints
+BATCH_MAX_IDS = 500
+
+
+class BatchRequest(BaseModel):
+    ids: List[UUID] = Field(..., min_length=1, max_length=BATCH_MAX_IDS)
+    fields: Optional[List[str]] = None  # Sparse field selection; id is always included. None returns every field
+
+
+class BatchResponse(BaseModel):
+    items: List[Dict[str, Any]]  # In request order, duplicates removed
+    missing: List[UUID] = []  # Requested ids that do not exist
+
+
+def check_batch_fields(request: BatchRequest, allowed: Collection[str]) -> None:
+    """
+    Reject unknown sparse fields before anything is fetched.
+
+    Args:
+        request: Batch request with optional fields
+        allowed: Field names the endpoint's items have
+
+    Raises:
+        ValueError: If fields names something items do not have
+    """
+    if request.fields is not None:
+        unknown = sorted(set(request.fields) - set(allowed))
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+
+def build_batch_response(request: BatchRequest, items: Dict[UUID, dict]) -> BatchResponse:
+    """
+    Order fetched items as requested and apply sparse field selection.
+
+    Fields must already have been checked with check_batch_fields. Item ids
+    are returned as strings whatever type the endpoint's items use.
+
+    Args:
+        request: Batch request with ids and optional fields
+        items: Full response dicts of the found items, by id
+
+    Returns:
+        BatchResponse with the selected fields of each found item
+    """
+    ordered = list(dict.fromkeys(request.ids))
+    found = [{**items[item_id], "id": str(item_id)} for item_id in ordered if item_id in items]
+
+    if request.fields is not None:
+        keep = ["id"] + [field for field in request.fields if field != "id"]
+        found = [{field: item[field] for field in keep} for item in found]
+
+    return BatchResponse(items=found, missing=[item_id for item_id in ordered if item_id not in items])
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import asyncpg
+from sqlalchemy import select, func
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Callable, Dict, List, Optional
+
+from app.models.database import get_async_database_url
+
+# Seconds to wait before reconnecting after the listener connection is lost
+RECONNECT_DELAY = 5.0
+
+
+def get_listener_dsn() -> str:
+    """Plain postgresql:// DSN for asyncpg, derived from the async database URL"""
+    url = make_url(get_async_database_url()).set(drivername="postgresql")
+    return url.render_as_string(hide_password=False)
+
+
+async def notify(db: AsyncSession, channel: str, *payloads: dict) -> None:
+    """
+    Queue one notification per payload on the current transaction, in one round trip.
+
+    Postgres delivers them to listeners only when the transaction commits,
+    so rolled back changes are never announced.
+    """
+    if payloads:
+        await db.execute(select(*[func.pg_notify(channel, json.dumps(payload)) for payload in payloads]))
+
+
+class DatabaseEvents:
+    """
+    Postgres LISTEN/NOTIFY subscriber shared by the process-local caches.
+
+    A single dedicated asyncpg connection listens on every subscribed channel
+    and reconnects when it drops. Notifications sent while the connection is
+    down are lost, so reset handlers run whenever the connection is
+    established or lost and caches should drop their state there.
+    """
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Callable[[dict], None]]] = {}
+        self._reset_handlers: List[Callable[[], None]] = []
+        self._task: Optional[asyncio.Task] = None
+        self.connected = False
+
+    def subscribe(self, channel: str, handler: Callable[[dict], None]) -> None:
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def on_reset(self, handler: Callable[[], None]) -> None:
+        self._reset_handlers.append(handler)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _reset(self) -> None:
+        for handler in self._reset_handlers:
+            handler()
+
+    def _dispatch(self, connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            print(f"Ignoring malformed notification on {channel}: {payload}")
+            return
+        for handler in self._handlers.get(channel, []):
+            try:
+                handler(event)
+            except Exception as e:
+                print(f"Error handling notification on {channel}: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(get_listener_dsn())
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                for channel in self._handlers:
+                    await connection.add_listener(channel, self._dispatch)
+
+                self.connected = True
+                self._reset()
+                print(f"Listening for database events on {sorted(self._handlers)}")
+                await lost.wait()
+                print("Database event listener connection lost")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Database event listener error: {e}")
+            finally:
+                if self.connected:
+                    self.connected = False
+                    self._reset()
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(RECONNECT_DELAY)
+
+
+db_events = DatabaseEvents()
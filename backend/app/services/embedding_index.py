@@ -0,0 +1,302 @@
+import asyncio
+import numpy as np
+from datetime import datetime, timedelta
+from uuid import UUID
+from sqlalchemy import select, update, func, or_, literal_column
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional, Tuple
+
+from app.config import get_settings
+from app.models.database import AsyncSessionLocal
+from app.models.image import Image
+from app.models.scene import Scene
+from app.models.video import Video
+from app.models.tag import Tag, SceneTag, ImageTag
+from app.utils.embeddings import embed_texts, from_bytes, to_bytes
+
+try:
+    import hnswlib
+except ImportError:  # Optional dependency; brute force is used without it
+    hnswlib = None
+
+settings = get_settings()
+
+# Kind -> (entity, tag association, owner column)
+KINDS = {
+    "scene": (Scene, SceneTag, "scene_id"),
+    "image": (Image, ImageTag, "image_id"),
+}
+
+# Re-read vectors embedded this long before the last one seen, in case a
+# transaction stamped embedded_at earlier but committed later
+SYNC_OVERLAP = timedelta(seconds=60)
+
+# How long a backfill claim on an item lasts; an item whose worker died is
+# claimed again after this
+CLAIM_LEASE = timedelta(minutes=10)
+
+
+class _KindIndex:
+    """Contiguous float32 matrix of unit vectors for one kind, with an optional HNSW graph"""
+
+    def __init__(self):
+        self.dim: Optional[int] = None
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.alive = np.zeros(0, dtype=bool)
+        self.keys: List[Optional[UUID]] = []  # Row -> id; None for removed rows
+        self.rows: Dict[UUID, int] = {}
+        self.hnsw = None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def _reset(self, dim: int) -> None:
+        self.dim = dim
+        self.matrix = np.zeros((1024, dim), dtype=np.float32)
+        self.alive = np.zeros(1024, dtype=bool)
+        self.keys = []
+        self.rows = {}
+        self.hnsw = None
+
+    def upsert(self, item_id: UUID, vector: np.ndarray) -> None:
+        if self.dim != len(vector):
+            # Vectors from another model are not comparable; start over
+            self._reset(len(vector))
+
+        row = self.rows.get(item_id)
+        if row is None:
+            row = len(self.keys)
+            if row >= len(self.matrix):
+                grown = np.zeros((len(self.matrix) * 2, self.dim), dtype=np.float32)
+                grown[:row] = self.matrix[:row]
+                self.matrix = grown
+                self.alive = np.concatenate([self.alive, np.zeros(len(self.alive), dtype=bool)])
+                if self.hnsw is not None:
+                    self.hnsw.resize_index(len(self.matrix))
+            self.keys.append(item_id)
+            self.rows[item_id] = row
+            self.alive[row] = True
+        self.matrix[row] = vector
+
+        if self.hnsw is not None:
+            self.hnsw.add_items(vector[np.newaxis], [row])
+        elif hnswlib is not None and 0 < settings.embedding_hnsw_min_items <= len(self.rows):
+            self._build_hnsw()
+
+    def _build_hnsw(self) -> None:
+        live = np.fromiter(self.rows.values(), dtype=np.int64)
+        self.hnsw = hnswlib.Index(space="cosine", dim=self.dim)
+        self.hnsw.init_index(max_elements=len(self.matrix), ef_construction=200, M=16)
+        self.hnsw.add_items(self.matrix[live], live)
+        print(f"Built HNSW index over {len(live)} vectors")
+
+    def remove(self, item_id: UUID) -> None:
+        row = self.rows.pop(item_id, None)
+        if row is not None:
+            self.keys[row] = None
+            self.alive[row] = False
+            if self.hnsw is not None:
+                self.hnsw.mark_deleted(row)
+
+    def get(self, item_id: UUID) -> Optional[np.ndarray]:
+        row = self.rows.get(item_id)
+        return None if row is None else self.matrix[row].copy()
+
+    def search(self, vector: np.ndarray, k: int) -> List[Tuple[float, UUID]]:
+        """(cosine similarity, id) of the k nearest vectors, most similar first"""
+        if not self.rows or len(vector) != self.dim:
+            return []
+        k = min(k, len(self.rows))
+
+        if self.hnsw is not None:
+            self.hnsw.set_ef(max(64, k * 2))
+            labels, distances = self.hnsw.knn_query(vector[np.newaxis], k=k)
+            return [(1.0 - float(d), self.keys[int(r)]) for r, d in zip(labels[0], distances[0])]
+
+        # Brute force: one matrix-vector product over all rows
+        count = len(self.keys)
+        scores = np.where(self.alive[:count], self.matrix[:count] @ vector, -np.inf)
+        top = np.argpartition(-scores, k - 1)[:k] if k < count else np.arange(count)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(float(scores[r]), self.keys[r]) for r in top if self.alive[r]]
+
+
+class EmbeddingIndex:
+    """
+    Process-local nearest-neighbour index over scene and image embeddings.
+
+    Vectors live in the embedding columns; each worker keeps a float32
+    matrix per kind and syncs it incrementally (by embedded_at) before
+    every query, so vectors stored by another worker are picked up. Rows
+    deleted elsewhere may linger in memory; callers drop results that no
+    longer exist in the database.
+    """
+
+    def __init__(self):
+        self._kinds = {kind: _KindIndex() for kind in KINDS}
+        self._synced_to: Optional[datetime] = None
+        self._lock = asyncio.Lock()
+
+    async def sync(self, db: AsyncSession) -> None:
+        """Load vectors embedded since the last sync (everything on first use)"""
+        async with self._lock:
+            newest = self._synced_to
+            for kind, (model, _, _) in KINDS.items():
+                stmt = select(model.id, model.embedding, model.embedded_at).where(
+                    model.embedding_model == settings.embedding_model,
+                    model.embedding.isnot(None)
+                )
+                if self._synced_to is not None:
+                    stmt = stmt.where(model.embedded_at > self._synced_to - SYNC_OVERLAP)
+                for item_id, data, embedded_at in (await db.execute(stmt)).all():
+                    self._kinds[kind].upsert(item_id, from_bytes(data))
+                    if embedded_at and (newest is None or embedded_at > newest):
+                        newest = embedded_at
+            if self._synced_to is None:
+                print(f"Loaded embedding index: { {kind: len(index) for kind, index in self._kinds.items()} }")
+            # Stays None (full load next time) until a vector has been seen
+            self._synced_to = newest
+
+    def add(self, kind: str, item_id: UUID, vector: np.ndarray) -> None:
+        self._kinds[kind].upsert(item_id, vector)
+
+    def remove(self, kind: str, item_id: UUID) -> None:
+        self._kinds[kind].remove(item_id)
+
+    def get(self, kind: str, item_id: UUID) -> Optional[np.ndarray]:
+        return self._kinds[kind].get(item_id)
+
+    def search(self, vector: np.ndarray, k: int, kinds: List[str]) -> List[Tuple[float, str, UUID]]:
+        """(cosine similarity, kind, id) of the k nearest items over the given kinds"""
+        results = [
+            (score, kind, item_id)
+            for kind in kinds
+            for score, item_id in self._kinds[kind].search(vector, k)
+        ]
+        results.sort(key=lambda r: r[0], reverse=True)
+        return results[:k]
+
+    def stats(self) -> dict:
+        return {
+            "model": settings.embedding_model,
+            "items": {kind: len(index) for kind, index in self._kinds.items()},
+            "hnsw": {kind: index.hnsw is not None for kind, index in self._kinds.items()},
+        }
+
+
+async def embedding_texts(kind: str, ids: List[UUID], db: AsyncSession) -> Dict[UUID, str]:
+    """Text embedded for each item: title, tag names, AI description and user notes"""
+    model, association, owner_column = KINDS[kind]
+    tags = func.coalesce(
+        func.string_agg(Tag.name, literal_column("' '")), ""
+    ).label("tags")
+
+    if kind == "scene":
+        columns = [Scene.id, Video.title, Video.filename, tags, Scene.user_notes]
+    else:
+        columns = [Image.id, Image.title, Image.filename, tags, Image.description, Image.user_notes]
+    stmt = (
+        select(*columns)
+        .outerjoin(association, getattr(association, owner_column) == model.id)
+        .outerjoin(Tag, Tag.id == association.tag_id)
+        .where(model.id.in_(ids))
+        .group_by(*[c for c in columns if c is not tags])
+    )
+    if kind == "scene":
+        stmt = stmt.outerjoin(Video, Video.id == Scene.video_id)
+
+    return {
+        row[0]: "\n".join(str(part) for part in row[1:] if part)
+        for row in (await db.execute(stmt)).all()
+    }
+
+
+async def embed_items(kind: str, ids: List[UUID], db: AsyncSession) -> int:
+    """
+    Embed items with the configured model, store the vectors and index them.
+
+    The texts are read and the vectors written in two short transactions;
+    the model call in between runs outside any transaction, so no row lock
+    is held while waiting on it. Returns the number of items embedded.
+    """
+    texts = await embedding_texts(kind, ids, db)
+    await db.commit()
+
+    # Items without any text are marked done with no vector so the backfill moves on
+    blank = [item_id for item_id, text in texts.items() if not text.strip()]
+    texts = {item_id: text for item_id, text in texts.items() if text.strip()}
+    vectors = await embed_texts(list(texts.values())) if texts else []
+
+    model = KINDS[kind][0]
+    now = datetime.utcnow()
+    rows = [
+        {"id": item_id, "embedding": None, "embedding_model": settings.embedding_model, "embedded_at": now}
+        for item_id in blank
+    ] + [
+        {"id": item_id, "embedding": to_bytes(vector), "embedding_model": settings.embedding_model, "embedded_at": now}
+        for item_id, vector in zip(texts, vectors)
+    ]
+    if rows:
+        await db.execute(update(model), rows)
+        await db.commit()
+
+    for item_id, vector in zip(texts, vectors):
+        embedding_index.add(kind, item_id, vector)
+    return len(texts)
+
+
+async def embed_tagged_items(kind: str, ids: List[UUID]) -> None:
+    """Tagging pipeline hook on its own session; failures never fail tagging (the backfill retries)"""
+    try:
+        async with AsyncSessionLocal() as db:
+            count = await embed_items(kind, ids, db)
+        print(f"Embedded {count} {kind}s")
+    except Exception as e:
+        print(f"Error embedding {kind}s: {e}")
+
+
+async def claim_backfill_batch(kind: str, db: AsyncSession) -> List[UUID]:
+    """
+    Claim up to embedding_backfill_batch items without a current vector.
+
+    A claim clears embedding_model and stamps embedded_at, which keeps other
+    workers off the item for CLAIM_LEASE, and commits at once, so no lock
+    outlives this call.
+    """
+    model = KINDS[kind][0]
+    now = datetime.utcnow()
+    # SKIP LOCKED lets workers claiming at the same moment take different rows
+    candidates = (
+        select(model.id)
+        .where(
+            model.embedding_model.is_distinct_from(settings.embedding_model),
+            or_(
+                model.embedding_model.isnot(None),
+                model.embedded_at.is_(None),
+                model.embedded_at < now - CLAIM_LEASE
+            )
+        )
+        .order_by(model.created_at)
+        .limit(settings.embedding_backfill_batch)
+        .with_for_update(skip_locked=True)
+    )
+    ids = (await db.scalars(
+        update(model).where(model.id.in_(candidates))
+        .values(embedding_model=None, embedded_at=now)
+        .returning(model.id)
+    )).all()
+    await db.commit()
+    return list(ids)
+
+
+async def backfill_embeddings() -> None:
+    """Periodic job: embed items without a vector from the current model"""
+    for kind in KINDS:
+        async with AsyncSessionLocal() as db:
+            ids = await claim_backfill_batch(kind, db)
+            if ids:
+                count = await embed_items(kind, ids, db)
+                print(f"Backfilled embeddings for {count} {kind}s")
+
+
+embedding_index = EmbeddingIndex()
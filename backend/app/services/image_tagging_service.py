@@ -1,12 +1,17 @@
 import os
 from uuid import UUID
-from sqlalchemy.orm import Session
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
 
 from app.config import get_settings
 from app.models.image import Image
-from app.models.tag import Tag, ImageTag
+from app.models.tag import ImageTag
 from app.utils.ollama_client import ollama_client
+from app.utils.image_hash import from_signed64
+from app.services.similarity_index import similarity_index
+from app.services.embedding_index import embed_tagged_items
+from app.services.tag_store import tag_entities, add_tag_links
 
 settings = get_settings()
 
@@ -15,9 +20,9 @@ class ImageTaggingService:
     def __init__(self):
         self.ollama = ollama_client
 
-    async def generate_description(self, image_id: UUID, db: Session) -> Optional[str]:
+    async def generate_description(self, image_id: UUID, db: AsyncSession) -> Optional[str]:
         """Generate AI description for an image using vision"""
-        image = db.query(Image).filter(Image.id == image_id).first()
+        image = await db.get(Image, image_id)
         if not image:
             return None
 
@@ -36,15 +41,15 @@ class ImageTaggingService:
         try:
             description = await self.ollama.generate_with_images(prompt, [image.file_path])
             image.description = description.strip()
-            db.commit()
+            await db.commit()
             return image.description
         except Exception as e:
             print(f"Error generating image description: {e}")
             return None
 
-    async def generate_image_tags(self, image_id: UUID, db: Session) -> list[str]:
+    async def generate_image_tags(self, image_id: UUID, db: AsyncSession) -> list[str]:
         """Generate AI tags for an image using vision"""
-        image = db.query(Image).filter(Image.id == image_id).first()
+        image = await db.get(Image, image_id)
         if not image:
             return []
 
@@ -75,60 +80,58 @@ class ImageTaggingService:
                 if cleaned and len(cleaned) < 30 and not cleaned.startswith(('-', '*', '•')):
                     cleaned_tags.append(cleaned)
 
-            created_tags = []
-            for tag_name in cleaned_tags[:15]:
-                tag_name = tag_name.strip()
-                if not tag_name:
-                    continue
-
-                # Find or create tag
-                tag = db.query(Tag).filter(Tag.name == tag_name).first()
-                if not tag:
-                    tag = Tag(name=tag_name)
-                    db.add(tag)
-                    db.flush()
-
-                # Check if image_tag already exists
-                existing = db.query(ImageTag).filter(
-                    ImageTag.image_id == image.id,
-                    ImageTag.tag_id == tag.id
-                ).first()
-
-                if not existing:
-                    image_tag = ImageTag(image_id=image.id, tag_id=tag.id)
-                    db.add(image_tag)
-                    created_tags.append(tag_name)
-
-            db.commit()
+            created_tags = await tag_entities(ImageTag, [image.id], cleaned_tags[:15], db)
+            await db.commit()
             print(f"Generated {len(created_tags)} tags for image: {created_tags}")
             return created_tags
         except Exception as e:
             print(f"Error generating image tags: {e}")
             return []
 
-    async def clear_existing_tags(self, image_id: UUID, db: Session) -> None:
+    async def propagate_image_tags(self, image: Image, kind: str, source_id: UUID, source_tags: list, db: AsyncSession) -> list[str]:
+        """Copy description and AI tags from a near-duplicate instead of running the model"""
+        if kind == "image" and not image.description:
+            source = await db.get(Image, source_id)
+            if source and source.description:
+                image.description = source.description
+
+        inserted = await add_tag_links(
+            ImageTag,
+            [(image.id, tag.id, confidence) for tag, confidence in source_tags],
+            db,
+            source="propagated"
+        )
+        inserted_tag_ids = {tag_id for _, tag_id in inserted}
+        created_tags = [tag.name for tag, _ in source_tags if tag.id in inserted_tag_ids]
+
+        await db.commit()
+        print(f"Propagated {len(created_tags)} tags from {kind} {source_id}: {created_tags}")
+        return created_tags
+
+    async def clear_existing_tags(self, image_id: UUID, db: AsyncSession) -> None:
         """Clear existing AI-generated tags for re-tagging"""
         # Delete image tags (but keep user-defined tags with confidence=1.0)
-        db.query(ImageTag).filter(
+        await db.execute(delete(ImageTag).where(
             ImageTag.image_id == image_id,
             ImageTag.confidence != 1.0
-        ).delete()
-        db.commit()
+        ))
+        await db.commit()
         print(f"Cleared existing AI tags for image {image_id}")
 
-    async def process_image(self, image_id: UUID, db: Session) -> dict:
+    async def process_image(self, image_id: UUID, db: AsyncSession) -> dict:
         """Full tagging process for an image"""
-        image = db.query(Image).filter(Image.id == image_id).first()
+        image = await db.get(Image, image_id)
         if not image:
             return {"error": "Image not found"}
 
         # Clear existing AI-generated tags if re-tagging
-        if image.status == "tagged":
+        retagging = image.status == "tagged"
+        if retagging:
             print(f"Re-tagging image: {image.filename}, clearing existing AI tags...")
             await self.clear_existing_tags(image_id, db)
 
         image.status = "processing"
-        db.commit()
+        await db.commit()
 
         result = {
             "image_id": str(image_id),
@@ -140,6 +143,29 @@ class ImageTaggingService:
         try:
             print(f"=== Starting tagging process for image: {image.filename} ===")
 
+            # Reuse tags from an already-tagged near-duplicate (skipped on explicit re-tagging)
+            duplicate = None
+            if not retagging and image.phash is not None:
+                duplicate = await similarity_index.find_tagged_duplicate(
+                    from_signed64(image.phash),
+                    settings.duplicate_reuse_distance,
+                    db,
+                    exclude={("image", image.id)}
+                )
+
+            if duplicate:
+                kind, source_id, source_tags = duplicate
+                result["tags"] = await self.propagate_image_tags(image, kind, source_id, source_tags, db)
+                result["description"] = image.description
+                result["reused_from"] = {"kind": kind, "id": str(source_id)}
+
+                image.status = "tagged"
+                await db.commit()
+                result["status"] = "tagged"
+                await embed_tagged_items("image", [image_id])
+                print(f"=== Reused tags for image: {image.filename} ===")
+                return result
+
             # Step 1: Generate image description
             print("Step 1: Generating image description...")
             description = await self.generate_description(image_id, db)
@@ -154,9 +180,12 @@ class ImageTaggingService:
 
             # Update status
             image.status = "tagged"
-            db.commit()
+            await db.commit()
             result["status"] = "tagged"
 
+            # Step 3: Embed description and tags for semantic search
+            await embed_tagged_items("image", [image_id])
+
             print(f"=== Tagging complete for image: {image.filename} ===")
 
         except Exception as e:
@@ -164,7 +193,7 @@ class ImageTaggingService:
             import traceback
             traceback.print_exc()
             image.status = "error"
-            db.commit()
+            await db.commit()
             result["status"] = "error"
             result["error"] = str(e)
 
@@ -0,0 +1,230 @@
+import os
+import json
+import fcntl
+import asyncio
+import shutil
+import hashlib
+import uuid
+import time
+import aiofiles
+from contextlib import asynccontextmanager
+from datetime import datetime
+from uuid import UUID
+from typing import Optional, List
+
+from app.config import get_settings
+from app.utils.file_storage import UPLOAD_CHUNK_SIZE, sha256_file
+from app.utils.media_executor import media_executor
+
+settings = get_settings()
+
+
+class UploadError(Exception):
+    """Raised for invalid resumable upload operations; carries an HTTP status code"""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+class ResumableUploadStore:
+    """
+    Disk-backed state for resumable, chunked uploads.
+
+    Each session lives in storage/uploads/{upload_id}/ with a meta.json, a
+    preallocated data.part file that chunks are written into at their
+    offsets, and one marker file per received chunk. Markers make the state
+    safe to update from parallel requests and from several workers. A
+    finalizing marker, created exclusively, lets exactly one request complete
+    a session and makes later chunk writes fail with 409. Chunk writes hold
+    a shared flock on the session's lock file from the marker check until
+    their bytes are written, and complete creates the marker under the
+    exclusive lock, so no chunk can land once finalizing has begun.
+    Sessions idle for upload_session_ttl are removed by sweep_expired.
+    """
+
+    def __init__(self, storage_path: Optional[str] = None):
+        self.root = os.path.join(storage_path or settings.storage_path, "uploads")
+
+    def _session_dir(self, upload_id: UUID) -> str:
+        return os.path.join(self.root, str(upload_id))
+
+    def _data_path(self, upload_id: UUID) -> str:
+        return os.path.join(self._session_dir(upload_id), "data.part")
+
+    def _finalizing_marker(self, upload_id: UUID) -> str:
+        return os.path.join(self._session_dir(upload_id), "finalizing")
+
+    def _lock_path(self, upload_id: UUID) -> str:
+        return os.path.join(self._session_dir(upload_id), "lock")
+
+    @asynccontextmanager
+    async def _session_lock(self, upload_id: UUID, exclusive: bool):
+        """flock the session's lock file; raises FileNotFoundError if the session is gone"""
+        fd = os.open(self._lock_path(upload_id), os.O_RDONLY | os.O_CREAT, 0o644)
+        try:
+            # Waits in a thread, since complete may have to wait for chunks in flight
+            await asyncio.to_thread(fcntl.flock, fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+        finally:
+            os.close(fd)  # Also releases the lock
+
+    def _chunk_marker(self, upload_id: UUID, index: int) -> str:
+        return os.path.join(self._session_dir(upload_id), "chunks", f"{index}.sha256")
+
+    def create(self, filename: str, file_size: int, chunk_size: Optional[int] = None) -> dict:
+        """Create a session and preallocate the target file"""
+        if file_size <= 0:
+            raise UploadError(400, "file_size must be positive")
+
+        chunk_size = chunk_size or settings.upload_chunk_size
+        chunk_size = max(UPLOAD_CHUNK_SIZE, min(chunk_size, settings.upload_max_chunk_size))
+
+        upload_id = uuid.uuid4()
+        session_dir = self._session_dir(upload_id)
+        os.makedirs(os.path.join(session_dir, "chunks"))
+
+        with open(self._data_path(upload_id), "wb") as f:
+            try:
+                os.posix_fallocate(f.fileno(), 0, file_size)
+            except (AttributeError, OSError):
+                f.truncate(file_size)
+
+        meta = {
+            "upload_id": str(upload_id),
+            "filename": filename,
+            "file_size": file_size,
+            "chunk_size": chunk_size,
+            "total_chunks": (file_size + chunk_size - 1) // chunk_size,
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        with open(os.path.join(session_dir, "meta.json"), "w") as f:
+            json.dump(meta, f)
+        return meta
+
+    def get_meta(self, upload_id: UUID) -> dict:
+        meta_path = os.path.join(self._session_dir(upload_id), "meta.json")
+        if not os.path.exists(meta_path):
+            raise UploadError(404, "Upload not found")
+        with open(meta_path) as f:
+            return json.load(f)
+
+    def received_chunks(self, upload_id: UUID) -> List[int]:
+        chunks_dir = os.path.join(self._session_dir(upload_id), "chunks")
+        if not os.path.isdir(chunks_dir):
+            return []
+        return sorted(int(name.split(".")[0]) for name in os.listdir(chunks_dir) if name.endswith(".sha256"))
+
+    def status(self, upload_id: UUID) -> dict:
+        meta = self.get_meta(upload_id)
+        received = self.received_chunks(upload_id)
+        received_set = set(received)
+        meta["received_chunks"] = received
+        meta["missing_chunks"] = [i for i in range(meta["total_chunks"]) if i not in received_set]
+        return meta
+
+    async def write_chunk(self, upload_id: UUID, index: int, data: bytes, checksum: str) -> dict:
+        """Validate a chunk against its SHA-256 and write it at its offset"""
+        meta = self.get_meta(upload_id)
+        if index < 0 or index >= meta["total_chunks"]:
+            raise UploadError(400, f"Chunk index out of range (0-{meta['total_chunks'] - 1})")
+
+        offset = index * meta["chunk_size"]
+        expected_size = min(meta["chunk_size"], meta["file_size"] - offset)
+        if len(data) != expected_size:
+            raise UploadError(400, f"Chunk {index} must be {expected_size} bytes, got {len(data)}")
+
+        digest = hashlib.sha256(data).hexdigest()
+        if digest != checksum.lower():
+            raise UploadError(422, f"Checksum mismatch for chunk {index}")
+
+        try:
+            async with self._session_lock(upload_id, exclusive=False):
+                if os.path.exists(self._finalizing_marker(upload_id)):
+                    raise UploadError(409, "Upload already finalized")
+                async with aiofiles.open(self._data_path(upload_id), "r+b") as f:
+                    await f.seek(offset)
+                    await f.write(data)
+
+                # Write the marker last so a chunk only counts once its bytes are on disk
+                marker = self._chunk_marker(upload_id, index)
+                async with aiofiles.open(f"{marker}.tmp", "w") as f:
+                    await f.write(digest)
+                os.replace(f"{marker}.tmp", marker)
+        except FileNotFoundError:
+            # Finalized (or aborted) while this chunk was in flight
+            raise UploadError(409, "Upload already finalized")
+
+        return {"upload_id": str(upload_id), "index": index, "size": len(data), "sha256": digest}
+
+    async def complete(self, upload_id: UUID, target_path: str) -> tuple[int, str]:
+        """
+        Move a fully received upload to its final path.
+
+        Chunks arrive out of order, so the whole-file SHA-256 is computed in
+        a single sequential pass here, on the media executor.
+
+        Returns:
+            (file size in bytes, SHA-256 hex digest)
+        """
+        meta = self.get_meta(upload_id)
+        missing = self.status(upload_id)["missing_chunks"]
+        if missing:
+            raise UploadError(409, f"Upload incomplete, {len(missing)} chunks missing")
+
+        try:
+            # Waits for chunk writes in flight; later ones see the marker
+            async with self._session_lock(upload_id, exclusive=True):
+                os.close(os.open(self._finalizing_marker(upload_id), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            raise UploadError(409, "Upload already finalized")
+        except FileNotFoundError:
+            raise UploadError(404, "Upload not found")
+
+        data_path = self._data_path(upload_id)
+        try:
+            content_hash = await media_executor.run_blocking("hash", sha256_file, data_path)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            os.replace(data_path, target_path)
+        except BaseException:
+            # Let the client retry finalize
+            if os.path.exists(data_path):
+                os.remove(self._finalizing_marker(upload_id))
+            raise
+        self.discard(upload_id)
+        return meta["file_size"], content_hash
+
+    def sweep_expired(self, ttl: Optional[float] = None) -> int:
+        """
+        Discard sessions with no activity (creation or chunk write) for ttl seconds.
+
+        Returns:
+            Number of sessions removed
+        """
+        ttl = ttl if ttl is not None else settings.upload_session_ttl
+        if not os.path.isdir(self.root):
+            return 0
+
+        cutoff = time.time() - ttl
+        removed = 0
+        for name in os.listdir(self.root):
+            session_dir = os.path.join(self.root, name)
+            try:
+                # Chunk markers are added to chunks/, so its mtime tracks the last write
+                last_active = max(
+                    os.path.getmtime(session_dir),
+                    os.path.getmtime(os.path.join(session_dir, "chunks"))
+                )
+            except OSError:
+                last_active = 0.0
+            if last_active < cutoff:
+                shutil.rmtree(session_dir, ignore_errors=True)
+                removed += 1
+        return removed
+
+    def discard(self, upload_id: UUID) -> None:
+        shutil.rmtree(self._session_dir(upload_id), ignore_errors=True)
+
+
+resumable_upload_store = ResumableUploadStore()
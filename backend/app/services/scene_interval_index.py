@@ -0,0 +1,123 @@
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.config import get_settings
+from app.services.db_events import db_events
+from app.services.scene_timeline import fetch_timeline, timeline_rows
+
+settings = get_settings()
+
+# NOTIFY channel fed by the scene_timeline triggers (see migrations a759e0fe26d4, 5b8844fdf953)
+SCENE_TIMELINE_CHANNEL = "scene_timeline"
+
+
+class SceneIntervals:
+    """
+    Scenes of one video sorted by start time, for O(log n) time lookups.
+
+    Scenes normally tile the video without overlapping, but edits can leave
+    overlaps, so a running maximum of end times tells a backwards scan from
+    the bisect position when no earlier scene can still cover the time.
+    """
+
+    def __init__(self, scenes: List[dict]):
+        self.scenes = scenes
+        self.starts = [scene["start_time"] for scene in scenes]
+        self.max_ends = []
+        max_end = float("-inf")
+        for scene in scenes:
+            max_end = max(max_end, scene["end_time"])
+            self.max_ends.append(max_end)
+
+    def __len__(self) -> int:
+        return len(self.scenes)
+
+    def _overlapping(self, hi: int, after: float) -> List[dict]:
+        """Scenes before position hi that end after the given time, in start order"""
+        found = []
+        i = hi - 1
+        while i >= 0 and self.max_ends[i] > after:
+            if self.scenes[i]["end_time"] > after:
+                found.append(self.scenes[i])
+            i -= 1
+        found.reverse()
+        return found
+
+    def at(self, t: float) -> List[dict]:
+        """Scenes with start_time <= t < end_time"""
+        return self._overlapping(bisect_right(self.starts, t), t)
+
+    def between(self, start: float, end: float) -> List[dict]:
+        """Scenes overlapping [start, end); a zero-length range behaves like at(start)"""
+        if end <= start:
+            return self.at(start)
+        return self._overlapping(bisect_left(self.starts, end), start)
+
+
+class SceneIntervalIndex:
+    """
+    Bounded, process-local LRU of per-video SceneIntervals.
+
+    Built from the single timeline query on first lookup of a video. The
+    scene_timeline triggers announce every video whose scenes or scene tags
+    change (re-detection, merges, edits, tagging), and the entry is dropped.
+    Like the tag cache, entries are only kept while the database event
+    listener is connected, since that is what keeps them fresh.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size if max_size is not None else settings.scene_index_cache_size
+        self._videos: "OrderedDict[UUID, SceneIntervals]" = OrderedDict()
+        # Bumped on every invalidation so a load racing with one is not cached
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def active(self) -> bool:
+        return self.max_size > 0 and db_events.connected
+
+    async def get(self, video_id: UUID, db: AsyncSession) -> SceneIntervals:
+        intervals = self._videos.get(video_id) if self.active else None
+        if intervals is not None:
+            self._videos.move_to_end(video_id)
+            self.hits += 1
+            return intervals
+
+        self.misses += 1
+        generation = self._generation
+        intervals = SceneIntervals(timeline_rows(await fetch_timeline(video_id, db)))
+        if self.active and generation == self._generation:
+            self._videos[video_id] = intervals
+            while len(self._videos) > self.max_size:
+                self._videos.popitem(last=False)
+        return intervals
+
+    def invalidate(self, video_id: UUID) -> None:
+        self._generation += 1
+        self._videos.pop(video_id, None)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._videos.clear()
+
+    def handle_event(self, event: dict) -> None:
+        self.invalidate(UUID(event["video_id"]))
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "videos": len(self._videos),
+            "scenes": sum(len(intervals) for intervals in self._videos.values()),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+scene_interval_index = SceneIntervalIndex()
+db_events.subscribe(SCENE_TIMELINE_CHANNEL, scene_interval_index.handle_event)
+db_events.on_reset(scene_interval_index.clear)
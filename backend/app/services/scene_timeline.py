@@ -0,0 +1,101 @@
+from uuid import UUID
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List
+
+from app.models.scene import Scene
+from app.models.tag import Tag, SceneTag
+
+
+def scenes_with_tags():
+    """
+    Select of scene columns plus parallel tag_ids, tag_names, confidences and
+    sources arrays aggregated from scene_tags, one row per scene.
+
+    Callers add their own where clause (and group by any extra columns).
+    """
+    tagged = Tag.id.isnot(None)
+    return (
+        select(
+            Scene.id,
+            Scene.video_id,
+            Scene.start_time,
+            Scene.end_time,
+            Scene.thumbnail_path,
+            Scene.clip_path,
+            Scene.user_notes,
+            Scene.created_at,
+            func.array_agg(Tag.id).filter(tagged).label("tag_ids"),
+            func.array_agg(Tag.name).filter(tagged).label("tag_names"),
+            func.array_agg(SceneTag.confidence).filter(tagged).label("confidences"),
+            func.array_agg(SceneTag.source).filter(tagged).label("sources"),
+        )
+        .outerjoin(SceneTag, SceneTag.scene_id == Scene.id)
+        .outerjoin(Tag, Tag.id == SceneTag.tag_id)
+        .group_by(Scene.id)
+    )
+
+
+async def fetch_timeline(video_id: UUID, db: AsyncSession) -> list:
+    """All scenes of a video in start_time order with their tags, in one query"""
+    stmt = scenes_with_tags().where(Scene.video_id == video_id).order_by(Scene.start_time)
+    return (await db.execute(stmt)).all()
+
+
+def timeline_rows(scenes: list) -> List[dict]:
+    """One object per scene with nested tag objects"""
+    return [
+        {
+            "id": str(scene.id),
+            "video_id": str(scene.video_id),
+            "start_time": scene.start_time,
+            "end_time": scene.end_time,
+            "thumbnail_path": scene.thumbnail_path,
+            "clip_path": scene.clip_path,
+            "user_notes": scene.user_notes,
+            "created_at": scene.created_at.isoformat() if scene.created_at else None,
+            "tags": [
+                {"id": str(tag_id), "name": name, "confidence": confidence, "source": source}
+                for tag_id, name, confidence, source in zip(
+                    scene.tag_ids or [], scene.tag_names or [], scene.confidences or [], scene.sources or []
+                )
+            ],
+        }
+        for scene in scenes
+    ]
+
+
+def timeline_columns(scenes: list) -> dict:
+    """
+    Columnar form: parallel per-scene arrays plus a shared tag dictionary.
+
+    Scene i spans start_time[i]..end_time[i]; its tags are
+    tags[tag_indexes[i][j]] with confidence tag_confidences[i][j] and source
+    tag_sources[i][j]. Each tag name is sent once however many scenes use it.
+    """
+    tag_index: Dict[UUID, int] = {}
+    tags = []
+    tag_indexes = []
+    for scene in scenes:
+        indexes = []
+        for tag_id, name in zip(scene.tag_ids or [], scene.tag_names or []):
+            index = tag_index.get(tag_id)
+            if index is None:
+                index = tag_index[tag_id] = len(tags)
+                tags.append({"id": str(tag_id), "name": name})
+            indexes.append(index)
+        tag_indexes.append(indexes)
+
+    return {
+        "count": len(scenes),
+        "ids": [str(scene.id) for scene in scenes],
+        "start_time": [scene.start_time for scene in scenes],
+        "end_time": [scene.end_time for scene in scenes],
+        "thumbnail_path": [scene.thumbnail_path for scene in scenes],
+        "clip_path": [scene.clip_path for scene in scenes],
+        "user_notes": [scene.user_notes for scene in scenes],
+        "tags": tags,
+        "tag_indexes": tag_indexes,
+        "tag_confidences": [list(scene.confidences or []) for scene in scenes],
+        "tag_sources": [list(scene.sources or []) for scene in scenes],
+    }
@@ -0,0 +1,153 @@
+import hashlib
+import json
+from collections import OrderedDict
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional, Tuple
+
+from app.config import get_settings
+from app.models.search_version import SearchVersion, SearchVersionLog
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # Optional dependency; only the in-process cache is used without it
+    redis = None
+
+settings = get_settings()
+
+# Advisory lock key serializing fold_search_version runs across workers
+FOLD_LOCK_KEY = 0x7372_6368  # "srch"
+
+
+def cache_key(params: dict) -> str:
+    """Stable digest of already-normalized request parameters"""
+    encoded = json.dumps(params, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class SearchCache:
+    """
+    Search response cache validated by the search_version counter.
+
+    The version is search_version.version plus the number of rows in
+    search_version_log. Statement triggers append one log row per
+    transaction that writes searched columns of media, tags or tag links
+    (migration c9c221b93465), so writers never contend on a shared row;
+    fold_search_version moves the log into the base without changing the
+    sum. Entries are stored
+    under (version, key), so a lookup that reads a newer version simply
+    misses and old entries age out of the LRU; no TTL or explicit
+    invalidation is needed. The bump is transactional, so a version is
+    never visible before the writes it covers.
+
+    Responses are kept as serialized JSON in a process-local LRU and,
+    when search_cache_redis_url is set, in Redis shared by all workers.
+    """
+
+    def __init__(self, max_size: Optional[int] = None, redis_url: Optional[str] = None):
+        self.max_size = max_size if max_size is not None else settings.search_cache_size
+        self._entries: "OrderedDict[Tuple[int, str], str]" = OrderedDict()
+        redis_url = redis_url if redis_url is not None else settings.search_cache_redis_url
+        if redis_url and redis is None:
+            print("search_cache_redis_url is set but redis is not installed; using the local cache only")
+        self._redis = redis.from_url(redis_url) if redis_url and redis is not None else None
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    async def version(self, db: AsyncSession) -> int:
+        # One statement, so a concurrent fold is seen entirely or not at all
+        pending = select(func.count()).select_from(SearchVersionLog).scalar_subquery()
+        return await db.scalar(select(SearchVersion.version + pending).where(SearchVersion.id == 1)) or 0
+
+    async def get(self, version: int, key: str) -> Optional[str]:
+        entry = self._entries.get((version, key))
+        if entry is not None:
+            self._entries.move_to_end((version, key))
+            self.hits += 1
+            return entry
+
+        if self._redis is not None:
+            try:
+                shared = await self._redis.get(f"search:{version}:{key}")
+            except Exception as e:
+                self.errors += 1
+                print(f"Search cache Redis get failed: {e}")
+                shared = None
+            if shared is not None:
+                entry = shared.decode()
+                self._store(version, key, entry)
+                self.shared_hits += 1
+                return entry
+
+        self.misses += 1
+        return None
+
+    async def put(self, version: int, key: str, body: str) -> None:
+        self._store(version, key, body)
+        if self._redis is not None:
+            try:
+                # Expiry only reclaims memory; correctness comes from the version
+                await self._redis.set(f"search:{version}:{key}", body, ex=settings.search_cache_redis_ttl)
+            except Exception as e:
+                self.errors += 1
+                print(f"Search cache Redis set failed: {e}")
+
+    def _store(self, version: int, key: str, body: str) -> None:
+        self._entries[(version, key)] = body
+        self._entries.move_to_end((version, key))
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.shared_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "shared": self._redis is not None,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round((self.hits + self.shared_hits) / lookups, 4) if lookups else None,
+        }
+
+
+async def fold_search_version(db: AsyncSession) -> int:
+    """
+    Move search_version_log rows into the search_version base.
+
+    The sum readers see is unchanged; this only keeps the log, and so the
+    count in SearchCache.version, small. Runs are serialized by an advisory
+    lock; a run that finds it taken does nothing.
+
+    Returns:
+        Number of log rows folded
+    """
+    if not await db.scalar(select(func.pg_try_advisory_xact_lock(FOLD_LOCK_KEY))):
+        await db.rollback()
+        return 0
+
+    folded = delete(SearchVersionLog).returning(SearchVersionLog.id).cte("folded")
+    count = select(func.count()).select_from(folded).scalar_subquery()
+    result = await db.execute(
+        update(SearchVersion)
+        .where(SearchVersion.id == 1)
+        .values(version=SearchVersion.version + count)
+        .returning(count)
+    )
+    folded_rows = result.scalar() or 0
+    await db.commit()
+    return folded_rows
+
+
+search_cache = SearchCache()
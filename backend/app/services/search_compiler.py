@@ -0,0 +1,322 @@
+import re
+from dataclasses import dataclass, field
+from uuid import UUID
+from sqlalchemy import select, func, literal, literal_column
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.sql import Select
+from typing import Dict, List, Optional
+
+from app.models.tag import Tag, VideoTag, SceneTag, ImageTag
+from app.models.video import Video
+from app.models.scene import Scene
+from app.models.image import Image
+from app.utils.pagination import Cursor, before_cursor
+
+
+@dataclass(frozen=True)
+class SearchTarget:
+    model: type
+    association: type
+    owner_column: str
+
+    @property
+    def owner(self):
+        return getattr(self.association, self.owner_column)
+
+
+# Search target name -> entity and its tag association
+TARGETS: Dict[str, SearchTarget] = {
+    "videos": SearchTarget(Video, VideoTag, "video_id"),
+    "scenes": SearchTarget(Scene, SceneTag, "scene_id"),
+    "images": SearchTarget(Image, ImageTag, "image_id"),
+}
+
+
+# Text search configuration; 'simple' keeps Hangul words intact (no stemming)
+TEXT_SEARCH_CONFIG = "simple"
+
+# Ranked search: score = matched OR tags + CONFIDENCE_WEIGHT * mean confidence
+# of the matched tags + TEXT_WEIGHT * text rank (ts_rank_cd, roughly 0-1)
+CONFIDENCE_WEIGHT = 1.0
+TEXT_WEIGHT = 2.0
+
+
+def text_query(text: Optional[str]) -> Optional[str]:
+    """
+    Build a tsquery requiring every word of free text as a prefix.
+
+    Prefix matching lets "바다" find "바다에서" without a Korean stemmer.
+
+    Args:
+        text: User search text
+
+    Returns:
+        tsquery source such as "바다:* & 사람:*", or None if text has no words
+    """
+    words = re.findall(r"[^\W_]+", (text or "").lower())
+    return " & ".join(f"{word}:*" for word in dict.fromkeys(words)) or None
+
+
+@dataclass
+class TagFilter:
+    """AND/OR/NOT tag expression with names already resolved to tag ids, plus optional text"""
+    and_ids: List[UUID] = field(default_factory=list)
+    or_ids: List[UUID] = field(default_factory=list)
+    not_ids: List[UUID] = field(default_factory=list)
+    empty: bool = False  # True when no entity can match (unknown AND tag, or no known OR tag)
+    text_query: Optional[str] = None  # tsquery over search_vector (see text_query)
+
+    @classmethod
+    def from_names(
+        cls,
+        tag_ids: Dict[str, UUID],
+        and_tags: Optional[List[str]] = None,
+        or_tags: Optional[List[str]] = None,
+        not_tags: Optional[List[str]] = None,
+        text: Optional[str] = None
+    ) -> "TagFilter":
+        def known(names):
+            return list(dict.fromkeys(tag_ids[n.strip()] for n in names or [] if n.strip() in tag_ids))
+
+        tag_filter = cls(
+            and_ids=known(and_tags), or_ids=known(or_tags), not_ids=known(not_tags), text_query=text_query(text)
+        )
+        if and_tags and any(n.strip() not in tag_ids for n in and_tags):
+            tag_filter.empty = True
+        if or_tags and not tag_filter.or_ids:
+            tag_filter.empty = True
+        return tag_filter
+
+
+def match_conditions(target: SearchTarget, tag_filter: TagFilter) -> list:
+    """
+    WHERE clauses selecting the entities that satisfy the tag expression.
+
+    Uses the denormalized tag_ids array of each entity (GIN indexed):
+    AND is containment (@>), OR is overlap (&&) and NOT is negated overlap,
+    so no join through the association table is needed. Text goes through
+    the GIN-indexed search_vector with @@.
+    """
+    tag_ids = target.model.tag_ids
+    conditions = []
+
+    if tag_filter.and_ids:
+        conditions.append(tag_ids.contains(tag_filter.and_ids))
+
+    if tag_filter.or_ids:
+        conditions.append(tag_ids.overlap(tag_filter.or_ids))
+
+    if tag_filter.not_ids:
+        conditions.append(~tag_ids.overlap(tag_filter.not_ids))
+
+    if tag_filter.text_query:
+        conditions.append(target.model.search_vector.bool_op("@@")(_tsquery(tag_filter)))
+
+    return conditions
+
+
+def _tsquery(tag_filter: TagFilter):
+    return func.to_tsquery(TEXT_SEARCH_CONFIG, tag_filter.text_query)
+
+
+def text_rank(target: SearchTarget, tag_filter: TagFilter):
+    """ts_rank_cd of the text query; title matches weigh most, AI text least"""
+    return func.ts_rank_cd(target.model.search_vector, _tsquery(tag_filter))
+
+
+def compile_facets(target: SearchTarget, tag_filter: TagFilter, limit: int):
+    """
+    Scalar subquery with the tags most often carried by the matching entities.
+
+    Evaluates to a JSON array of [tag name, count] pairs, most frequent
+    first, counted over the whole match set by unnesting tag_ids. Tags every
+    match already has (the AND tags) are left out. The subquery is
+    uncorrelated, so Postgres runs it once per statement as an InitPlan.
+    """
+    model = target.model
+    matched = (
+        select(func.unnest(model.tag_ids).label("tag_id"))
+        .where(*match_conditions(target, tag_filter))
+        .subquery("facet_tags")
+    )
+    counts = select(matched.c.tag_id, func.count().label("n"))
+    if tag_filter.and_ids:
+        counts = counts.where(matched.c.tag_id.notin_(tag_filter.and_ids))
+    counts = (
+        counts.group_by(matched.c.tag_id)
+        .order_by(func.count().desc(), matched.c.tag_id)
+        .limit(limit)
+        .subquery("facet_counts")
+    )
+    return (
+        select(func.json_agg(aggregate_order_by(func.json_build_array(Tag.name, counts.c.n), counts.c.n.desc())))
+        .select_from(counts)
+        .join(Tag, Tag.id == counts.c.tag_id)
+        .correlate(None)
+        .scalar_subquery()
+    )
+
+
+def _with_tags(target: SearchTarget, page, facets=None) -> Select:
+    """Join an (id, total[, rank]) page subquery back to its entities and aggregate their tag names"""
+    model, association, owner = target.model, target.association, target.owner
+
+    tags = func.coalesce(
+        func.array_agg(Tag.name).filter(Tag.name.isnot(None)),
+        literal_column("ARRAY[]::varchar[]")
+    ).label("tags")
+
+    columns = [model, page.c.total, tags]
+    group_by = [model.id, page.c.total]
+    if facets is not None:
+        columns.append(facets.label("facets"))
+    if model is Scene:
+        columns.append(Video.filename)
+        group_by.append(Video.id)
+
+    stmt = (
+        select(*columns)
+        .join(page, page.c.id == model.id)
+        .outerjoin(association, owner == model.id)
+        .outerjoin(Tag, Tag.id == association.tag_id)
+    )
+    if model is Scene:
+        stmt = stmt.outerjoin(Video, Video.id == Scene.video_id)
+
+    order_by = [model.created_at.desc(), model.id.desc()]
+    if "rank" in page.c:
+        stmt = stmt.add_columns(page.c.rank)
+        group_by.append(page.c.rank)
+        order_by.insert(0, page.c.rank.desc())
+
+    return stmt.group_by(*group_by).order_by(*order_by)
+
+
+def compile_match(target_name: str, tag_filter: TagFilter) -> Select:
+    """Ids of every matching entity, for counting and estimates"""
+    target = TARGETS[target_name]
+    return select(target.model.id).where(*match_conditions(target, tag_filter))
+
+
+def compile_page(
+    target_name: str,
+    tag_filter: TagFilter,
+    offset: int,
+    limit: int,
+    after: Optional[Cursor] = None,
+    with_total: bool = True,
+    facets: int = 0
+) -> Select:
+    """
+    Compile one page of a tag search into a single statement.
+
+    Rows are (entity, total, tag names) and, for scenes, the parent video
+    filename as a fourth column. Pages are taken after a keyset cursor when
+    one is given, otherwise by offset. With with_total the total match
+    count (from the cursor on) comes from a window function evaluated
+    before LIMIT; without it total is 0 and the page can stop early.
+
+    With a text query results are ranked by text relevance, newest first
+    among equal ranks; cursors only apply to the created_at order.
+
+    With facets > 0 every row also carries the same "facets" column: the
+    top co-occurring tags over all matches (see compile_facets).
+    """
+    target = TARGETS[target_name]
+    model = target.model
+
+    conditions = match_conditions(target, tag_filter)
+    if after is not None:
+        conditions.append(before_cursor(model, after))
+
+    columns = [model.id, model.created_at]
+    if tag_filter.text_query:
+        columns.append(text_rank(target, tag_filter).label("rank"))
+    matches = select(*columns).where(*conditions)
+    if with_total:
+        # The window counts every match anyway, so collect them with the tag_ids
+        # index first; otherwise the planner walks the created_at index backwards
+        # through the whole table, costing LIMIT as if it could stop early
+        matches = matches.cte("matches").prefix_with("MATERIALIZED")
+    else:
+        matches = matches.subquery("matches")
+
+    total = func.count().over() if with_total else literal(0)
+    order_by = [matches.c.created_at.desc(), matches.c.id.desc()]
+    page_columns = [matches.c.id, total.label("total")]
+    if tag_filter.text_query:
+        page_columns.append(matches.c.rank)
+        order_by.insert(0, matches.c.rank.desc())
+
+    page = (
+        select(*page_columns)
+        .order_by(*order_by)
+        .offset(offset)
+        .limit(limit)
+        .subquery("page")
+    )
+    return _with_tags(target, page, compile_facets(target, tag_filter, facets) if facets else None)
+
+
+def relevance_score(target: SearchTarget, tag_filter: TagFilter):
+    """Per-entity relevance of a search; the weights are described at CONFIDENCE_WEIGHT"""
+    association, owner, model = target.association, target.owner, target.model
+    score = literal(0.0)
+
+    if tag_filter.or_ids:
+        or_hits = (
+            select(func.count())
+            .where(owner == model.id, association.tag_id.in_(tag_filter.or_ids))
+            .scalar_subquery()
+        )
+        score = score + or_hits
+
+    matched_ids = tag_filter.and_ids + tag_filter.or_ids
+    if matched_ids:
+        confidence = (
+            select(func.coalesce(func.avg(func.coalesce(association.confidence, 1.0)), 0.0))
+            .where(owner == model.id, association.tag_id.in_(matched_ids))
+            .scalar_subquery()
+        )
+        score = score + CONFIDENCE_WEIGHT * confidence
+
+    if tag_filter.text_query:
+        score = score + TEXT_WEIGHT * text_rank(target, tag_filter)
+
+    return score
+
+
+def compile_ranked(target_name: str, tag_filter: TagFilter, limit: int) -> Select:
+    """
+    Top matches of one target by relevance_score, in a single statement.
+
+    Rows have the compile_page shape; the score is the rank column and
+    ties go to the newest entity. Only matching entities are scored, and
+    LIMIT lets Postgres keep a bounded top-N heap instead of sorting all.
+    """
+    target = TARGETS[target_name]
+    model = target.model
+
+    score = relevance_score(target, tag_filter).label("rank")
+    page = (
+        select(model.id, literal(0).label("total"), score)
+        .where(*match_conditions(target, tag_filter))
+        .order_by(score.desc(), model.created_at.desc(), model.id.desc())
+        .limit(limit)
+        .subquery("page")
+    )
+    return _with_tags(target, page)
+
+
+def compile_rows(target_name: str, ids: List[UUID]) -> Select:
+    """Same row shape as compile_page for a page of ids matched elsewhere (total is 0)"""
+    target = TARGETS[target_name]
+    model = target.model
+
+    page = select(model.id, literal(0).label("total")).where(model.id.in_(ids)).subquery("page")
+    return _with_tags(target, page)
+
+
+def compile_count(target_name: str, tag_filter: TagFilter) -> Select:
+    """Exact total match count"""
+    return select(func.count()).select_from(compile_match(target_name, tag_filter).subquery())
@@ -0,0 +1,153 @@
+from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.models.image import Image
+from app.models.scene import Scene
+from app.models.tag import Tag, SceneTag, ImageTag
+from app.utils.image_hash import hamming_distance, from_signed64
+
+# Index keys are (kind, id) where kind is "image" or "scene"
+ItemKey = Tuple[str, UUID]
+
+
+class _BKNode:
+    __slots__ = ("value", "keys", "children")
+
+    def __init__(self, value: int, key: ItemKey):
+        self.value = value
+        self.keys = [key]
+        self.children: Dict[int, "_BKNode"] = {}
+
+
+class BKTree:
+    """Burkhard-Keller tree over 64-bit fingerprints using Hamming distance"""
+
+    def __init__(self):
+        self.root: Optional[_BKNode] = None
+
+    def add(self, value: int, key: ItemKey) -> None:
+        if self.root is None:
+            self.root = _BKNode(value, key)
+            return
+
+        node = self.root
+        while True:
+            distance = hamming_distance(value, node.value)
+            if distance == 0:
+                # A key removed or re-hashed away and then re-added still has its tombstone here
+                if key not in node.keys:
+                    node.keys.append(key)
+                return
+            child = node.children.get(distance)
+            if child is None:
+                node.children[distance] = _BKNode(value, key)
+                return
+            node = child
+
+    def search(self, value: int, max_distance: int) -> List[Tuple[int, int, ItemKey]]:
+        """Return (distance, stored value, key) for every entry within max_distance"""
+        if self.root is None:
+            return []
+
+        results = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            distance = hamming_distance(value, node.value)
+            if distance <= max_distance:
+                results.extend((distance, node.value, key) for key in node.keys)
+            for child_distance, child in node.children.items():
+                if distance - max_distance <= child_distance <= distance + max_distance:
+                    stack.append(child)
+        return results
+
+
+class SimilarityIndex:
+    """
+    Process-local near-duplicate index over image files and scene thumbnails.
+
+    The index is loaded from the stored phash columns on first use and kept
+    up to date by the upload, scene detection and delete paths. Removed or
+    re-hashed items are tombstoned via the live hash map rather than being
+    deleted from the tree.
+    """
+
+    def __init__(self):
+        self.tree = BKTree()
+        self.hashes: Dict[ItemKey, int] = {}
+        self.loaded = False
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        """Load all stored fingerprints the first time the index is used"""
+        if self.loaded:
+            return
+
+        images = await db.execute(select(Image.id, Image.phash).where(Image.phash.isnot(None)))
+        for image_id, phash in images.all():
+            self.add("image", image_id, from_signed64(phash))
+        scenes = await db.execute(select(Scene.id, Scene.phash).where(Scene.phash.isnot(None)))
+        for scene_id, phash in scenes.all():
+            self.add("scene", scene_id, from_signed64(phash))
+        self.loaded = True
+        print(f"Loaded similarity index with {len(self.hashes)} fingerprints")
+
+    def add(self, kind: str, item_id: UUID, fingerprint: int) -> None:
+        key = (kind, item_id)
+        if self.hashes.get(key) == fingerprint:
+            return
+        self.hashes[key] = fingerprint
+        self.tree.add(fingerprint, key)
+
+    def remove(self, kind: str, item_id: UUID) -> None:
+        self.hashes.pop((kind, item_id), None)
+
+    def find(self, fingerprint: int, max_distance: int) -> List[Tuple[int, str, UUID]]:
+        """Return (distance, kind, id) of live entries within max_distance, closest first"""
+        results = [
+            (distance, key[0], key[1])
+            for distance, value, key in self.tree.search(fingerprint, max_distance)
+            if self.hashes.get(key) == value
+        ]
+        results.sort(key=lambda r: r[0])
+        return results
+
+    async def find_tagged_duplicate(
+        self,
+        fingerprint: Optional[int],
+        max_distance: int,
+        db: AsyncSession,
+        exclude: Optional[Set[ItemKey]] = None
+    ) -> Optional[Tuple[str, UUID, List[Tuple[Tag, Optional[float]]]]]:
+        """Find the closest near-duplicate that already has AI tags"""
+        if fingerprint is None or max_distance < 0:
+            return None
+
+        await self.ensure_loaded(db)
+        for _, kind, item_id in self.find(fingerprint, max_distance):
+            if exclude and (kind, item_id) in exclude:
+                continue
+            tags = await get_ai_tags(kind, item_id, db)
+            if tags:
+                return kind, item_id, tags
+        return None
+
+
+async def get_ai_tags(kind: str, item_id: UUID, db: AsyncSession) -> List[Tuple[Tag, Optional[float]]]:
+    """Get (tag, confidence) pairs of AI-generated tags for a scene or image"""
+    if kind == "scene":
+        stmt = select(Tag, SceneTag.confidence).join(SceneTag).where(
+            SceneTag.scene_id == item_id,
+            SceneTag.confidence.is_distinct_from(1.0)  # Skip user-defined tags
+        )
+    else:
+        stmt = select(Tag, ImageTag.confidence).join(ImageTag).where(
+            ImageTag.image_id == item_id,
+            ImageTag.confidence.is_distinct_from(1.0)
+        )
+    entries = await db.execute(stmt)
+    return [(tag, confidence) for tag, confidence in entries.all()]
+
+
+similarity_index = SimilarityIndex()
@@ -0,0 +1,252 @@
+import asyncio
+from uuid import UUID
+from sqlalchemy import select, text
+from typing import Dict, List, Optional, Tuple
+
+from app.config import get_settings
+from app.models.database import AsyncSessionLocal
+from app.services.db_events import db_events
+from app.services.search_compiler import TARGETS, TagFilter
+
+try:
+    from pyroaring import BitMap
+except ImportError:  # Optional dependency; the index stays disabled without it
+    BitMap = None
+
+settings = get_settings()
+
+# NOTIFY channel fed by the tag_index triggers (see migration 35092bffce17)
+TAG_INDEX_CHANNEL = "tag_index"
+
+# Triggers feeding the channel; disabled unless the index is enabled (see sync_triggers)
+TAG_INDEX_TRIGGERS = [
+    f"{table}_tag_index_{event}"
+    for table in ("videos", "scenes", "images", "video_tags", "scene_tags", "image_tags")
+    for event in ("insert", "delete")
+]
+
+# Rows fetched per round trip while loading
+LOAD_BATCH_SIZE = 10000
+
+
+class _TargetIndex:
+    """Ordinals and per-tag bitmaps for one search target"""
+
+    def __init__(self):
+        self.ordinals: Dict[UUID, int] = {}
+        self.ids: List[Optional[UUID]] = []
+        self.live = BitMap()
+        self.postings: Dict[UUID, "BitMap"] = {}
+
+    def ordinal(self, item_id: UUID) -> int:
+        ordinal = self.ordinals.get(item_id)
+        if ordinal is None:
+            ordinal = len(self.ids)
+            self.ordinals[item_id] = ordinal
+            self.ids.append(item_id)
+            self.live.add(ordinal)
+        return ordinal
+
+    def remove(self, item_id: UUID) -> None:
+        ordinal = self.ordinals.pop(item_id, None)
+        if ordinal is not None:
+            self.live.discard(ordinal)
+            self.ids[ordinal] = None
+
+    def link(self, item_id: UUID, tag_id: UUID) -> None:
+        ordinal = self.ordinal(item_id)
+        posting = self.postings.get(tag_id)
+        if posting is None:
+            posting = self.postings[tag_id] = BitMap()
+        posting.add(ordinal)
+
+    def unlink(self, item_id: UUID, tag_id: UUID) -> None:
+        ordinal = self.ordinals.get(item_id)
+        posting = self.postings.get(tag_id)
+        if ordinal is not None and posting is not None:
+            posting.discard(ordinal)
+
+    def evaluate(self, tag_filter: TagFilter) -> "BitMap":
+        empty = BitMap()
+        if tag_filter.and_ids:
+            result = BitMap.intersection(*[self.postings.get(t, empty) for t in tag_filter.and_ids])
+            result &= self.live
+        else:
+            result = BitMap(self.live)
+        if tag_filter.or_ids:
+            result &= BitMap.union(*[self.postings.get(t, empty) for t in tag_filter.or_ids])
+        if tag_filter.not_ids:
+            result -= BitMap.union(*[self.postings.get(t, empty) for t in tag_filter.not_ids])
+        return result
+
+
+class TagBitmapIndex:
+    """
+    Optional in-process inverted index: tag id -> roaring bitmap of ordinals.
+
+    Ordinals are assigned in created_at order at load time and appended for
+    new items afterwards, so descending ordinal order is newest first. The
+    index is loaded in the background whenever the database event listener
+    connects and then follows the tag_index triggers, which announce the rows
+    each statement inserts into or deletes from the entity and tag
+    association tables. While it is
+    cold (loading, listener down, or disabled) callers fall back to SQL.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None):
+        if enabled is None:
+            enabled = settings.search_bitmap_index
+        if enabled and BitMap is None:
+            print("search_bitmap_index is enabled but pyroaring is not installed; using SQL search")
+        self.enabled = bool(enabled) and BitMap is not None
+        self.ready = False
+        self._targets: Dict[str, _TargetIndex] = {}
+        self._buffer: Optional[List[dict]] = None
+        self._loading: Optional[asyncio.Task] = None
+
+    async def sync_triggers(self) -> None:
+        """
+        Enable the tag_index triggers if the index is enabled, otherwise disable them.
+
+        Each NOTIFY serializes committing transactions on a global lock, so
+        tagging should not pay for it when no index consumes the events. Run
+        before the index first loads, so no change is missed. If the triggers
+        cannot be enabled the index is disabled, since it would go stale.
+        """
+        wanted, action = ("O", "ENABLE") if self.enabled else ("D", "DISABLE")
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(text("SET LOCAL lock_timeout = '10s'"))
+                triggers = (await db.execute(
+                    text(
+                        "SELECT tgrelid::regclass::text, tgname FROM pg_trigger "
+                        "WHERE tgname = ANY(:names) AND tgenabled::text <> :wanted"
+                    ),
+                    {"names": TAG_INDEX_TRIGGERS, "wanted": wanted}
+                )).all()
+                for table, trigger in triggers:
+                    await db.execute(text(f'ALTER TABLE "{table}" {action} TRIGGER "{trigger}"'))
+                await db.commit()
+        except Exception as e:
+            print(f"Failed to update tag_index triggers: {e}")
+            if self.enabled:
+                self.enabled = False
+                print("Tag bitmap index disabled; using SQL search")
+
+    def page(
+        self,
+        target: str,
+        tag_filter: TagFilter,
+        offset: int,
+        limit: int,
+        before_id: Optional[UUID] = None
+    ) -> Optional[Tuple[int, List[UUID], bool]]:
+        """
+        Evaluate the tag expression for one page, newest first.
+
+        Pages start after the item before_id when given, otherwise at offset.
+
+        Returns:
+            (total matches, page ids, whether more pages follow), or None if
+            before_id is not in the index
+        """
+        index = self._targets[target]
+        matches = index.evaluate(tag_filter)
+        if before_id is not None:
+            ordinal = index.ordinals.get(before_id)
+            if ordinal is None:
+                return None
+            end = matches.rank(ordinal) - (1 if ordinal in matches else 0)
+        else:
+            end = max(len(matches) - offset, 0)
+        start = max(end - limit, 0)
+        ordinals = matches[start:end] if end > start else []
+        return len(matches), [index.ids[o] for o in reversed(list(ordinals))], start > 0
+
+    def handle_event(self, event: dict) -> None:
+        if self._buffer is not None:
+            self._buffer.append(event)
+        elif self.ready:
+            self._apply(event)
+
+    def _apply(self, event: dict) -> None:
+        """Apply one statement's inserted or deleted rows (see migration 35092bffce17)"""
+        index = self._targets.get(event["t"])
+        if index is None:
+            return
+        item_ids = [UUID(item_id) for item_id in event["ids"]]
+        tag_ids = event.get("tags")
+        if tag_ids is not None:
+            for item_id, tag_id in zip(item_ids, tag_ids):
+                if event["op"] == "insert":
+                    index.link(item_id, UUID(tag_id))
+                else:
+                    index.unlink(item_id, UUID(tag_id))
+        else:
+            for item_id in item_ids:
+                if event["op"] == "insert":
+                    index.ordinal(item_id)
+                else:
+                    index.remove(item_id)
+
+    def reset(self) -> None:
+        """Drop the index; reload it if the listener is (re)connected"""
+        self.ready = False
+        self._buffer = None
+        self._targets = {}
+        if self._loading is not None:
+            self._loading.cancel()
+            self._loading = None
+        if self.enabled and db_events.connected:
+            self._loading = asyncio.create_task(self.load())
+
+    async def load(self) -> None:
+        """Build the index from the database, replaying changes committed meanwhile"""
+        self._buffer = []
+        targets = {}
+        try:
+            async with AsyncSessionLocal() as db:
+                for name, target in TARGETS.items():
+                    index = targets[name] = _TargetIndex()
+                    model = target.model
+                    ids = await db.stream_scalars(
+                        select(model.id).order_by(model.created_at, model.id)
+                        .execution_options(yield_per=LOAD_BATCH_SIZE)
+                    )
+                    async for item_id in ids:
+                        index.ordinal(item_id)
+
+                    links = await db.stream(
+                        select(target.owner, target.association.tag_id)
+                        .execution_options(yield_per=LOAD_BATCH_SIZE)
+                    )
+                    async for item_id, tag_id in links:
+                        index.link(item_id, tag_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Failed to load tag bitmap index: {e}")
+            self._buffer = None
+            return
+
+        self._targets = targets
+        for event in self._buffer:
+            self._apply(event)
+        self._buffer = None
+        self.ready = True
+        self._loading = None
+        print(f"Loaded tag bitmap index: {self.stats()['items']}")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "ready": self.ready,
+            "items": {name: len(index.live) for name, index in self._targets.items()},
+            "tags": {name: len(index.postings) for name, index in self._targets.items()},
+        }
+
+
+tag_bitmap_index = TagBitmapIndex()
+if tag_bitmap_index.enabled:
+    db_events.subscribe(TAG_INDEX_CHANNEL, tag_bitmap_index.handle_event)
+    db_events.on_reset(tag_bitmap_index.reset)
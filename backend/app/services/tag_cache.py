@@ -0,0 +1,127 @@
+from collections import OrderedDict
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.config import get_settings
+from app.services.db_events import db_events, notify
+
+settings = get_settings()
+
+# NOTIFY channel for tag vocabulary changes; payload is {"op", "id", "name"}
+TAG_CHANNEL = "tag_changes"
+
+
+class TagCache:
+    """
+    Bounded, process-local bidirectional tag name <-> id cache.
+
+    Entries are evicted least recently used first. The cache only serves
+    lookups while the database event listener is connected, since that is
+    what keeps it consistent with deletes and re-creates in other workers;
+    it is cleared whenever the listener connects or disconnects.
+
+    Callers filling the cache from a query pass the generation read before
+    the query; every discard or clear bumps it, so a fetch that raced with
+    a delete cannot put the deleted tag back.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size if max_size is not None else settings.tag_cache_size
+        self._ids: "OrderedDict[str, UUID]" = OrderedDict()
+        self._names: Dict[UUID, str] = {}
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def active(self) -> bool:
+        return self.max_size > 0 and db_events.connected
+
+    def get_ids(self, names: Iterable[str]) -> Tuple[Dict[str, UUID], List[str]]:
+        """Split names into cached (name -> id) and missing names"""
+        found = {}
+        missing = []
+        for name in names:
+            tag_id = self._ids.get(name) if self.active else None
+            if tag_id is None:
+                missing.append(name)
+            else:
+                self._ids.move_to_end(name)
+                found[name] = tag_id
+        self.hits += len(found)
+        self.misses += len(missing)
+        return found, missing
+
+    def get_name(self, tag_id: UUID) -> Optional[str]:
+        if not self.active:
+            return None
+        name = self._names.get(tag_id)
+        if name is not None:
+            self._ids.move_to_end(name)
+        return name
+
+    def put(self, name: str, tag_id: UUID, generation: Optional[int] = None) -> None:
+        if not self.active or (generation is not None and generation != self.generation):
+            return
+        old_id = self._ids.pop(name, None)
+        if old_id is not None:
+            self._names.pop(old_id, None)
+        old_name = self._names.pop(tag_id, None)
+        if old_name is not None:
+            self._ids.pop(old_name, None)
+
+        self._ids[name] = tag_id
+        self._names[tag_id] = name
+        while len(self._ids) > self.max_size:
+            _, evicted_id = self._ids.popitem(last=False)
+            self._names.pop(evicted_id, None)
+
+    def put_many(self, tag_ids: Dict[str, UUID], generation: Optional[int] = None) -> None:
+        for name, tag_id in tag_ids.items():
+            self.put(name, tag_id, generation)
+
+    def discard(self, tag_id: Optional[UUID] = None, name: Optional[str] = None) -> None:
+        self.generation += 1
+        if tag_id is not None:
+            old_name = self._names.pop(tag_id, None)
+            if old_name is not None:
+                self._ids.pop(old_name, None)
+        if name is not None:
+            old_id = self._ids.pop(name, None)
+            if old_id is not None:
+                self._names.pop(old_id, None)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._ids.clear()
+        self._names.clear()
+
+    def handle_event(self, event: dict) -> None:
+        """Apply a tag change announced by any worker (including this one)"""
+        tag_id = UUID(event["id"])
+        if event.get("op") == "create":
+            self.put(event["name"], tag_id)
+        else:
+            self.discard(tag_id=tag_id, name=event.get("name"))
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "size": len(self._ids),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+async def announce_tag_changes(db: AsyncSession, op: str, tags: Iterable[Tuple[UUID, str]]) -> None:
+    """Tell every worker's cache about created or deleted (id, name) tags once the transaction commits"""
+    payloads = [{"op": op, "id": str(tag_id), "name": name} for tag_id, name in tags]
+    if payloads:
+        await notify(db, TAG_CHANNEL, *payloads)
+
+
+tag_cache = TagCache()
+db_events.subscribe(TAG_CHANNEL, tag_cache.handle_event)
+db_events.on_reset(tag_cache.clear)
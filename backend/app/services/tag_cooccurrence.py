@@ -0,0 +1,227 @@
+import asyncio
+import os
+import shutil
+import time
+import numpy as np
+from uuid import UUID
+from sqlalchemy import select, func, union_all
+from sqlalchemy.orm import aliased
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Tuple
+
+from app.config import get_settings
+from app.models.database import AsyncSessionLocal
+from app.models.tag import Tag, SceneTag, ImageTag
+from app.models.scene import Scene
+from app.models.image import Image
+
+settings = get_settings()
+
+# Association tables whose co-tagged pairs are counted (videos only carry
+# the union of their scenes' tags, so they would double count)
+COUNTED = [(SceneTag, "scene_id"), (ImageTag, "image_id")]
+
+# Matrix files; each build goes to its own directory named in CURRENT
+ARRAYS = ("tag_ids", "frequency", "indptr", "indices", "counts")
+UUID_DTYPE = np.dtype((np.void, 16))
+
+MEASURES = ("pmi", "jaccard")
+
+
+class _Matrix:
+    """Memory-mapped CSR co-occurrence matrix of one build"""
+
+    def __init__(self, path: str):
+        self.path = path
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in ARRAYS}
+        self.tag_ids = arrays["tag_ids"]  # Row/column ordinal -> tag id bytes, sorted
+        self.frequency = arrays["frequency"]  # Scenes and images carrying each tag
+        self.indptr = arrays["indptr"]
+        self.indices = arrays["indices"]
+        self.counts = arrays["counts"]  # Scenes and images carrying both tags
+        with open(os.path.join(path, "documents")) as f:
+            self.documents = int(f.read())
+
+    def ordinal(self, tag_id: UUID) -> Optional[int]:
+        key = np.frombuffer(tag_id.bytes, dtype=UUID_DTYPE)[0]
+        position = int(np.searchsorted(self.tag_ids, key))
+        if position < len(self.tag_ids) and self.tag_ids[position] == key:
+            return position
+        return None
+
+
+def _write_matrix(directory: str, tag_ids: List[UUID], frequency: List[int], pairs, documents: int) -> str:
+    """Build the CSR arrays from (row, column, count) ordinal pairs and save them"""
+    rows, columns, counts = (np.asarray(a) for a in zip(*pairs)) if pairs else (np.array([], dtype=np.int64),) * 3
+    order = np.lexsort((columns, rows))
+    indptr = np.zeros(len(tag_ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(tag_ids)), out=indptr[1:])
+
+    path = os.path.join(directory, f"build-{time.time_ns()}")
+    os.makedirs(path)
+    arrays = {
+        "tag_ids": np.frombuffer(b"".join(t.bytes for t in tag_ids), dtype=UUID_DTYPE),
+        "frequency": np.asarray(frequency, dtype=np.int64),
+        "indptr": indptr,
+        "indices": columns[order].astype(np.int32),
+        "counts": counts[order].astype(np.int32),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(path, f"{name}.npy"), array)
+    with open(os.path.join(path, "documents"), "w") as f:
+        f.write(str(documents))
+    return path
+
+
+class TagCooccurrence:
+    """
+    Tag-by-tag co-occurrence counts over scenes and images, for related tags.
+
+    The matrix is rebuilt from the database on a schedule and saved as
+    NumPy arrays (CSR layout) under storage_path. Every API worker memory
+    maps the latest build, so the pages are shared through the OS page
+    cache and a rebuild in one worker is picked up by the others on their
+    next lookup.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or os.path.join(settings.storage_path, "tag_cooccurrence")
+        self._matrix: Optional[_Matrix] = None
+
+    def _current_path(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.directory, "CURRENT")) as f:
+                return os.path.join(self.directory, f.read().strip())
+        except FileNotFoundError:
+            return None
+
+    def matrix(self) -> Optional[_Matrix]:
+        """Latest build, remapped when another worker has published a newer one"""
+        path = self._current_path()
+        if path is None:
+            return None
+        if self._matrix is None or self._matrix.path != path:
+            self._matrix = _Matrix(path)
+        return self._matrix
+
+    def age(self) -> Optional[float]:
+        """Seconds since the latest build was published, or None if there is none"""
+        try:
+            return time.time() - os.path.getmtime(os.path.join(self.directory, "CURRENT"))
+        except FileNotFoundError:
+            return None
+
+    def related(self, tag_id: UUID, limit: int = 10, measure: str = "pmi", min_count: int = 1) -> Optional[List[Tuple[UUID, float, int]]]:
+        """
+        Tags most associated with a tag.
+
+        Args:
+            tag_id: Tag to expand
+            limit: Max tags returned
+            measure: "pmi" (pointwise mutual information; favours specific
+                companions) or "jaccard" (overlap of the two tag sets)
+            min_count: Ignore pairs seen together fewer times than this
+
+        Returns:
+            (tag id, score, co-occurrence count) best first, or None if no
+            matrix has been built yet
+        """
+        matrix = self.matrix()
+        if matrix is None:
+            return None
+        ordinal = matrix.ordinal(tag_id)
+        if ordinal is None:
+            return []
+
+        start, end = matrix.indptr[ordinal], matrix.indptr[ordinal + 1]
+        columns = np.asarray(matrix.indices[start:end])
+        counts = np.asarray(matrix.counts[start:end], dtype=np.float64)
+        keep = counts >= min_count
+        columns, counts = columns[keep], counts[keep]
+        if not len(columns):
+            return []
+
+        # Counters can lag the pair counts slightly; never let a frequency fall below them
+        own = max(float(matrix.frequency[ordinal]), float(counts.max()))
+        others = np.maximum(np.asarray(matrix.frequency[columns], dtype=np.float64), counts)
+        if measure == "jaccard":
+            scores = counts / (own + others - counts)
+        else:
+            scores = np.log(counts * max(matrix.documents, 1) / (own * others))
+
+        top = np.argsort(-scores, kind="stable")[:limit]
+        return [
+            (UUID(bytes=bytes(matrix.tag_ids[columns[i]])), float(scores[i]), int(counts[i]))
+            for i in top
+        ]
+
+    async def rebuild(self, db: AsyncSession) -> str:
+        """Count co-occurrences in the database and publish a new build"""
+        # Ordinals follow uuid order, which matches the byte order searched in _Matrix.ordinal
+        tags = (await db.execute(select(Tag.id, Tag.scene_count + Tag.image_count).order_by(Tag.id))).all()
+        tag_ids = [tag_id for tag_id, _ in tags]
+        frequency = [count for _, count in tags]
+        ordinals = {tag_id: i for i, tag_id in enumerate(tag_ids)}
+        documents = await db.scalar(select(func.count(Scene.id))) + await db.scalar(select(func.count(Image.id)))
+
+        # Self-join each association table on the owner to pair up tags
+        pair_queries = []
+        for association, owner in COUNTED:
+            first, second = aliased(association), aliased(association)
+            pair_queries.append(
+                select(first.tag_id.label("a"), second.tag_id.label("b"))
+                .join(second, getattr(second, owner) == getattr(first, owner))
+                .where(first.tag_id != second.tag_id)
+            )
+        pairs = union_all(*pair_queries).subquery("pairs")
+        rows = await db.stream(
+            select(pairs.c.a, pairs.c.b, func.count()).group_by(pairs.c.a, pairs.c.b)
+            .execution_options(yield_per=10000)
+        )
+        triples = [
+            (ordinals[a], ordinals[b], n) async for a, b, n in rows
+            if a in ordinals and b in ordinals
+        ]
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = await asyncio.to_thread(_write_matrix, self.directory, tag_ids, frequency, triples, documents)
+        await asyncio.to_thread(self._publish, path)
+        print(f"Built tag co-occurrence matrix: {len(tag_ids)} tags, {len(triples)} pairs")
+        return path
+
+    def _publish(self, path: str) -> None:
+        """Point CURRENT at a new build and drop builds older than the previous one"""
+        previous = self._current_path()
+        pointer = os.path.join(self.directory, "CURRENT")
+        with open(pointer + ".tmp", "w") as f:
+            f.write(os.path.basename(path))
+        os.replace(pointer + ".tmp", pointer)
+
+        # Keep the previous build for workers that have not remapped yet
+        keep = {os.path.basename(path), os.path.basename(previous) if previous else None}
+        for name in os.listdir(self.directory):
+            if name.startswith("build-") and name not in keep:
+                shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+
+    async def rebuild_if_stale(self) -> None:
+        """Periodic job; skips the rebuild if another worker published one recently"""
+        age = self.age()
+        if age is not None and age < settings.tag_cooccurrence_rebuild_interval / 2:
+            return
+        async with AsyncSessionLocal() as db:
+            await self.rebuild(db)
+
+    def stats(self) -> dict:
+        matrix = self.matrix()
+        if matrix is None:
+            return {"built": False}
+        return {
+            "built": True,
+            "tags": len(matrix.tag_ids),
+            "pairs": len(matrix.indices),
+            "documents": matrix.documents,
+            "age_seconds": round(self.age() or 0),
+        }
+
+
+tag_cooccurrence = TagCooccurrence()
@@ -0,0 +1,284 @@
+import uuid
+from datetime import datetime
+from uuid import UUID
+from sqlalchemy import select, update, delete, func, tuple_, union_all, literal
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.models.tag import Tag, TagUsageDelta, VideoTag, SceneTag, ImageTag
+from app.services.tag_cache import tag_cache, announce_tag_changes
+
+# Owner column of each tag association table
+OWNER_COLUMNS = {
+    VideoTag: "video_id",
+    SceneTag: "scene_id",
+    ImageTag: "image_id",
+}
+
+# Rows per INSERT statement, keeps bind parameters well under the Postgres limit
+INSERT_BATCH_SIZE = 1000
+
+# Advisory lock key serializing fold_tag_usage runs across workers
+FOLD_LOCK_KEY = 0x7461_6775  # "tagu"
+
+# Rounds of insert-then-reselect before upsert_tags gives up on a name that
+# keeps being deleted concurrently
+UPSERT_ATTEMPTS = 3
+
+
+def normalize_tag_names(names: Iterable[str]) -> List[str]:
+    """Strip names and drop empties and duplicates, keeping the original order"""
+    seen = set()
+    result = []
+    for name in names:
+        name = name.strip()
+        if name and name not in seen:
+            seen.add(name)
+            result.append(name)
+    return result
+
+
+async def lookup_tags(names: Iterable[str], db: AsyncSession) -> Dict[str, UUID]:
+    """
+    Resolve existing tag names to ids without creating anything.
+
+    Names served by the tag cache cost no round trip; the rest are fetched
+    in a single query. Unknown names are left out of the result.
+    """
+    names = normalize_tag_names(names)
+    found, missing = tag_cache.get_ids(names)
+    if missing:
+        generation = tag_cache.generation
+        rows = await db.execute(select(Tag.name, Tag.id).where(Tag.name.in_(missing)))
+        fetched = {name: tag_id for name, tag_id in rows.all()}
+        tag_cache.put_many(fetched, generation)
+        found.update(fetched)
+    return found
+
+
+async def upsert_tags(names: Iterable[str], db: AsyncSession) -> Dict[str, UUID]:
+    """
+    Resolve tag names to ids, creating missing tags.
+
+    Uses INSERT ... ON CONFLICT (name) DO NOTHING so concurrent writers
+    creating the same tag do not fail. Cached names skip the database
+    entirely; newly created tags are announced to every worker's cache and
+    only enter it once the transaction commits.
+
+    A name skipped by ON CONFLICT because another transaction committed it
+    after this statement's snapshot is invisible to the statement's own
+    SELECT, so names still unresolved are read again by a second statement
+    (a new snapshot under READ COMMITTED) and, if that tag was deleted in
+    the meantime, inserted again.
+
+    Returns:
+        Mapping of tag name to tag id
+
+    Raises:
+        RuntimeError: If a name stays unresolved after UPSERT_ATTEMPTS rounds
+    """
+    names = normalize_tag_names(names)
+    found, missing = tag_cache.get_ids(names)
+    created_tags = []
+    for _ in range(UPSERT_ATTEMPTS):
+        if not missing:
+            break
+        now = datetime.utcnow()
+        generation = tag_cache.generation
+        inserted = (
+            pg_insert(Tag)
+            .values([{"id": uuid.uuid4(), "name": name, "created_at": now} for name in missing])
+            .on_conflict_do_nothing(index_elements=["name"])
+            .returning(Tag.name, Tag.id)
+            .cte("inserted")
+        )
+        stmt = union_all(
+            select(inserted.c.name, inserted.c.id, literal(True)),
+            select(Tag.name, Tag.id, literal(False)).where(Tag.name.in_(missing))
+        )
+        rows = (await db.execute(stmt)).all()
+        if len(rows) < len(missing):
+            resolved = {name for name, _, _ in rows}
+            rows += [
+                (name, tag_id, False)
+                for name, tag_id in (await db.execute(
+                    select(Tag.name, Tag.id).where(Tag.name.in_([n for n in missing if n not in resolved]))
+                )).all()
+            ]
+
+        for name, tag_id, created in rows:
+            found[name] = tag_id
+            if created:
+                created_tags.append((tag_id, name))
+            else:
+                tag_cache.put(name, tag_id, generation)
+        missing = [name for name in missing if name not in found]
+    if missing:
+        raise RuntimeError(f"Could not resolve tags: {', '.join(missing)}")
+
+    await announce_tag_changes(db, "create", created_tags)
+    return found
+
+
+async def add_tag_links(
+    association,
+    entries: Iterable[Tuple[UUID, UUID, Optional[float]]],
+    db: AsyncSession,
+    source: Optional[str] = None
+) -> List[Tuple[UUID, UUID]]:
+    """
+    Insert (owner_id, tag_id, confidence) associations, skipping existing pairs.
+
+    Args:
+        association: VideoTag, SceneTag or ImageTag
+        entries: (owner id, tag id, confidence) tuples
+        source: Optional source marker (SceneTag/ImageTag only)
+
+    Returns:
+        (owner_id, tag_id) pairs that were newly inserted
+    """
+    owner_column = OWNER_COLUMNS[association]
+    now = datetime.utcnow()
+    rows = []
+    for owner_id, tag_id, confidence in entries:
+        row = {"id": uuid.uuid4(), owner_column: owner_id, "tag_id": tag_id, "confidence": confidence, "created_at": now}
+        if source is not None:
+            row["source"] = source
+        rows.append(row)
+
+    inserted = []
+    for start in range(0, len(rows), INSERT_BATCH_SIZE):
+        stmt = (
+            pg_insert(association)
+            .values(rows[start:start + INSERT_BATCH_SIZE])
+            .on_conflict_do_nothing(index_elements=[owner_column, "tag_id"])
+            .returning(getattr(association, owner_column), association.tag_id)
+        )
+        result = await db.execute(stmt)
+        inserted.extend(tuple(row) for row in result.all())
+    return inserted
+
+
+async def tag_entities(
+    association,
+    owner_ids: Iterable[UUID],
+    tag_names: Iterable[str],
+    db: AsyncSession,
+    confidence: Optional[float] = None,
+    source: Optional[str] = None
+) -> List[str]:
+    """
+    Attach tags by name to one or more videos, scenes or images.
+
+    Returns:
+        Names of tags newly attached to at least one owner, in input order
+    """
+    owner_ids = list(owner_ids)
+    names = normalize_tag_names(tag_names)
+    if not owner_ids or not names:
+        return []
+
+    tag_ids = await upsert_tags(names, db)
+    inserted = await add_tag_links(
+        association,
+        [(owner_id, tag_ids[name], confidence) for owner_id in owner_ids for name in names],
+        db,
+        source=source
+    )
+    inserted_tag_ids = {tag_id for _, tag_id in inserted}
+    return [name for name in names if tag_ids[name] in inserted_tag_ids]
+
+
+async def reconcile_tag_usage(db: AsyncSession) -> int:
+    """
+    Recount tag usage counters from the association tables and fix any drift.
+
+    Runs under REPEATABLE READ so a tag write committed mid-recount makes the
+    statement fail with a serialization error instead of being overwritten
+    by a stale count; the next run picks it up. Pending usage deltas in the
+    same snapshot are already part of the recount and are discarded; deltas
+    committed later are folded on top as usual.
+
+    Returns:
+        Number of tags whose counters were corrected
+    """
+    await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    await db.execute(delete(TagUsageDelta))
+
+    tags = Tag.__table__.alias("counted")
+    recount = select(tags.c.id)
+    for column, association in (("video_count", VideoTag), ("scene_count", SceneTag), ("image_count", ImageTag)):
+        per_tag = (
+            select(association.tag_id, func.count().label("n"))
+            .group_by(association.tag_id)
+            .subquery(column)
+        )
+        recount = recount.outerjoin(per_tag, per_tag.c.tag_id == tags.c.id).add_columns(
+            func.coalesce(per_tag.c.n, 0).label(column)
+        )
+    recount = recount.subquery("recount")
+
+    result = await db.execute(
+        update(Tag)
+        .where(
+            Tag.id == recount.c.id,
+            tuple_(Tag.video_count, Tag.scene_count, Tag.image_count).is_distinct_from(
+                tuple_(recount.c.video_count, recount.c.scene_count, recount.c.image_count)
+            )
+        )
+        .values(
+            video_count=recount.c.video_count,
+            scene_count=recount.c.scene_count,
+            image_count=recount.c.image_count
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def fold_tag_usage(db: AsyncSession) -> int:
+    """
+    Add pending tag_usage_deltas into the tag usage counters and delete them.
+
+    The association triggers only append deltas, so counters lag writes by
+    up to tag_usage_fold_interval. Runs are serialized by an advisory lock;
+    a run that finds it taken does nothing.
+
+    Returns:
+        Number of tags whose counters changed
+    """
+    if not await db.scalar(select(func.pg_try_advisory_xact_lock(FOLD_LOCK_KEY))):
+        await db.rollback()
+        return 0
+
+    folded = (
+        delete(TagUsageDelta)
+        .returning(
+            TagUsageDelta.tag_id, TagUsageDelta.video_count, TagUsageDelta.scene_count, TagUsageDelta.image_count
+        )
+        .cte("folded")
+    )
+    sums = (
+        select(
+            folded.c.tag_id,
+            func.sum(folded.c.video_count).label("video_count"),
+            func.sum(folded.c.scene_count).label("scene_count"),
+            func.sum(folded.c.image_count).label("image_count"),
+        )
+        .group_by(folded.c.tag_id)
+        .subquery("sums")
+    )
+    result = await db.execute(
+        update(Tag)
+        .where(Tag.id == sums.c.tag_id)
+        .values(
+            video_count=Tag.video_count + sums.c.video_count,
+            scene_count=Tag.scene_count + sums.c.scene_count,
+            image_count=Tag.image_count + sums.c.image_count
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
@@ -0,0 +1,220 @@
+import asyncio
+import heapq
+from uuid import UUID
+from sqlalchemy import select
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.models.database import AsyncSessionLocal
+from app.models.tag import Tag
+from app.services.db_events import db_events
+from app.services.tag_cache import TAG_CHANNEL
+
+# Hangul initial consonants (초성) in syllable order
+CHOSUNG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+CHOSUNG_SET = frozenset(CHOSUNG)
+HANGUL_BASE = 0xAC00
+HANGUL_COUNT = 11172
+SYLLABLES_PER_CHOSUNG = 588
+
+
+def to_chosung(text: str) -> str:
+    """Replace each Hangul syllable with its initial consonant, e.g. "사람" -> "ㅅㄹ" """
+    result = []
+    for ch in text:
+        code = ord(ch) - HANGUL_BASE
+        if 0 <= code < HANGUL_COUNT:
+            result.append(CHOSUNG[code // SYLLABLES_PER_CHOSUNG])
+        else:
+            result.append(ch)
+    return "".join(result)
+
+
+def is_chosung_query(query: str) -> bool:
+    return all(ch in CHOSUNG_SET or ch == " " for ch in query)
+
+
+def _grams(text: str) -> Set[str]:
+    """Single characters and bigrams of text"""
+    return set(text) | {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class _Entry:
+    __slots__ = ("name", "key", "chosung", "usage")
+
+    def __init__(self, name: str, usage: int):
+        self.name = name
+        self.key = name.lower()
+        self.chosung = to_chosung(self.key)
+        self.usage = usage
+
+
+class _GramIndex:
+    """n-gram (1 and 2 character) postings for substring candidate lookup"""
+
+    def __init__(self):
+        self.postings: Dict[str, Set[UUID]] = {}
+
+    def add(self, tag_id: UUID, text: str) -> None:
+        for gram in _grams(text):
+            self.postings.setdefault(gram, set()).add(tag_id)
+
+    def remove(self, tag_id: UUID, text: str) -> None:
+        for gram in _grams(text):
+            posting = self.postings.get(gram)
+            if posting is not None:
+                posting.discard(tag_id)
+                if not posting:
+                    del self.postings[gram]
+
+    def candidates(self, query: str) -> Set[UUID]:
+        grams = {query} if len(query) == 1 else {query[i:i + 2] for i in range(len(query) - 1)}
+        postings = sorted((self.postings.get(g, set()) for g in grams), key=len)
+        if not postings[0]:
+            return set()
+        return postings[0].intersection(*postings[1:])
+
+
+class TagSuggestIndex:
+    """
+    In-memory tag autocomplete over names and Hangul initial consonants.
+
+    Substring candidates come from 1/2-character n-gram postings and are
+    verified against the name; a query made only of initial consonants
+    ("ㅅㄹ") matches the 초성 form of names instead ("사람"). Results are
+    ranked exact match first, then by usage count, then prefix matches.
+
+    The index loads when the database event listener connects, follows tag
+    creates and deletes from the tag_changes channel, and refreshes usage
+    counts periodically. Callers fall back to SQL while it is not ready.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self._entries: Dict[UUID, _Entry] = {}
+        self._names = _GramIndex()
+        self._chosungs = _GramIndex()
+        # Results of one-character queries, which match a large share of all
+        # tags; cleared on any change to names or usage
+        self._short: Dict[Tuple[str, int], List[Tuple[UUID, str, int]]] = {}
+        self._buffer: Optional[List[dict]] = None
+        self._loading: Optional[asyncio.Task] = None
+
+    def add(self, tag_id: UUID, name: str, usage: int = 0) -> None:
+        existing = self._entries.get(tag_id)
+        if existing is not None:
+            if existing.name == name:
+                return
+            self.remove(tag_id)
+        self._short.clear()
+        entry = self._entries[tag_id] = _Entry(name, usage)
+        self._names.add(tag_id, entry.key)
+        self._chosungs.add(tag_id, entry.chosung)
+
+    def remove(self, tag_id: UUID) -> None:
+        entry = self._entries.pop(tag_id, None)
+        if entry is not None:
+            self._short.clear()
+            self._names.remove(tag_id, entry.key)
+            self._chosungs.remove(tag_id, entry.chosung)
+
+    def suggest(self, query: str, limit: int = 10) -> List[Tuple[UUID, str, int]]:
+        """Return (tag id, name, usage count) of the best matches"""
+        query = query.strip().lower()
+        if not query:
+            return []
+        if len(query) == 1:
+            cached = self._short.get((query, limit))
+            if cached is None:
+                cached = self._short[(query, limit)] = self._match(query, limit)
+            return cached
+        return self._match(query, limit)
+
+    def _match(self, query: str, limit: int) -> List[Tuple[UUID, str, int]]:
+        if is_chosung_query(query):
+            index, field = self._chosungs, "chosung"
+        else:
+            index, field = self._names, "key"
+
+        # Streamed into the heap, so short queries matching most tags only keep limit rows alive
+        entries = self._entries
+        matches = (
+            (text != query, -entry.usage, not text.startswith(query), entry.name, tag_id)
+            for tag_id in index.candidates(query)
+            for entry in (entries[tag_id],)
+            for text in (getattr(entry, field),)
+            if query in text
+        )
+
+        return [
+            (tag_id, name, -negative_usage)
+            for _, negative_usage, _, name, tag_id in heapq.nsmallest(limit, matches)
+        ]
+
+    def handle_event(self, event: dict) -> None:
+        if self._buffer is not None:
+            self._buffer.append(event)
+        elif self.ready:
+            self._apply(event)
+
+    def _apply(self, event: dict) -> None:
+        tag_id = UUID(event["id"])
+        if event.get("op") == "create":
+            self.add(tag_id, event["name"])
+        else:
+            self.remove(tag_id)
+
+    def reset(self) -> None:
+        """Drop the index; reload it if the listener is (re)connected"""
+        self.ready = False
+        self._buffer = None
+        if self._loading is not None:
+            self._loading.cancel()
+            self._loading = None
+        if db_events.connected:
+            self._loading = asyncio.create_task(self.load())
+
+    async def load(self) -> None:
+        """Build the index from the tags table, replaying changes announced meanwhile"""
+        self._buffer = []
+        self._entries = {}
+        self._names = _GramIndex()
+        self._chosungs = _GramIndex()
+        self._short = {}
+        try:
+            async with AsyncSessionLocal() as db:
+                rows = await db.execute(select(Tag.id, Tag.name, Tag.usage_count))
+                for tag_id, name, usage in rows.all():
+                    self.add(tag_id, name, usage or 0)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Failed to load tag suggest index: {e}")
+            self._buffer = None
+            return
+
+        for event in self._buffer:
+            self._apply(event)
+        self._buffer = None
+        self.ready = True
+        self._loading = None
+        print(f"Loaded tag suggest index with {len(self._entries)} tags")
+
+    def stats(self) -> dict:
+        return {"ready": self.ready, "tags": len(self._entries), "grams": len(self._names.postings)}
+
+    async def refresh_usage(self) -> None:
+        """Pull current usage counts for ranking"""
+        if not self.ready:
+            return
+        async with AsyncSessionLocal() as db:
+            rows = await db.execute(select(Tag.id, Tag.usage_count))
+            for tag_id, usage in rows.all():
+                entry = self._entries.get(tag_id)
+                if entry is not None:
+                    entry.usage = usage or 0
+            self._short.clear()
+
+
+tag_suggest_index = TagSuggestIndex()
+db_events.subscribe(TAG_CHANNEL, tag_suggest_index.handle_event)
+db_events.on_reset(tag_suggest_index.reset)
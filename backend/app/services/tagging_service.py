@@ -1,6 +1,7 @@
 import os
 from uuid import UUID
-from sqlalchemy.orm import Session
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
 
 from app.config import get_settings
@@ -10,6 +11,11 @@ from app.models.tag import Tag, VideoTag, SceneTag
 from app.utils.video_processor import video_processor
 from app.utils.scene_detector import scene_detector
 from app.utils.ollama_client import ollama_client
+from app.utils.media_executor import media_executor
+from app.utils.image_hash import compute_dhash, hamming_distance, to_signed64, from_signed64
+from app.services.similarity_index import similarity_index, get_ai_tags
+from app.services.embedding_index import embedding_index, embed_tagged_items
+from app.services.tag_store import tag_entities, add_tag_links
 
 settings = get_settings()
 
@@ -19,10 +25,11 @@ class TaggingService:
         self.ollama = ollama_client
         self.processor = video_processor
         self.frames_per_scene = settings.scene_frames_per_scene
+        self.tag_reuse_distance = settings.scene_tag_reuse_distance
 
-    async def generate_summary(self, video_id: UUID, db: Session) -> Optional[str]:
+    async def generate_summary(self, video_id: UUID, db: AsyncSession) -> Optional[str]:
         """Generate AI summary for a video using vision analysis"""
-        video = db.query(Video).filter(Video.id == video_id).first()
+        video = await db.get(Video, video_id)
         if not video:
             return None
 
@@ -38,7 +45,7 @@ class TaggingService:
             time_pos = max(1, duration * ratio)
             thumbnail_path = os.path.join(thumbnails_dir, f"summary_frame_{i}.jpg")
             try:
-                self.processor.extract_thumbnail(video.file_path, thumbnail_path, time_pos)
+                await self.processor.extract_thumbnail(video.file_path, thumbnail_path, time_pos)
                 frame_paths.append(thumbnail_path)
             except Exception as e:
                 print(f"Warning: Could not extract thumbnail at {time_pos}s: {e}")
@@ -56,13 +63,13 @@ class TaggingService:
             else:
                 summary = await self.ollama.generate(prompt_context)
             video.summary = summary.strip()
-            db.commit()
+            await db.commit()
             return video.summary
         except Exception as e:
             print(f"Error generating summary: {e}")
             return None
 
-    def extract_scene_frames(self, video_path: str, scene: Scene, output_dir: str) -> List[str]:
+    async def extract_scene_frames(self, video_path: str, scene: Scene, output_dir: str) -> List[str]:
         """Extract multiple frames from a scene for AI analysis"""
         frame_paths = []
         scene_duration = scene.end_time - scene.start_time
@@ -82,32 +89,36 @@ class TaggingService:
             frame_path = os.path.join(output_dir, frame_filename)
 
             try:
-                self.processor.extract_thumbnail(video_path, frame_path, frame_time)
+                await self.processor.extract_thumbnail(video_path, frame_path, frame_time)
                 frame_paths.append(frame_path)
             except Exception as e:
                 print(f"Warning: Could not extract frame at {frame_time}s: {e}")
 
         return frame_paths
 
-    async def detect_and_save_scenes(self, video_id: UUID, db: Session) -> List[Scene]:
+    async def detect_and_save_scenes(self, video_id: UUID, db: AsyncSession) -> List[Scene]:
         """Detect scenes in video and save to database"""
-        video = db.query(Video).filter(Video.id == video_id).first()
+        video = await db.get(Video, video_id)
         if not video:
             return []
 
         try:
             # Detect scenes using PySceneDetect
-            scene_times = scene_detector.detect_scenes(video.file_path)
+            scene_times = await scene_detector.detect_scenes(video.file_path)
 
             if not scene_times:
                 # If no scenes detected, treat entire video as one scene
-                duration = video.duration or self.processor.get_duration(video.file_path)
+                duration = video.duration or await self.processor.get_duration(video.file_path)
                 scene_times = [(0.0, duration)]
 
             # Sort scenes by start_time to ensure chronological order
             scene_times.sort(key=lambda x: x[0])
 
-            print(f"Detected {len(scene_times)} scenes in video {video_id}")
+            # Merge micro-scenes so model calls follow the real content
+            detected_count = len(scene_times)
+            scene_times = await scene_detector.consolidate_scenes(video.file_path, scene_times)
+
+            print(f"Detected {detected_count} scenes in video {video_id}, {len(scene_times)} after merging")
 
             created_scenes = []
             thumbnails_dir = os.path.join(settings.storage_path, "thumbnails", str(video_id))
@@ -121,7 +132,7 @@ class TaggingService:
                     end_time=end_time
                 )
                 db.add(scene)
-                db.flush()  # Get scene.id
+                await db.flush()  # Get scene.id
 
                 # Extract thumbnail at middle of scene (for display)
                 mid_time = (start_time + end_time) / 2
@@ -129,29 +140,37 @@ class TaggingService:
                 thumbnail_path = os.path.join(thumbnails_dir, thumbnail_filename)
 
                 try:
-                    self.processor.extract_thumbnail(video.file_path, thumbnail_path, mid_time)
+                    await self.processor.extract_thumbnail(video.file_path, thumbnail_path, mid_time)
                     scene.thumbnail_path = thumbnail_path
+                    fingerprint = await media_executor.run_blocking("image", compute_dhash, thumbnail_path)
+                    if fingerprint is not None:
+                        scene.phash = to_signed64(fingerprint)
                 except Exception as e:
                     print(f"Warning: Could not extract scene thumbnail: {e}")
 
                 created_scenes.append(scene)
                 print(f"Created scene {i+1}: {start_time:.1f}s - {end_time:.1f}s")
 
-            db.commit()
+            await db.commit()
+
+            for scene in created_scenes:
+                if scene.phash is not None:
+                    similarity_index.add("scene", scene.id, from_signed64(scene.phash))
+
             return created_scenes
 
         except Exception as e:
             print(f"Error detecting scenes: {e}")
-            db.rollback()
+            await db.rollback()
             return []
 
-    async def generate_scene_tags(self, scene: Scene, video: Video, db: Session) -> list[str]:
+    async def generate_scene_tags(self, scene: Scene, video: Video, db: AsyncSession) -> list[str]:
         """Generate AI tags for a specific scene using vision analysis"""
         # Extract frames from this scene for AI analysis
         thumbnails_dir = os.path.join(settings.storage_path, "thumbnails", str(video.id))
         os.makedirs(thumbnails_dir, exist_ok=True)
 
-        frame_paths = self.extract_scene_frames(video.file_path, scene, thumbnails_dir)
+        frame_paths = await self.extract_scene_frames(video.file_path, scene, thumbnails_dir)
 
         # Build context for this scene
         scene_position = '초반' if scene.start_time < 10 else '중반' if scene.start_time < (video.duration or 60) * 0.7 else '후반'
@@ -173,40 +192,44 @@ class TaggingService:
 한국어로 2-5개의 태그를 생성하라. 태그만 한 줄에 하나씩 작성하라."""
                 tags = await self.ollama.generate_tags(fallback_context)
 
-            created_tags = []
-            for tag_name in tags[:7]:
-                tag_name = tag_name.strip()
-                if not tag_name:
-                    continue
-
-                # Find or create tag
-                tag = db.query(Tag).filter(Tag.name == tag_name).first()
-                if not tag:
-                    tag = Tag(name=tag_name)
-                    db.add(tag)
-                    db.flush()
-
-                # Check if scene_tag already exists
-                existing = db.query(SceneTag).filter(
-                    SceneTag.scene_id == scene.id,
-                    SceneTag.tag_id == tag.id
-                ).first()
-
-                if not existing:
-                    scene_tag = SceneTag(scene_id=scene.id, tag_id=tag.id)
-                    db.add(scene_tag)
-                    created_tags.append(tag_name)
-
-            db.commit()
+            created_tags = await tag_entities(SceneTag, [scene.id], tags[:7], db)
+            await db.commit()
             print(f"Generated {len(created_tags)} tags for scene: {created_tags}")
             return created_tags
         except Exception as e:
             print(f"Error generating scene tags: {e}")
             return []
 
-    async def generate_video_tags(self, video_id: UUID, db: Session) -> list[str]:
+    def find_similar_tagged_scene(self, fingerprint: Optional[int], tagged: List[tuple]) -> Optional[Scene]:
+        """Find the closest already-tagged scene whose keyframe is within the reuse distance"""
+        if fingerprint is None or self.tag_reuse_distance < 0:
+            return None
+
+        best_scene, best_distance = None, None
+        for other_fingerprint, other_scene in tagged:
+            distance = hamming_distance(fingerprint, other_fingerprint)
+            if distance <= self.tag_reuse_distance and (best_distance is None or distance < best_distance):
+                best_scene, best_distance = other_scene, distance
+        return best_scene
+
+    async def propagate_scene_tags(self, scene: Scene, source_tags: List[tuple], db: AsyncSession) -> list[str]:
+        """Copy AI tags from a near-identical scene or image instead of calling the vision model"""
+        inserted = await add_tag_links(
+            SceneTag,
+            [(scene.id, tag.id, confidence) for tag, confidence in source_tags],
+            db,
+            source="propagated"
+        )
+        inserted_tag_ids = {tag_id for _, tag_id in inserted}
+        created_tags = [tag.name for tag, _ in source_tags if tag.id in inserted_tag_ids]
+
+        await db.commit()
+        print(f"Propagated {len(created_tags)} tags: {created_tags}")
+        return created_tags
+
+    async def generate_video_tags(self, video_id: UUID, db: AsyncSession) -> list[str]:
         """Generate AI tags for a video"""
-        video = db.query(Video).filter(Video.id == video_id).first()
+        video = await db.get(Video, video_id)
         if not video:
             return []
 
@@ -221,64 +244,44 @@ class TaggingService:
         try:
             tags = await self.ollama.generate_tags(context)
 
-            created_tags = []
-            for tag_name in tags[:10]:
-                tag_name = tag_name.strip()
-                if not tag_name:
-                    continue
-
-                # Find or create tag
-                tag = db.query(Tag).filter(Tag.name == tag_name).first()
-                if not tag:
-                    tag = Tag(name=tag_name)
-                    db.add(tag)
-                    db.flush()
-
-                # Check if video_tag already exists
-                existing = db.query(VideoTag).filter(
-                    VideoTag.video_id == video.id,
-                    VideoTag.tag_id == tag.id
-                ).first()
-
-                if not existing:
-                    video_tag = VideoTag(video_id=video.id, tag_id=tag.id)
-                    db.add(video_tag)
-                    created_tags.append(tag_name)
-
-            db.commit()
+            created_tags = await tag_entities(VideoTag, [video.id], tags[:10], db)
+            await db.commit()
             return created_tags
         except Exception as e:
             print(f"Error generating tags: {e}")
             return []
 
-    async def clear_existing_tags(self, video_id: UUID, db: Session) -> None:
+    async def clear_existing_tags(self, video_id: UUID, db: AsyncSession) -> None:
         """Clear existing AI-generated tags and scenes for re-tagging"""
-        video = db.query(Video).filter(Video.id == video_id).first()
+        video = await db.get(Video, video_id)
         if not video:
             return
 
         # Delete existing scene tags and scenes
-        for scene in video.scenes:
+        scenes = (await db.scalars(select(Scene).where(Scene.video_id == video_id))).all()
+        for scene in scenes:
             # Delete scene tags (but keep user-defined tags with confidence=1.0)
-            db.query(SceneTag).filter(
+            await db.execute(delete(SceneTag).where(
                 SceneTag.scene_id == scene.id,
                 SceneTag.confidence != 1.0  # Keep user-defined tags
-            ).delete()
+            ))
             # Delete scene
-            db.delete(scene)
+            similarity_index.remove("scene", scene.id)
+            embedding_index.remove("scene", scene.id)
+            await db.delete(scene)
 
         # Delete video tags (but keep user-defined tags with confidence=1.0)
-        db.query(VideoTag).filter(
+        await db.execute(delete(VideoTag).where(
             VideoTag.video_id == video_id,
             VideoTag.confidence != 1.0  # Keep user-defined tags
-        ).delete()
+        ))
 
-        db.commit()
+        await db.commit()
         print(f"Cleared existing AI tags for video {video_id}")
 
-    async def aggregate_video_tags_from_scenes(self, video_id: UUID, db: Session) -> list[str]:
+    async def aggregate_video_tags_from_scenes(self, video_id: UUID, db: AsyncSession) -> list[str]:
         """Aggregate most common tags from all scenes to video level"""
-        video = db.query(Video).filter(Video.id == video_id).first()
+        video = await db.get(Video, video_id)
         if not video:
             return []
 
@@ -286,38 +289,31 @@ class TaggingService:
         from collections import Counter
         tag_counts = Counter()
 
-        for scene in video.scenes:
-            scene_tags = db.query(Tag).join(SceneTag).filter(
-                SceneTag.scene_id == scene.id
-            ).all()
-            for tag in scene_tags:
-                tag_counts[tag.name] += 1
+        tag_ids = {}
+        scene_tag_names = await db.execute(
+            select(Tag.id, Tag.name).join(SceneTag).join(Scene, Scene.id == SceneTag.scene_id).where(
+                Scene.video_id == video.id
+            )
+        )
+        for tag_id, tag_name in scene_tag_names.all():
+            tag_counts[tag_name] += 1
+            tag_ids[tag_name] = tag_id
 
         # Add most common tags to video level (tags that appear in at least 2 scenes or if only 1 scene)
-        num_scenes = len(video.scenes)
+        num_scenes = await db.scalar(select(func.count()).select_from(Scene).where(Scene.video_id == video.id))
         min_count = 1 if num_scenes <= 2 else 2
 
-        created_tags = []
-        for tag_name, count in tag_counts.most_common(10):
-            if count >= min_count:
-                tag = db.query(Tag).filter(Tag.name == tag_name).first()
-                if tag:
-                    existing = db.query(VideoTag).filter(
-                        VideoTag.video_id == video.id,
-                        VideoTag.tag_id == tag.id
-                    ).first()
-
-                    if not existing:
-                        video_tag = VideoTag(video_id=video.id, tag_id=tag.id)
-                        db.add(video_tag)
-                        created_tags.append(tag_name)
-
-        db.commit()
+        common_tags = [tag_name for tag_name, count in tag_counts.most_common(10) if count >= min_count]
+        inserted = await add_tag_links(VideoTag, [(video.id, tag_ids[name], None) for name in common_tags], db)
+        inserted_tag_ids = {tag_id for _, tag_id in inserted}
+        created_tags = [name for name in common_tags if tag_ids[name] in inserted_tag_ids]
+
+        await db.commit()
         return created_tags
 
-    async def process_video(self, video_id: UUID, db: Session) -> dict:
+    async def process_video(self, video_id: UUID, db: AsyncSession) -> dict:
         """Full tagging process for a video with scene-level tagging"""
-        video = db.query(Video).filter(Video.id == video_id).first()
+        video = await db.get(Video, video_id)
         if not video:
             return {"error": "Video not found"}
 
@@ -327,13 +323,14 @@ class TaggingService:
             await self.clear_existing_tags(video_id, db)
 
         video.status = "processing"
-        db.commit()
+        await db.commit()
 
         result = {
             "video_id": str(video_id),
             "summary": None,
             "tags": [],
             "scenes": [],
+            "vision_calls_saved": 0,
             "status": "processing"
         }
 
@@ -364,12 +361,42 @@ class TaggingService:
 
             # Step 3: Generate tags for each scene (using vision)
             print("Step 3: Generating scene-specific tags...")
-            video = db.query(Video).filter(Video.id == video_id).first()  # Refresh
+            video = await db.get(Video, video_id)  # Refresh
+            tagged_fingerprints = []  # (keyframe hash, scene) of scenes tagged by the model
             for i, scene in enumerate(scenes):
                 print(f"  Processing scene {i+1}/{len(scenes)} ({scene.start_time:.1f}s - {scene.end_time:.1f}s)...")
-                scene_tags = await self.generate_scene_tags(scene, video, db)
+                fingerprint = from_signed64(scene.phash) if scene.phash is not None else None
+                source_tags = None
+
+                # Prefer a near-identical shot tagged earlier in this run, then the whole library
+                similar_scene = self.find_similar_tagged_scene(fingerprint, tagged_fingerprints)
+                if similar_scene is not None:
+                    source_tags = await get_ai_tags("scene", similar_scene.id, db)
+                else:
+                    duplicate = await similarity_index.find_tagged_duplicate(
+                        fingerprint,
+                        settings.duplicate_reuse_distance,
+                        db,
+                        exclude={("scene", s.id) for s in scenes}
+                    )
+                    if duplicate:
+                        print(f"Reusing tags from near-duplicate {duplicate[0]} {duplicate[1]}")
+                        source_tags = duplicate[2]
+
+                if source_tags:
+                    scene_tags = await self.propagate_scene_tags(scene, source_tags, db)
+                    result["vision_calls_saved"] += 1
+                else:
+                    scene_tags = await self.generate_scene_tags(scene, video, db)
+                    if fingerprint is not None and scene_tags:
+                        tagged_fingerprints.append((fingerprint, scene))
+
                 if i < len(result["scenes"]):
                     result["scenes"][i]["tags"] = scene_tags
+            print(f"Reused tags for {result['vision_calls_saved']} of {len(scenes)} scenes")
+
+            # Embed scenes for semantic search (tags + notes + video title)
+            await embed_tagged_items("scene", [s.id for s in scenes])
 
             # Step 4: Aggregate scene tags to video level
             print("Step 4: Aggregating tags to video level...")
@@ -383,7 +410,7 @@ class TaggingService:
 
             # Update status
             video.status = "tagged"
-            db.commit()
+            await db.commit()
             result["status"] = "tagged"
 
             print(f"=== Tagging complete for video: {video.filename} ===")
@@ -393,7 +420,7 @@ class TaggingService:
             import traceback
             traceback.print_exc()
             video.status = "error"
-            db.commit()
+            await db.commit()
             result["status"] = "error"
             result["error"] = str(e)
 
@@ -0,0 +1,68 @@
+import hashlib
+import re
+import numpy as np
+from typing import List, Optional
+
+from app.config import get_settings
+from app.utils.ollama_client import ollama_client
+
+settings = get_settings()
+
+# embedding_model value selecting hashing_embed instead of Ollama
+HASHING_MODEL = "hashing"
+
+
+def hashing_embed(text: str, dim: int) -> np.ndarray:
+    """
+    Deterministic local text embedding by feature hashing.
+
+    Words and character bigrams (which carry most of the meaning of Korean
+    text without a morphological analyzer) are hashed into dim signed
+    buckets. Texts sharing words or syllable pairs get a positive cosine.
+    Used when no embedding model is available, e.g. offline and in tests.
+
+    Args:
+        text: Text to embed
+        dim: Vector size
+
+    Returns:
+        L2-normalized float32 vector (all zeros for text without words)
+    """
+    vector = np.zeros(dim, dtype=np.float32)
+    for word in re.findall(r"[^\W_]+", text.lower()):
+        features = [word] + [word[i:i + 2] for i in range(len(word) - 1)]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % dim] += 1.0 if value >> 63 else -1.0
+    return normalize(vector)
+
+
+def normalize(vector: np.ndarray) -> np.ndarray:
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm > 0 else vector
+
+
+async def embed_texts(texts: List[str]) -> np.ndarray:
+    """
+    Embed texts with the configured embedding_model.
+
+    Returns:
+        (len(texts), dim) float32 matrix of L2-normalized rows, so a dot
+        product is the cosine similarity
+    """
+    if settings.embedding_model == HASHING_MODEL:
+        rows = [hashing_embed(text, settings.embedding_hash_dim) for text in texts]
+    else:
+        rows = [normalize(np.asarray(v, dtype=np.float32)) for v in await ollama_client.embed(texts)]
+    if not rows:
+        return np.zeros((0, 0), dtype=np.float32)
+    return np.vstack(rows)
+
+
+def to_bytes(vector: np.ndarray) -> bytes:
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def from_bytes(data: Optional[bytes]) -> Optional[np.ndarray]:
+    return np.frombuffer(data, dtype=np.float32) if data else None
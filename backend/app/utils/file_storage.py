@@ -0,0 +1,36 @@
+import hashlib
+import aiofiles
+from fastapi import UploadFile
+from typing import Tuple
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+
+async def save_upload_file(file: UploadFile, file_path: str) -> Tuple[int, str]:
+    """
+    Stream an uploaded file to disk, hashing it while it is written.
+
+    Args:
+        file: Incoming upload
+        file_path: Destination path
+
+    Returns:
+        (file size in bytes, SHA-256 hex digest)
+    """
+    hasher = hashlib.sha256()
+    file_size = 0
+    async with aiofiles.open(file_path, 'wb') as out_file:
+        while content := await file.read(UPLOAD_CHUNK_SIZE):
+            hasher.update(content)
+            await out_file.write(content)
+            file_size += len(content)
+    return file_size, hasher.hexdigest()
+
+
+def sha256_file(file_path: str) -> str:
+    """SHA-256 hex digest of a file, read sequentially (blocking)"""
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while content := f.read(UPLOAD_CHUNK_SIZE):
+            hasher.update(content)
+    return hasher.hexdigest()
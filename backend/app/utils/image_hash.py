@@ -0,0 +1,44 @@
+from typing import Optional
+from PIL import Image as PILImage
+
+
+def compute_dhash(image_path: str, hash_size: int = 8) -> Optional[int]:
+    """
+    Compute a difference hash (dHash) perceptual fingerprint of an image.
+
+    Args:
+        image_path: Path to the image file
+        hash_size: Number of bits per row/column (8 gives a 64-bit hash)
+
+    Returns:
+        Unsigned integer fingerprint, or None if the image cannot be read
+    """
+    try:
+        with PILImage.open(image_path) as img:
+            small = img.convert("L").resize((hash_size + 1, hash_size), PILImage.Resampling.LANCZOS)
+            pixels = list(small.getdata())
+    except Exception as e:
+        print(f"Warning: Could not compute image hash for {image_path}: {e}")
+        return None
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two fingerprints"""
+    return (a ^ b).bit_count()
+
+
+def to_signed64(value: int) -> int:
+    """Convert an unsigned 64-bit fingerprint to the signed form stored in BIGINT columns"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def from_signed64(value: int) -> int:
+    """Convert a stored signed BIGINT fingerprint back to its unsigned form"""
+    return value + (1 << 64) if value < 0 else value
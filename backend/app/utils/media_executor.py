@@ -0,0 +1,125 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from app.config import get_settings
+
+settings = get_settings()
+
+
+@dataclass
+class SubprocessResult:
+    returncode: int
+    stdout: str
+    stderr: str
+
+
+class MediaExecutor:
+    """
+    Shared executor for blocking media work (ffprobe/ffmpeg, scene detection, Pillow).
+
+    Subprocesses run as asyncio subprocesses and in-process work runs on a
+    bounded thread pool, so the event loop never blocks. Every job belongs to
+    a kind ("probe", "ffmpeg", "scene_detect", "image", "hash") with its own
+    concurrency limit; jobs beyond the limit wait in a queue whose depth is
+    reported by metrics().
+    """
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None, max_workers: Optional[int] = None):
+        self.limits = limits or {
+            "probe": settings.media_limit_probe,
+            "ffmpeg": settings.media_limit_ffmpeg,
+            "scene_detect": settings.media_limit_scene_detect,
+            "image": settings.media_limit_image,
+            "hash": settings.media_limit_hash,
+        }
+        self.pool = ThreadPoolExecutor(
+            max_workers=max_workers or settings.media_pool_workers,
+            thread_name_prefix="media"
+        )
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._stats: Dict[str, dict] = {}
+
+    def _semaphore(self, kind: str) -> asyncio.Semaphore:
+        if kind not in self.limits:
+            raise ValueError(f"Unknown media job kind: {kind}")
+        if kind not in self._semaphores:
+            self._semaphores[kind] = asyncio.Semaphore(self.limits[kind])
+        return self._semaphores[kind]
+
+    def _kind_stats(self, kind: str) -> dict:
+        if kind not in self._stats:
+            self._stats[kind] = {
+                "queued": 0,
+                "running": 0,
+                "max_queued": 0,
+                "completed": 0,
+                "failed": 0,
+                "total_wait_seconds": 0.0,
+                "total_run_seconds": 0.0,
+            }
+        return self._stats[kind]
+
+    async def _run(self, kind: str, job: Callable):
+        semaphore = self._semaphore(kind)
+        stats = self._kind_stats(kind)
+
+        queued_at = time.monotonic()
+        stats["queued"] += 1
+        stats["max_queued"] = max(stats["max_queued"], stats["queued"])
+        try:
+            await semaphore.acquire()
+        finally:
+            stats["queued"] -= 1
+
+        started_at = time.monotonic()
+        stats["total_wait_seconds"] += started_at - queued_at
+        stats["running"] += 1
+        try:
+            result = await job()
+            stats["completed"] += 1
+            return result
+        except Exception:
+            stats["failed"] += 1
+            raise
+        finally:
+            stats["running"] -= 1
+            stats["total_run_seconds"] += time.monotonic() - started_at
+            semaphore.release()
+
+    async def run_subprocess(self, kind: str, cmd: List[str]) -> SubprocessResult:
+        """Run an external command without blocking the event loop"""
+        async def job():
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            stdout, stderr = await process.communicate()
+            return SubprocessResult(
+                returncode=process.returncode,
+                stdout=stdout.decode("utf-8", errors="replace"),
+                stderr=stderr.decode("utf-8", errors="replace")
+            )
+
+        return await self._run(kind, job)
+
+    async def run_blocking(self, kind: str, func: Callable, *args):
+        """Run a blocking function on the shared thread pool"""
+        async def job():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.pool, func, *args)
+
+        return await self._run(kind, job)
+
+    def metrics(self) -> dict:
+        """Per-kind limits, queue depth and timing totals"""
+        return {
+            kind: {"limit": limit, **self._kind_stats(kind)}
+            for kind, limit in self.limits.items()
+        }
+
+
+media_executor = MediaExecutor()
@@ -125,5 +125,19 @@ class OllamaClient:
 
         return await self.generate(prompt)
 
+    async def embed(self, texts: List[str], model: Optional[str] = None) -> List[List[float]]:
+        """Embed texts using Ollama (one vector per text)"""
+        async with httpx.AsyncClient() as client:
+            response = await client.post(
+                f"{self.base_url}/api/embed",
+                json={
+                    "model": model or settings.embedding_model,
+                    "input": texts
+                },
+                timeout=120.0
+            )
+            response.raise_for_status()
+            return response.json().get("embeddings", [])
+
 
 ollama_client = OllamaClient()
@@ -0,0 +1,107 @@
+import base64
+from datetime import datetime
+from uuid import UUID
+from sqlalchemy import select, func, tuple_, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from typing import Optional, Tuple
+
+# Keyset position: (created_at, id) of the last row already returned
+Cursor = Tuple[datetime, UUID]
+
+
+def encode_cursor(created_at: datetime, item_id: UUID) -> str:
+    """
+    Encode a keyset position as an opaque URL-safe token.
+
+    Args:
+        created_at: created_at of the last row on the page
+        item_id: id of the last row on the page
+
+    Returns:
+        Cursor string for the next page
+    """
+    raw = f"{created_at.isoformat()}|{item_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Cursor:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, item_id = raw.split("|")
+        return datetime.fromisoformat(created_at), UUID(item_id)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+def before_cursor(model, cursor: Cursor):
+    """Rows after the cursor in (created_at DESC, id DESC) order"""
+    created_at, item_id = cursor
+    return tuple_(model.created_at, model.id) < tuple_(literal(created_at), literal(item_id))
+
+
+class Explain(Executable, ClauseElement):
+    """EXPLAIN (FORMAT JSON) of a statement, keeping its bound parameters"""
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+async def estimate_count(db: AsyncSession, stmt) -> int:
+    """Planner row estimate for a SELECT; constant time regardless of table size"""
+    plan = await db.scalar(Explain(stmt))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def capped_count(db: AsyncSession, stmt, cap: int) -> int:
+    """Exact count up to cap; a result equal to cap means "cap or more" """
+    return await db.scalar(select(func.count()).select_from(stmt.limit(cap).subquery()))
+
+
+async def fetch_keyset_page(
+    db: AsyncSession,
+    model,
+    stmt,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> Tuple[list, Optional[str]]:
+    """
+    Fetch a page of entities newest first, keyset-paginated on (created_at, id).
+
+    Args:
+        db: Database session
+        model: Entity with created_at and id columns
+        stmt: select(model) with any filters applied
+        limit: Page size; None returns everything after the cursor
+        cursor: Cursor returned with the previous page
+
+    Returns:
+        (entities, cursor of the next page or None on the last page)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    stmt = stmt.order_by(model.created_at.desc(), model.id.desc())
+    if cursor:
+        stmt = stmt.where(before_cursor(model, decode_cursor(cursor)))
+    if limit is not None:
+        stmt = stmt.limit(limit + 1)
+
+    items = (await db.scalars(stmt)).all()
+    if limit is None or len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, encode_cursor(items[-1].created_at, items[-1].id)
@@ -0,0 +1,43 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+class PeriodicTasks:
+    """
+    Background maintenance jobs run on a fixed interval inside each worker.
+
+    Jobs must be idempotent, since every worker process runs its own copy.
+    A failing run is logged and retried at the next interval.
+    """
+
+    def __init__(self):
+        self._jobs: List[Tuple[str, float, float, Callable[[], Awaitable]]] = []
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def add(self, name: str, interval: float, job: Callable[[], Awaitable], first_delay: Optional[float] = None) -> None:
+        """Register a job; an interval <= 0 disables it. The first run waits first_delay (default: interval)"""
+        if interval > 0:
+            self._jobs.append((name, interval, interval if first_delay is None else first_delay, job))
+
+    async def _loop(self, name: str, interval: float, delay: float, job: Callable[[], Awaitable]) -> None:
+        while True:
+            await asyncio.sleep(delay)
+            delay = interval
+            try:
+                await job()
+            except Exception as e:
+                print(f"Periodic job {name} failed: {e}")
+
+    async def start(self) -> None:
+        for name, interval, delay, job in self._jobs:
+            if name not in self._tasks:
+                self._tasks[name] = asyncio.create_task(self._loop(name, interval, delay, job))
+
+    async def stop(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks.clear()
+
+
+periodic_tasks = PeriodicTasks()
@@ -1,23 +1,52 @@
+import cv2
+import numpy as np
 from scenedetect import detect, ContentDetector, AdaptiveDetector
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 from app.config import get_settings
+from app.utils.media_executor import media_executor
 
 settings = get_settings()
 
 
 class SceneDetector:
-    def __init__(self, threshold: float = None, min_scene_len: int = None):
+    # Size of the downscaled frame used as a scene's visual signature
+    SIGNATURE_SIZE = (16, 9)
+
+    def __init__(
+        self,
+        threshold: float = None,
+        min_scene_len: int = None,
+        merge_min_duration: float = None,
+        merge_similarity: float = None,
+        merge_max_duration: float = None
+    ):
         """
         Initialize scene detector.
 
         Args:
             threshold: Detection threshold (lower = more sensitive)
             min_scene_len: Minimum scene length in frames
+            merge_min_duration: Scenes shorter than this (seconds) are merged into a neighbour
+            merge_similarity: Adjacent scenes at least this similar (0-1) are merged
+            merge_max_duration: Merging never grows a scene beyond this many seconds
         """
         self.threshold = threshold if threshold is not None else settings.scene_threshold
         self.min_scene_len = min_scene_len if min_scene_len is not None else settings.scene_min_length
+        self.merge_min_duration = merge_min_duration if merge_min_duration is not None else settings.scene_merge_min_duration
+        self.merge_similarity = merge_similarity if merge_similarity is not None else settings.scene_merge_similarity
+        self.merge_max_duration = (
+            merge_max_duration if merge_max_duration is not None else settings.scene_merge_max_duration
+        )
 
-    def detect_scenes(self, video_path: str) -> List[Tuple[float, float]]:
+    async def detect_scenes(self, video_path: str) -> List[Tuple[float, float]]:
+        """Detect scenes in a video on the media executor (see _detect_scenes)"""
+        return await media_executor.run_blocking("scene_detect", self._detect_scenes, video_path)
+
+    async def detect_scenes_adaptive(self, video_path: str) -> List[Tuple[float, float]]:
+        """Adaptive scene detection on the media executor (see _detect_scenes_adaptive)"""
+        return await media_executor.run_blocking("scene_detect", self._detect_scenes_adaptive, video_path)
+
+    def _detect_scenes(self, video_path: str) -> List[Tuple[float, float]]:
         """
         Detect scenes in a video.
 
@@ -48,7 +77,7 @@ class SceneDetector:
             # Return entire video as single scene on error
             return []
 
-    def detect_scenes_adaptive(self, video_path: str) -> List[Tuple[float, float]]:
+    def _detect_scenes_adaptive(self, video_path: str) -> List[Tuple[float, float]]:
         """
         Detect scenes using adaptive detection (better for varying content).
 
@@ -76,5 +105,107 @@ class SceneDetector:
             print(f"Error detecting scenes: {e}")
             return []
 
+    def compute_signatures(self, video_path: str, scenes: List[Tuple[float, float]]) -> List[Optional[np.ndarray]]:
+        """
+        Compute a downscaled colour signature from the middle frame of each scene.
+
+        Args:
+            video_path: Path to the video file
+            scenes: List of (start_time, end_time) tuples in seconds
+
+        Returns:
+            One float32 array per scene, or None where the frame could not be read
+        """
+        signatures = []
+        cap = cv2.VideoCapture(video_path)
+        try:
+            for start_time, end_time in scenes:
+                cap.set(cv2.CAP_PROP_POS_MSEC, (start_time + end_time) / 2 * 1000)
+                ok, frame = cap.read()
+                if not ok:
+                    signatures.append(None)
+                    continue
+                small = cv2.resize(frame, self.SIGNATURE_SIZE, interpolation=cv2.INTER_AREA)
+                signatures.append(small.astype(np.float32) / 255.0)
+        finally:
+            cap.release()
+        return signatures
+
+    @staticmethod
+    def signature_similarity(a: Optional[np.ndarray], b: Optional[np.ndarray]) -> float:
+        """Similarity of two signatures in [0, 1] (1 = identical); 0 if either is missing"""
+        if a is None or b is None:
+            return 0.0
+        return 1.0 - float(np.mean(np.abs(a - b)))
+
+    async def consolidate_scenes(self, video_path: str, scenes: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+        """
+        Merge adjacent micro-scenes produced by flashes and encoder noise.
+
+        Computes the scene signatures on the media executor and merges with
+        merge_scenes.
+
+        Args:
+            video_path: Path to the video file
+            scenes: Chronologically sorted list of (start_time, end_time) tuples
+
+        Returns:
+            Consolidated list of (start_time, end_time) tuples in seconds
+        """
+        if len(scenes) < 2:
+            return scenes
+
+        try:
+            signatures = await media_executor.run_blocking("scene_detect", self.compute_signatures, video_path, scenes)
+        except Exception as e:
+            print(f"Warning: Could not compute scene signatures: {e}")
+            signatures = [None] * len(scenes)
+
+        return self.merge_scenes(scenes, signatures)
+
+    def merge_scenes(
+        self,
+        scenes: List[Tuple[float, float]],
+        signatures: List[Optional[np.ndarray]]
+    ) -> List[Tuple[float, float]]:
+        """
+        Fold each scene into the merged run before it when either is shorter
+        than merge_min_duration, or when it looks like the run.
+
+        A run is compared through its first signature rather than its latest
+        scene, so a gradual fade or pan cannot chain-merge step by step, and
+        no merge grows a run beyond merge_max_duration.
+
+        Args:
+            scenes: Chronologically sorted list of (start_time, end_time) tuples
+            signatures: Signature of each scene (None where unavailable)
+
+        Returns:
+            Consolidated list of (start_time, end_time) tuples in seconds
+        """
+        if not scenes:
+            return scenes
+
+        merged = [scenes[0]]
+        run_signature = signatures[0]
+        for (start_time, end_time), signature in zip(scenes[1:], signatures[1:]):
+            last_start, last_end = merged[-1]
+            too_short = (
+                end_time - start_time < self.merge_min_duration
+                or last_end - last_start < self.merge_min_duration
+            )
+            similar = self.signature_similarity(run_signature, signature) >= self.merge_similarity
+            fits = end_time - last_start <= self.merge_max_duration
+
+            if (too_short or similar) and fits:
+                merged[-1] = (last_start, end_time)
+                if run_signature is None:
+                    run_signature = signature
+            else:
+                merged.append((start_time, end_time))
+                run_signature = signature
+
+        return merged
+
 
 scene_detector = SceneDetector()
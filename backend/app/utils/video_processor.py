@@ -1,7 +1,8 @@
 import os
-import subprocess
-from typing import Optional
+import json
+from typing import List, Optional
 from app.config import get_settings
+from app.utils.media_executor import media_executor
 
 settings = get_settings()
 
@@ -9,8 +10,9 @@ settings = get_settings()
 class VideoProcessor:
     def __init__(self, storage_path: Optional[str] = None):
         self.storage_path = storage_path or settings.storage_path
+        self.executor = media_executor
 
-    def get_video_info(self, file_path: str) -> dict:
+    async def get_video_info(self, file_path: str) -> dict:
         """Get video information using ffprobe"""
         cmd = [
             "ffprobe",
@@ -20,19 +22,18 @@ class VideoProcessor:
             "-show_streams",
             file_path
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = await self.executor.run_subprocess("probe", cmd)
         if result.returncode != 0:
             raise Exception(f"ffprobe error: {result.stderr}")
 
-        import json
         return json.loads(result.stdout)
 
-    def get_duration(self, file_path: str) -> float:
+    async def get_duration(self, file_path: str) -> float:
         """Get video duration in seconds"""
-        info = self.get_video_info(file_path)
+        info = await self.get_video_info(file_path)
         return float(info.get("format", {}).get("duration", 0))
 
-    def extract_clip(
+    async def extract_clip(
         self,
         input_path: str,
         output_path: str,
@@ -55,12 +56,12 @@ class VideoProcessor:
             "-movflags", "+faststart",
             output_path
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = await self.executor.run_subprocess("ffmpeg", cmd)
         if result.returncode != 0:
             raise Exception(f"ffmpeg error: {result.stderr}")
         return output_path
 
-    def extract_thumbnail(
+    async def extract_thumbnail(
         self,
         input_path: str,
         output_path: str,
@@ -75,7 +76,30 @@ class VideoProcessor:
             "-vframes", "1",
             output_path
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        result = await self.executor.run_subprocess("ffmpeg", cmd)
+        if result.returncode != 0:
+            raise Exception(f"ffmpeg error: {result.stderr}")
+        return output_path
+
+    async def concat_clips(self, clip_paths: List[str], output_path: str) -> str:
+        """Merge clips into one file without re-encoding"""
+        concat_file = f"{os.path.splitext(output_path)[0]}_concat.txt"
+        with open(concat_file, 'w') as f:
+            for clip in clip_paths:
+                f.write(f"file '{clip}'\n")
+
+        cmd = [
+            "ffmpeg", "-y",
+            "-f", "concat",
+            "-safe", "0",
+            "-i", concat_file,
+            "-c", "copy",
+            output_path
+        ]
+        try:
+            result = await self.executor.run_subprocess("ffmpeg", cmd)
+        finally:
+            os.remove(concat_file)
         if result.returncode != 0:
             raise Exception(f"ffmpeg error: {result.stderr}")
         return output_path
@@ -0,0 +1,73 @@
+import uuid
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import text
+
+from app.api.routes.images import IMAGE_FIELDS, get_images_batch, image_to_response
+from app.api.routes.scenes import get_scenes_batch
+from app.api.routes.videos import VIDEO_FIELDS, get_videos_batch, video_to_response
+from app.models.image import Image
+from app.models.video import Video
+from app.schemas.batch import BATCH_MAX_IDS, BatchRequest, build_batch_response, check_batch_fields
+
+
+def test_unknown_fields_are_rejected_without_items():
+    with pytest.raises(ValueError, match="Unknown fields: nope"):
+        check_batch_fields(BatchRequest(ids=[uuid.uuid4()], fields=["title", "nope"]), {"id", "title"})
+
+
+def test_items_keep_request_order_and_string_ids():
+    first, second, missing = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    items = {first: {"id": first, "title": "a"}, second: {"id": str(second), "title": "b"}}
+
+    response = build_batch_response(BatchRequest(ids=[second, missing, first, second], fields=["title"]), items)
+
+    assert response.items == [{"id": str(second), "title": "b"}, {"id": str(first), "title": "a"}]
+    assert response.missing == [missing]
+
+
+@pytest.mark.parametrize("endpoint", [get_videos_batch, get_images_batch, get_scenes_batch])
+def test_batch_endpoints_reject_unknown_fields_when_nothing_matches(run, db, endpoint):
+    with pytest.raises(HTTPException) as raised:
+        run(endpoint(BatchRequest(ids=[uuid.uuid4()], fields=["nope"]), db))
+
+    assert raised.value.status_code == 400
+
+
+@pytest.mark.parametrize("count", [1, BATCH_MAX_IDS - 1])
+@pytest.mark.parametrize("endpoint, kind, budget", [
+    (get_videos_batch, "videos", 3),  # Items, tag links, tags
+    (get_images_batch, "images", 3),
+    (get_scenes_batch, "scenes", 1),  # Tags are aggregated into the scene query
+])
+def test_batch_statements_do_not_grow_with_ids(run, db, statements, media, endpoint, kind, budget, count):
+    names = [f"batch-{uuid.uuid4().hex[:8]}" for _ in range(3)]
+    if kind == "scenes":
+        ids = media(videos=count, scenes=1, tags=names).scenes
+    else:
+        ids = getattr(media(**{kind: count}, tags=names), kind)
+    missing = uuid.uuid4()
+    run(db.execute(text("SELECT 1")))  # Connect outside the count
+    statements.clear()
+
+    response = run(endpoint(BatchRequest(ids=ids + [missing]), db))
+
+    assert len(statements) <= budget
+    assert len(response.items) == count and response.missing == [missing]
+    for item in response.items:
+        assert sorted(tag["name"] if isinstance(tag, dict) else tag.name for tag in item["tags"]) == sorted(names)
+
+
+def test_field_sets_match_the_responses(run, db):
+    async def responses():
+        video = Video(filename="v.mp4", file_path="/v.mp4")
+        image = Image(filename="i.png", file_path="/i.png")
+        db.add_all([video, image])
+        await db.flush()
+        return await video_to_response(video, db), await image_to_response(image, db)
+
+    video, image = run(responses())
+
+    assert set(video) == VIDEO_FIELDS
+    assert set(image) == IMAGE_FIELDS
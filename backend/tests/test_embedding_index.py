@@ -0,0 +1,73 @@
+import uuid
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import text
+
+from app.config import get_settings
+from app.models.database import AsyncSessionLocal
+from app.services import embedding_index as embedding_module
+from app.services.embedding_index import EmbeddingIndex, backfill_embeddings
+from app.utils.embeddings import hashing_embed
+
+settings = get_settings()
+
+
+def test_sync_with_no_vectors_can_repeat(run, db, monkeypatch):
+    monkeypatch.setattr(settings, "embedding_model", f"unused-{uuid.uuid4().hex[:8]}")
+    index = EmbeddingIndex()
+
+    run(index.sync(db))
+    run(index.sync(db))
+
+    assert index.search(hashing_embed("바다", 16), 5, ["scene", "image"]) == []
+
+
+def test_backfill_holds_no_row_lock_while_embedding(run, database, monkeypatch):
+    monkeypatch.setattr(settings, "embedding_model", "hashing")
+    monkeypatch.setattr(settings, "embedding_hash_dim", 16)
+    image_id = uuid.uuid4()
+    now = datetime.utcnow()
+    with database.begin() as connection:
+        # Older than every other row, so it is in the first backfill batch
+        connection.execute(text(
+            "INSERT INTO images (id, filename, title, file_path, status, created_at, updated_at) "
+            "VALUES (:id, 'sea.png', '바다 풍경', '/sea.png', 'tagged', '2000-01-01', :now)"
+        ), {"id": image_id, "now": now})
+
+    calls = []
+    real_embed_texts = embedding_module.embed_texts
+
+    async def embed_texts(texts):
+        # A user edit of the row being embedded must not wait for the model call
+        with database.connect() as connection:
+            connection.execute(text("SET lock_timeout = '1s'"))
+            connection.execute(text("UPDATE images SET user_notes = 'edited' WHERE id = :id"), {"id": image_id})
+            connection.commit()
+        calls.append(texts)
+        return await real_embed_texts(texts)
+
+    monkeypatch.setattr(embedding_module, "embed_texts", embed_texts)
+    run(backfill_embeddings())
+
+    assert calls
+    with database.connect() as connection:
+        model, data = connection.execute(
+            text("SELECT embedding_model, embedding FROM images WHERE id = :id"), {"id": image_id}
+        ).one()
+    assert model == "hashing"
+    assert np.frombuffer(data, dtype=np.float32).shape == (16,)
+
+
+def test_claimed_items_are_skipped_until_the_lease_expires(run, database, monkeypatch):
+    monkeypatch.setattr(settings, "embedding_model", f"claim-{uuid.uuid4().hex[:8]}")
+
+    async def claim():
+        async with AsyncSessionLocal() as db:
+            return await embedding_module.claim_backfill_batch("image", db)
+
+    first = run(claim())
+    second = run(claim())
+
+    assert first
+    assert not set(first) & set(second)
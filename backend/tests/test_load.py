@@ -0,0 +1,84 @@
+"""
+Requests/s of the async routes (opt-in: --run-slow).
+
+Throughput depends on the machine, so the numbers are printed and only
+gross regressions fail: concurrent requests must not collapse (pool
+starvation, serialization on a lock) and must keep being served while
+another connection waits on a slow statement, which a blocking driver
+on the event loop would not allow.
+"""
+import asyncio
+import time
+import uuid
+
+import httpx
+import pytest
+from sqlalchemy import text
+
+from app.main import app
+from app.models.database import AsyncSessionLocal
+from app.services.search_cache import search_cache
+
+REQUESTS = 200
+CONCURRENCY = 8
+SLOW_STATEMENT_SECONDS = 5
+ENDPOINTS = [("POST", "/api/search"), ("GET", "/api/videos")]
+
+
+async def requests_per_second(method: str, path: str, body, concurrency: int, requests: int = REQUESTS) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        remaining = iter(range(requests))
+
+        async def worker():
+            for _ in remaining:
+                response = await client.request(method, path, json=body)
+                assert response.status_code == 200, response.text
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - start)
+
+
+@pytest.fixture
+def library(media, monkeypatch):
+    tag = f"load-{uuid.uuid4().hex[:8]}"
+    media(videos=200, scenes=5, images=200, tags=[tag])
+    monkeypatch.setattr(search_cache, "max_size", 0)  # Measure the database path, not cache hits
+    return {"and_tags": [tag]}
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("method, path", ENDPOINTS)
+def test_requests_per_second(run, library, method, path):
+    body = library if method == "POST" else None
+
+    run(requests_per_second(method, path, body, 1, requests=20))  # Warm up connections
+    sequential = run(requests_per_second(method, path, body, 1))
+    concurrent = run(requests_per_second(method, path, body, CONCURRENCY))
+
+    print(f"\n{method} {path}: {sequential:.0f} req/s sequential, {concurrent:.0f} req/s with {CONCURRENCY} in flight")
+    assert concurrent >= sequential / 2
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("method, path", ENDPOINTS)
+def test_requests_are_served_during_a_slow_statement(run, library, method, path):
+    body = library if method == "POST" else None
+
+    async def scenario():
+        async def slow_statement():
+            async with AsyncSessionLocal() as db:
+                await db.execute(text(f"SELECT pg_sleep({SLOW_STATEMENT_SECONDS})"))
+
+        sleeper = asyncio.ensure_future(slow_statement())
+        await asyncio.sleep(0.1)
+        rate = await requests_per_second(method, path, body, CONCURRENCY, requests=10)
+        overlapped = not sleeper.done()
+        await sleeper
+        return rate, overlapped
+
+    rate, overlapped = run(scenario())
+
+    print(f"\n{method} {path}: {rate:.0f} req/s beside a {SLOW_STATEMENT_SECONDS} s statement")
+    assert overlapped
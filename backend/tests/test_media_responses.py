@@ -0,0 +1,68 @@
+import uuid
+
+import pytest
+from fastapi import Response
+from sqlalchemy import text
+
+from app.api.routes.images import get_images, image_to_response
+from app.api.routes.videos import get_videos, video_to_response
+from app.models.image import Image
+from app.models.tag import ImageTag, VideoTag
+from app.models.video import Video
+from app.services.tag_store import upsert_tags
+
+
+def test_video_response_of_freshly_flushed_video(run, db):
+    name = f"video-tag-{uuid.uuid4().hex[:8]}"
+
+    async def scenario():
+        video = Video(filename="v.mp4", file_path="/v.mp4")
+        db.add(video)
+        await db.flush()
+        tag_ids = await upsert_tags([name], db)
+        db.add(VideoTag(video_id=video.id, tag_id=tag_ids[name], confidence=0.5))
+        await db.flush()
+        await db.refresh(video)
+        return video.id, await video_to_response(video, db)
+
+    video_id, response = run(scenario())
+
+    assert response["id"] == video_id
+    assert [(tag.name, tag.confidence) for tag in response["tags"]] == [(name, 0.5)]
+
+
+def test_image_response_of_freshly_flushed_image(run, db):
+    name = f"image-tag-{uuid.uuid4().hex[:8]}"
+
+    async def scenario():
+        image = Image(filename="i.png", file_path="/i.png")
+        db.add(image)
+        await db.flush()
+        tag_ids = await upsert_tags([name], db)
+        db.add(ImageTag(image_id=image.id, tag_id=tag_ids[name]))
+        await db.flush()
+        return await image_to_response(image, db)
+
+    response = run(scenario())
+
+    assert [tag["name"] for tag in response["tags"]] == [name]
+
+
+def tag_names(tags):
+    return sorted(tag.name if hasattr(tag, "name") else tag["name"] for tag in tags)
+
+
+@pytest.mark.parametrize("rows, tags", [(1, 1), (40, 0), (40, 8)])
+@pytest.mark.parametrize("listing, kind", [(get_videos, "videos"), (get_images, "images")])
+def test_listing_page_statements_do_not_grow_with_rows_or_tags(run, db, statements, media, listing, kind, rows, tags):
+    names = [f"list-{uuid.uuid4().hex[:8]}" for _ in range(tags)]
+    created = getattr(media(**{kind: rows}, tags=names), kind)
+    run(db.execute(text("SELECT 1")))  # Connect outside the count
+    statements.clear()
+
+    page = run(listing(Response(), limit=rows, cursor=None, db=db))
+
+    # Page, tag links, tags: never one query per row
+    assert len(statements) <= 3
+    assert {str(item["id"]) for item in page} == {str(item_id) for item_id in created}
+    assert all(tag_names(item["tags"]) == sorted(names) for item in page)
@@ -0,0 +1,112 @@
+import asyncio
+import fcntl
+import hashlib
+import os
+import time
+import uuid
+
+import pytest
+
+from app.services.resumable_upload import ResumableUploadStore, UploadError
+from app.utils.file_storage import UPLOAD_CHUNK_SIZE
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResumableUploadStore(str(tmp_path))
+
+
+def upload(store, data: bytes) -> uuid.UUID:
+    meta = store.create("clip.mp4", len(data), UPLOAD_CHUNK_SIZE)
+    upload_id = uuid.UUID(meta["upload_id"])
+    chunks = [data[i:i + UPLOAD_CHUNK_SIZE] for i in range(0, len(data), UPLOAD_CHUNK_SIZE)]
+    for index in reversed(range(len(chunks))):
+        asyncio.run(store.write_chunk(upload_id, index, chunks[index], sha256(chunks[index])))
+    return upload_id
+
+
+def test_complete_assembles_and_hashes(store, tmp_path):
+    data = os.urandom(UPLOAD_CHUNK_SIZE * 2 + 123)
+    upload_id = upload(store, data)
+    target = str(tmp_path / "videos" / "clip.mp4")
+
+    size, digest = asyncio.run(store.complete(upload_id, target))
+
+    assert (size, digest) == (len(data), sha256(data))
+    with open(target, "rb") as f:
+        assert f.read() == data
+
+
+def test_incomplete_upload_cannot_complete(store, tmp_path):
+    meta = store.create("clip.mp4", UPLOAD_CHUNK_SIZE * 2, UPLOAD_CHUNK_SIZE)
+
+    with pytest.raises(UploadError) as error:
+        asyncio.run(store.complete(uuid.UUID(meta["upload_id"]), str(tmp_path / "out.mp4")))
+    assert error.value.status_code == 409
+
+
+def test_write_chunk_after_complete_is_rejected(store, tmp_path):
+    data = os.urandom(UPLOAD_CHUNK_SIZE + 1)
+    upload_id = upload(store, data)
+    asyncio.run(store.complete(upload_id, str(tmp_path / "out.mp4")))
+
+    with pytest.raises(UploadError) as error:
+        asyncio.run(store.write_chunk(upload_id, 0, data[:UPLOAD_CHUNK_SIZE], sha256(data[:UPLOAD_CHUNK_SIZE])))
+    assert error.value.status_code == 404
+
+
+def test_write_chunk_while_finalizing_is_rejected(store):
+    data = os.urandom(UPLOAD_CHUNK_SIZE + 1)
+    upload_id = upload(store, data)
+    open(os.path.join(store.root, str(upload_id), "finalizing"), "w").close()
+
+    with pytest.raises(UploadError) as error:
+        asyncio.run(store.write_chunk(upload_id, 0, data[:UPLOAD_CHUNK_SIZE], sha256(data[:UPLOAD_CHUNK_SIZE])))
+    assert error.value.status_code == 409
+
+
+def test_complete_waits_for_chunks_in_flight(store, tmp_path):
+    upload_id = upload(store, os.urandom(100))
+    session_dir = os.path.join(store.root, str(upload_id))
+
+    async def scenario():
+        # Held the way write_chunk holds it while writing
+        fd = os.open(os.path.join(session_dir, "lock"), os.O_RDONLY | os.O_CREAT)
+        fcntl.flock(fd, fcntl.LOCK_SH)
+        finalize = asyncio.ensure_future(store.complete(upload_id, str(tmp_path / "out.mp4")))
+        await asyncio.sleep(0.2)
+        started = finalize.done() or os.path.exists(os.path.join(session_dir, "finalizing"))
+        os.close(fd)
+        await finalize
+        return started
+
+    assert asyncio.run(scenario()) is False
+    assert os.path.exists(tmp_path / "out.mp4")
+
+
+def test_second_complete_is_rejected(store, tmp_path):
+    upload_id = upload(store, os.urandom(100))
+    open(os.path.join(store.root, str(upload_id), "finalizing"), "w").close()
+
+    with pytest.raises(UploadError) as error:
+        asyncio.run(store.complete(upload_id, str(tmp_path / "out.mp4")))
+    assert error.value.status_code == 409
+
+
+def test_sweep_removes_only_idle_sessions(store):
+    idle = uuid.UUID(store.create("old.mp4", 10)["upload_id"])
+    active = uuid.UUID(store.create("new.mp4", 10)["upload_id"])
+    old = time.time() - 3600
+    idle_dir = os.path.join(store.root, str(idle))
+    for path in (idle_dir, os.path.join(idle_dir, "chunks")):
+        os.utime(path, (old, old))
+
+    assert store.sweep_expired(ttl=60) == 1
+
+    with pytest.raises(UploadError):
+        store.get_meta(idle)
+    assert store.get_meta(active)["filename"] == "new.mp4"
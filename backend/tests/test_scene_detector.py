@@ -0,0 +1,47 @@
+import numpy as np
+
+from app.utils.scene_detector import SceneDetector
+
+
+def signature(value: float) -> np.ndarray:
+    return np.full((9, 16, 3), value, dtype=np.float32)
+
+
+def test_fade_does_not_chain_merge():
+    # Each step is 4% apart, so neighbours always look alike, but the fade as a whole does not
+    detector = SceneDetector(merge_min_duration=1.0, merge_similarity=0.95, merge_max_duration=1000)
+    scenes = [(i * 5.0, i * 5.0 + 5.0) for i in range(10)]
+    signatures = [signature(i * 0.04) for i in range(10)]
+
+    merged = detector.merge_scenes(scenes, signatures)
+
+    assert len(merged) > 1
+    assert merged[0][0] == 0.0 and merged[-1][1] == 50.0
+
+
+def test_identical_scenes_merge_up_to_max_duration():
+    detector = SceneDetector(merge_min_duration=1.0, merge_similarity=0.95, merge_max_duration=20)
+    scenes = [(i * 5.0, i * 5.0 + 5.0) for i in range(10)]
+
+    merged = detector.merge_scenes(scenes, [signature(0.5)] * 10)
+
+    assert merged == [(0.0, 20.0), (20.0, 40.0), (40.0, 50.0)]
+
+
+def test_flashes_are_capped():
+    detector = SceneDetector(merge_min_duration=1.0, merge_similarity=2.0, merge_max_duration=3)
+    scenes = [(i * 0.5, i * 0.5 + 0.5) for i in range(20)]
+
+    merged = detector.merge_scenes(scenes, [None] * 20)
+
+    assert all(end - start <= 3 for start, end in merged)
+    assert merged[0][0] == 0.0 and merged[-1][1] == 10.0
+
+
+def test_short_scene_merges_into_neighbour():
+    detector = SceneDetector(merge_min_duration=1.0, merge_similarity=2.0, merge_max_duration=120)
+    scenes = [(0.0, 10.0), (10.0, 10.3), (10.3, 20.0)]
+
+    merged = detector.merge_scenes(scenes, [signature(0.1), signature(0.9), signature(0.5)])
+
+    assert merged == [(0.0, 10.3), (10.3, 20.0)]
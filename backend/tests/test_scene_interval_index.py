@@ -0,0 +1,141 @@
+import asyncio
+import json
+import random
+import uuid
+
+import asyncpg
+from sqlalchemy import text
+
+from app.services.db_events import get_listener_dsn
+from app.services.scene_interval_index import SCENE_TIMELINE_CHANNEL, SceneIntervals
+
+
+def intervals(*spans):
+    """SceneIntervals over scenes named by their index, sorted by start time like the timeline query"""
+    scenes = [{"id": i, "start_time": start, "end_time": end} for i, (start, end) in enumerate(spans)]
+    return SceneIntervals(sorted(scenes, key=lambda scene: scene["start_time"]))
+
+
+def ids(scenes):
+    return [scene["id"] for scene in scenes]
+
+
+def test_boundaries_belong_to_the_scene_that_starts_there():
+    index = intervals((0, 5), (5, 10), (10, 15))
+
+    assert ids(index.at(0)) == [0]
+    assert ids(index.at(5)) == [1]
+    assert ids(index.at(9.999)) == [1]
+    assert ids(index.at(15)) == []
+    assert ids(index.between(5, 10)) == [1]
+    assert ids(index.between(4.5, 10.5)) == [0, 1, 2]
+    assert ids(index.between(15, 20)) == []
+    assert ids(index.between(7, 7)) == ids(index.at(7))
+
+
+def test_overlapping_scenes():
+    index = intervals((0, 10), (5, 15), (12, 20))
+
+    assert ids(index.at(6)) == [0, 1]
+    assert ids(index.at(10)) == [1]
+    assert ids(index.at(12)) == [1, 2]
+    assert ids(index.between(10, 12)) == [1]
+    assert ids(index.between(9, 13)) == [0, 1, 2]
+
+
+def test_long_early_scene_is_found_past_later_short_ones():
+    index = intervals((0, 100), (10, 20), (30, 40), (50, 60))
+
+    assert ids(index.at(55)) == [0, 3]
+    assert ids(index.at(45)) == [0]
+    assert ids(index.at(100)) == []
+    assert ids(index.between(35, 52)) == [0, 2, 3]
+    assert ids(index.between(60, 100)) == [0]
+
+
+def test_empty_video():
+    index = intervals()
+
+    assert len(index) == 0
+    assert index.at(1) == [] and index.between(0, 1) == []
+
+
+def test_lookups_match_a_linear_scan():
+    rng = random.Random(7)
+    spans = [(start, start + rng.choice([1, 2, 5, 30])) for start in (rng.randrange(0, 100) for _ in range(60))]
+    index = intervals(*spans)
+    times = sorted({t for span in spans for t in span} | {rng.uniform(0, 130) for _ in range(50)})
+
+    for t in times:
+        assert sorted(ids(index.at(t))) == [i for i, (start, end) in enumerate(spans) if start <= t < end]
+    for start, end in zip(times, times[1:]):
+        assert sorted(ids(index.between(start, end))) == [
+            i for i, (s, e) in enumerate(spans) if s < end and e > start
+        ]
+
+
+def notified_videos(run, database, statement, params):
+    """Video ids announced on the scene_timeline channel for one committed statement"""
+    async def listen():
+        received = set()
+        connection = await asyncpg.connect(get_listener_dsn())
+        try:
+            await connection.add_listener(
+                SCENE_TIMELINE_CHANNEL, lambda *args: received.add(uuid.UUID(json.loads(args[3])["video_id"]))
+            )
+
+            def write():
+                with database.begin() as connection:
+                    connection.execute(text(statement), params)
+
+            await asyncio.get_running_loop().run_in_executor(None, write)
+            await asyncio.sleep(0.2)
+        finally:
+            await connection.close()
+        return received
+
+    return run(listen())
+
+
+def test_moved_scene_announces_both_videos(run, database, media):
+    source, target = media(videos=2, scenes=1).videos
+    with database.connect() as connection:
+        scene_id = connection.scalar(text("SELECT id FROM scenes WHERE video_id = :video"), {"video": source})
+
+    assert notified_videos(
+        run, database, "UPDATE scenes SET video_id = :target WHERE id = :scene", {"target": target, "scene": scene_id}
+    ) == {source, target}
+
+
+def test_moved_scene_tag_announces_both_videos(run, database, media):
+    tagged = media(videos=1, scenes=1, tags=[f"timeline-{uuid.uuid4().hex[:8]}"])
+    untagged = media(videos=1, scenes=1)
+
+    assert notified_videos(
+        run, database, "UPDATE scene_tags SET scene_id = :target WHERE scene_id = :source",
+        {"source": tagged.scenes[0], "target": untagged.scenes[0]}
+    ) == {tagged.videos[0], untagged.videos[0]}
+
+
+def test_timeline_edits_are_announced(run, database, media):
+    created = media(videos=1, scenes=2, tags=[f"timeline-{uuid.uuid4().hex[:8]}"])
+
+    assert notified_videos(
+        run, database, "UPDATE scenes SET end_time = end_time + 1 WHERE id = :scene", {"scene": created.scenes[0]}
+    ) == set(created.videos)
+    assert notified_videos(
+        run, database, "UPDATE scene_tags SET confidence = 0.5 WHERE scene_id = :scene", {"scene": created.scenes[0]}
+    ) == set(created.videos)
+
+
+def test_updates_outside_the_timeline_are_not_announced(run, database, media):
+    created = media(videos=1, scenes=2, tags=[f"timeline-{uuid.uuid4().hex[:8]}"])
+    params = {"video": created.videos[0]}
+
+    assert notified_videos(
+        run, database, "UPDATE scenes SET phash = 42, embedded_at = now() WHERE video_id = :video", params
+    ) == set()
+    # Unchanged values are not changes either
+    assert notified_videos(
+        run, database, "UPDATE scenes SET start_time = start_time WHERE video_id = :video", params
+    ) == set()
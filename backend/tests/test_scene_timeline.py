@@ -0,0 +1,122 @@
+import json
+import os
+import time
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+from app.api.routes.videos import get_video_scenes
+
+# Scenes of the long video in the payload benchmark
+BENCH_SCENES = int(os.environ.get("BENCH_TIMELINE_SCENES", "2000"))
+
+
+def scene_list(run, db, statements, video_id, format):
+    """Fetch a video's scene list; returns (response, statements it sent)"""
+    run(db.execute(text("SELECT 1")))  # Connect outside the count
+    statements.clear()
+    response = run(get_video_scenes(video_id, format, db))
+    return response, list(statements)
+
+
+def rows_from_columns(columns):
+    """Rebuild the row form from the columnar form"""
+    return [
+        {
+            "id": columns["ids"][i],
+            "start_time": columns["start_time"][i],
+            "end_time": columns["end_time"][i],
+            "thumbnail_path": columns["thumbnail_path"][i],
+            "clip_path": columns["clip_path"][i],
+            "user_notes": columns["user_notes"][i],
+            "tags": [
+                {**columns["tags"][index], "confidence": confidence, "source": source}
+                for index, confidence, source in zip(
+                    columns["tag_indexes"][i], columns["tag_confidences"][i], columns["tag_sources"][i]
+                )
+            ],
+        }
+        for i in range(columns["count"])
+    ]
+
+
+def comparable(rows):
+    return [
+        {**{key: row[key] for key in ("id", "start_time", "end_time", "thumbnail_path", "clip_path", "user_notes")},
+         "tags": sorted(row["tags"], key=lambda tag: tag["name"])}
+        for row in rows
+    ]
+
+
+@pytest.mark.parametrize("scenes, tags", [(1, 0), (3, 2), (200, 5)])
+@pytest.mark.parametrize("format", ["rows", "columnar"])
+def test_scene_list_is_one_statement(run, db, statements, media, scenes, tags, format):
+    names = [f"timeline-{uuid.uuid4().hex[:8]}" for _ in range(tags)]
+    created = media(videos=1, scenes=scenes, tags=names)
+
+    response, sent = scene_list(run, db, statements, created.videos[0], format)
+
+    assert len(sent) == 1
+    rows = response["scenes"] if format == "rows" else rows_from_columns(response)
+    assert [row["id"] for row in rows] == [str(scene_id) for scene_id in created.scenes]
+    assert [row["start_time"] for row in rows] == sorted(row["start_time"] for row in rows)
+    assert all(sorted(tag["name"] for tag in row["tags"]) == sorted(names) for row in rows)
+
+
+def test_columnar_form_carries_the_same_scenes(run, db, statements, media, database):
+    names = [f"timeline-{uuid.uuid4().hex[:8]}" for _ in range(3)]
+    created = media(videos=1, scenes=4, tags=names)
+    with database.begin() as connection:
+        # Different tag sets, confidences and sources per scene
+        connection.execute(text("DELETE FROM scene_tags WHERE scene_id = :scene AND tag_id = :tag"),
+                           {"scene": created.scenes[1], "tag": created.tags[names[0]]})
+        connection.execute(text("UPDATE scene_tags SET confidence = 0.25, source = 'user' WHERE scene_id = :scene"),
+                           {"scene": created.scenes[2]})
+        connection.execute(text("UPDATE scenes SET user_notes = 'note', thumbnail_path = '/t.jpg' WHERE id = :scene"),
+                           {"scene": created.scenes[3]})
+
+    rows, _ = scene_list(run, db, statements, created.videos[0], "rows")
+    columns, _ = scene_list(run, db, statements, created.videos[0], "columnar")
+
+    assert columns["format"] == "columnar"
+    assert comparable(rows_from_columns(columns)) == comparable(rows["scenes"])
+    assert len(columns["tags"]) == len(names)  # Each tag sent once
+
+
+@pytest.mark.slow
+def test_benchmark_timeline_payload(run, db, statements, media, database):
+    """JSON size and parse time of BENCH_TIMELINE_SCENES scenes, rows vs columnar"""
+    names = [f"bench-{uuid.uuid4().hex[:8]}" for _ in range(50)]
+    created = media(videos=1, tags=names)
+    video_id = created.videos[0]
+    with database.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO scenes (id, video_id, start_time, end_time, thumbnail_path, created_at) "
+            "SELECT gen_random_uuid(), :video, i * 2, i * 2 + 2, '/thumbnails/' || i || '.jpg', now() "
+            "FROM generate_series(0, :n - 1) i"
+        ), {"video": video_id, "n": BENCH_SCENES})
+        # Five tags per scene out of 50
+        connection.execute(text("""
+            INSERT INTO scene_tags (id, scene_id, tag_id, confidence, source, created_at)
+            SELECT gen_random_uuid(), s.id, (CAST(:tags AS uuid[]))[1 + (abs(hashtext(s.id::text || k)) % 50)],
+                   0.8, 'ai', now()
+            FROM scenes s, generate_series(1, 5) k
+            WHERE s.video_id = :video
+            ON CONFLICT DO NOTHING
+        """), {"video": video_id, "tags": list(created.tags.values())})
+
+    payloads = {}
+    for format in ("rows", "columnar"):
+        response, sent = scene_list(run, db, statements, video_id, format)
+        assert len(sent) == 1
+        body = json.dumps(response, default=str)
+        started = time.perf_counter()
+        for _ in range(5):
+            json.loads(body)
+        payloads[format] = len(body), (time.perf_counter() - started) / 5 * 1000
+    (rows_size, rows_ms), (columns_size, columns_ms) = payloads["rows"], payloads["columnar"]
+    print(f"\n{BENCH_SCENES} scenes: rows {rows_size / 1024:.0f} KiB, parse {rows_ms:.1f} ms; "
+          f"columnar {columns_size / 1024:.0f} KiB, parse {columns_ms:.1f} ms")
+    assert columns_size * 2 < rows_size
+    assert columns_ms < rows_ms
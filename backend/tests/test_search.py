@@ -0,0 +1,155 @@
+import os
+import time
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+from app.api.routes.search import SearchQuery, _run_search
+
+TARGETS = ["videos", "scenes", "images"]
+LINKS = {"videos": ("video_tags", "video_id"), "scenes": ("scene_tags", "scene_id"), "images": ("image_tags", "image_id")}
+
+# Scenes seeded by the facet benchmark, and its latency budget for one faceted page
+BENCH_SCENES = int(os.environ.get("BENCH_FACET_SCENES", "1000000"))
+BENCH_BUDGET_MS = float(os.environ.get("BENCH_FACET_BUDGET_MS", "1000"))
+
+
+def search(run, db, statements, **query):
+    """Run one search page; returns (response, statements it sent)"""
+    run(db.execute(text("SELECT 1")))  # Connect outside the count
+    statements.clear()
+    response = run(_run_search(SearchQuery(**query), db))
+    return response, list(statements)
+
+
+@pytest.mark.parametrize("videos, tags", [(3, 1), (30, 4)])
+def test_search_page_is_one_statement_per_target(run, db, statements, media, videos, tags):
+    names = [f"count-{uuid.uuid4().hex[:8]}" for _ in range(tags)]
+    media(videos=videos, scenes=3, images=videos, tags=names)
+
+    response, sent = search(
+        run, db, statements, and_tags=names[:1], not_tags=[f"absent-{names[0]}"], limit=10, facets=5
+    )
+
+    # One tag lookup, then per target one statement with page, total, result tags and facets
+    assert len(sent) == 1 + len(TARGETS)
+    pages = sent[1:]
+    assert all("count(*) OVER ()" in statement for statement in pages)
+    assert all("json_agg" in statement for statement in pages)
+    assert all("array_agg" in statement for statement in pages)
+    assert (response.total_videos, response.total_scenes, response.total_images) == (videos, videos * 3, videos)
+    assert all(sorted(item.tags) == sorted(names) for item in response.videos + response.scenes + response.images)
+
+
+def test_later_pages_keep_the_window_total(run, db, statements, media):
+    name = f"count-{uuid.uuid4().hex[:8]}"
+    media(videos=5, scenes=1, images=5, tags=[name])
+
+    response, sent = search(run, db, statements, and_tags=[name], limit=2, page=2)
+
+    assert len(sent) == 1 + len(TARGETS)
+    assert (response.total_videos, len(response.videos)) == (5, 2)
+
+
+def naive_facets(connection, target, and_ids, or_ids, not_ids):
+    """Facet counts by GROUP BY over the association table, independent of tag_ids"""
+    links, owner = LINKS[target]
+    rows = connection.execute(text(f"""
+        SELECT t.name, count(*) FROM {links} l JOIN tags t ON t.id = l.tag_id
+        WHERE l.{owner} IN (
+            SELECT {owner} FROM {links} GROUP BY {owner}
+            HAVING count(*) FILTER (WHERE tag_id = ANY(CAST(:and_ids AS uuid[]))) = cardinality(CAST(:and_ids AS uuid[]))
+               AND (cardinality(CAST(:or_ids AS uuid[])) = 0 OR bool_or(tag_id = ANY(CAST(:or_ids AS uuid[]))))
+               AND NOT bool_or(tag_id = ANY(CAST(:not_ids AS uuid[])))
+        ) AND l.tag_id <> ALL(CAST(:and_ids AS uuid[]))
+        GROUP BY t.name
+    """), {"and_ids": and_ids, "or_ids": or_ids, "not_ids": not_ids}).all()
+    return dict(rows)
+
+
+@pytest.mark.parametrize("query", [
+    {"and_tags": ["a"]},
+    {"and_tags": ["a"], "not_tags": ["d"]},
+    {"or_tags": ["b", "d"], "not_tags": ["c"]},
+])
+def test_facet_counts_match_a_naive_group_by(run, db, statements, media, database, query):
+    prefix = f"facet-{uuid.uuid4().hex[:8]}-"
+    groups = [(3, "abc"), (2, "ab"), (1, "ad"), (4, "b"), (2, "cd")]
+    for count, names in groups:
+        media(videos=count, scenes=2, images=count, tags=[prefix + name for name in names])
+    query = {key: [prefix + name for name in names] for key, names in query.items()}
+
+    response, sent = search(run, db, statements, **query, limit=2, facets=10)
+
+    # Facets ride along in the page statement: still one per target
+    assert len(sent) == 1 + len(TARGETS)
+    ids = {name: tag_id for name, tag_id in run(db.execute(
+        text("SELECT name, id FROM tags WHERE name LIKE :prefix"), {"prefix": prefix + "%"}
+    )).all()}
+    with database.connect() as connection:
+        for target in TARGETS:
+            expected = naive_facets(connection, target, *(
+                [ids[name] for name in query.get(key, [])] for key in ("and_tags", "or_tags", "not_tags")
+            ))
+            assert expected
+            assert {facet.name: facet.count for facet in response.facets[target]} == expected
+
+
+def test_ranked_search_returns_connections_of_timed_out_targets(run, db, media, monkeypatch):
+    from app.api.routes import search as routes
+    from app.models.database import async_engine
+
+    name = f"ranked-{uuid.uuid4().hex[:8]}"
+    media(videos=2, scenes=1, images=2, tags=[name])
+    compile_ranked = routes.compile_ranked
+
+    def slow_images(target, tag_filter, limit):
+        return text("SELECT pg_sleep(2)") if target == "images" else compile_ranked(target, tag_filter, limit)
+
+    monkeypatch.setattr(routes, "compile_ranked", slow_images)
+    run(db.execute(text("SELECT 1")))
+    checked_out = async_engine.pool.checkedout()
+
+    response = run(routes.ranked_search(
+        routes.RankedSearchQuery(or_tags=[name], deadline_ms=500), db
+    ))
+
+    assert response.partial and response.timed_out == ["images"]
+    assert {result.type for result in response.results} == {"video", "scene"}
+    # The cancelled branch has already given its connection back
+    assert async_engine.pool.checkedout() == checked_out
+
+
+@pytest.mark.slow
+def test_benchmark_faceted_page_latency(run, db, media, database):
+    """One faceted search page over BENCH_FACET_SCENES scenes against BENCH_FACET_BUDGET_MS"""
+    names = [f"bench-{uuid.uuid4().hex[:8]}" for _ in range(50)]
+    tags = list(media(tags=names).tags.values())
+    video_id = media(videos=1).videos[0]
+    with database.begin() as connection:
+        # tag_ids written directly: search and facets read only the array, and
+        # skipping scene_tags keeps seeding a million scenes to seconds
+        connection.execute(text("""
+            INSERT INTO scenes (id, video_id, start_time, end_time, created_at, tag_ids)
+            SELECT gen_random_uuid(), :video, i, i + 1, now(),
+                   ARRAY(SELECT DISTINCT (CAST(:tags AS uuid[]))[1 + (abs(hashtext(i::text || k)) % 50)]
+                         FROM generate_series(1, 4) k)
+            FROM generate_series(1, :n) i
+        """), {"video": video_id, "tags": tags, "n": BENCH_SCENES})
+        connection.execute(text("ANALYZE scenes"))
+
+    query = SearchQuery(and_tags=names[:1], target=["scenes"], limit=20, facets=10)
+    try:
+        run(_run_search(query, db))  # Warm up the plan and buffers
+        timings = []
+        for _ in range(3):
+            started = time.perf_counter()
+            response = run(_run_search(query, db))
+            timings.append((time.perf_counter() - started) * 1000)
+        print(f"\n{BENCH_SCENES} scenes, {response.total_scenes} matches: faceted page {min(timings):.0f} ms")
+        assert len(response.facets["scenes"]) == 10
+        assert min(timings) <= BENCH_BUDGET_MS
+    finally:
+        with database.begin() as connection:
+            connection.execute(text("DELETE FROM scenes WHERE video_id = :video"), {"video": video_id})
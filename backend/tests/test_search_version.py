@@ -0,0 +1,76 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.models.database import AsyncSessionLocal
+from app.services.search_cache import search_cache, fold_search_version
+
+
+async def current_version():
+    async with AsyncSessionLocal() as db:
+        return await search_cache.version(db)
+
+
+async def fold():
+    async with AsyncSessionLocal() as db:
+        return await fold_search_version(db)
+
+
+def create_video(database):
+    video_id = uuid.uuid4()
+    now = datetime.utcnow()
+    with database.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO videos (id, filename, file_path, status, created_at, updated_at) "
+            "VALUES (:id, 'v.mp4', '/v.mp4', 'uploaded', :now, :now)"
+        ), {"id": video_id, "now": now})
+    return video_id
+
+
+def test_unsearched_column_updates_keep_the_version(run, database):
+    video_id = create_video(database)
+    before = run(current_version())
+
+    with database.begin() as connection:
+        connection.execute(text("UPDATE videos SET updated_at = now(), poster_path = '/p.jpg' WHERE id = :id"),
+                           {"id": video_id})
+
+    assert run(current_version()) == before
+
+
+def test_one_bump_per_writing_transaction(run, database):
+    video_id = create_video(database)
+    tag_id = uuid.uuid4()
+    before = run(current_version())
+
+    with database.begin() as connection:
+        connection.execute(text("UPDATE videos SET title = 'renamed' WHERE id = :id"), {"id": video_id})
+        connection.execute(text("INSERT INTO tags (id, name, created_at) VALUES (:id, :name, now())"),
+                           {"id": tag_id, "name": f"version-{tag_id.hex[:8]}"})
+        connection.execute(text(
+            "INSERT INTO video_tags (id, video_id, tag_id, created_at) VALUES (gen_random_uuid(), :video, :tag, now())"
+        ), {"video": video_id, "tag": tag_id})
+
+    assert run(current_version()) == before + 1
+
+
+def test_statement_without_rows_does_not_bump(run, database):
+    before = run(current_version())
+
+    with database.begin() as connection:
+        connection.execute(text("DELETE FROM video_tags WHERE video_id = :id"), {"id": uuid.uuid4()})
+
+    assert run(current_version()) == before
+
+
+def test_fold_keeps_the_version(run, database):
+    video_id = create_video(database)
+    with database.begin() as connection:
+        connection.execute(text("UPDATE videos SET title = 'folded' WHERE id = :id"), {"id": video_id})
+    before = run(current_version())
+
+    assert run(fold()) >= 1
+    assert run(current_version()) == before
+    with database.connect() as connection:
+        assert connection.scalar(text("SELECT count(*) FROM search_version_log")) == 0
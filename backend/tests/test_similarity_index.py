@@ -0,0 +1,36 @@
+import uuid
+
+from app.services.similarity_index import SimilarityIndex
+
+
+def test_re_added_item_is_found_once():
+    index = SimilarityIndex()
+    item_id = uuid.uuid4()
+
+    index.add("image", item_id, 0b1010)
+    index.remove("image", item_id)
+    index.add("image", item_id, 0b1010)
+
+    assert index.find(0b1010, 0) == [(0, "image", item_id)]
+
+
+def test_item_hashed_back_to_an_old_fingerprint_is_found_once():
+    index = SimilarityIndex()
+    item_id = uuid.uuid4()
+
+    index.add("scene", item_id, 0b1010)
+    index.add("scene", item_id, 0b0101)
+    index.add("scene", item_id, 0b1010)
+
+    assert index.find(0b1010, 64) == [(0, "scene", item_id)]
+
+
+def test_stale_fingerprints_are_not_found():
+    index = SimilarityIndex()
+    first, second = uuid.uuid4(), uuid.uuid4()
+
+    index.add("image", first, 0b1111)
+    index.add("image", second, 0b1110)
+    index.add("image", first, 0)
+
+    assert index.find(0b1111, 1) == [(1, "image", second)]
@@ -0,0 +1,40 @@
+import uuid
+
+import pytest
+
+from app.services.db_events import db_events
+from app.services.tag_cache import TagCache
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(db_events, "connected", True)
+    return TagCache(max_size=2)
+
+
+def test_put_and_evict_least_recently_used(cache):
+    a, b, c = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    cache.put("a", a)
+    cache.put("b", b)
+    cache.get_ids(["a"])
+    cache.put("c", c)
+
+    assert cache.get_ids(["a", "b", "c"]) == ({"a": a, "c": c}, ["b"])
+    assert cache.get_name(c) == "c"
+
+
+def test_fetch_racing_with_delete_is_not_cached(cache):
+    tag_id = uuid.uuid4()
+    generation = cache.generation
+    # The delete notification arrives while the fetch is in flight
+    cache.handle_event({"op": "delete", "id": str(tag_id), "name": "a"})
+    cache.put_many({"a": tag_id}, generation)
+
+    assert cache.get_ids(["a"]) == ({}, ["a"])
+
+
+def test_inactive_without_listener(cache, monkeypatch):
+    cache.put("a", uuid.uuid4())
+    monkeypatch.setattr(db_events, "connected", False)
+
+    assert cache.get_ids(["a"]) == ({}, ["a"])
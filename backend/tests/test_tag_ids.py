@@ -0,0 +1,139 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+import pytest
+from sqlalchemy import text
+
+from app.services.search_compiler import TagFilter, compile_match
+
+# Scene-tag links seeded by the benchmark; the request's figure is 10M
+BENCH_LINKS = int(os.environ.get("BENCH_TAG_LINKS", "200000"))
+
+
+def tag_ids(connection, table, item_id):
+    return set(connection.scalar(text(f"SELECT tag_ids FROM {table} WHERE id = :id"), {"id": item_id}))
+
+
+def test_tag_ids_follow_link_writes(media, database):
+    names = [f"ids-{uuid.uuid4().hex[:8]}" for _ in range(3)]
+    created = media(videos=1, scenes=2, images=1, tags=names)
+    first, second, third = (created.tags[name] for name in names)
+
+    with database.begin() as connection:
+        assert tag_ids(connection, "videos", created.videos[0]) == {first, second, third}
+        assert tag_ids(connection, "images", created.images[0]) == {first, second, third}
+
+        connection.execute(text("DELETE FROM scene_tags WHERE tag_id = :tag"), {"tag": second})
+        for scene_id in created.scenes:
+            assert tag_ids(connection, "scenes", scene_id) == {first, third}
+
+
+def test_concurrent_links_to_one_entity_are_both_kept(media, database):
+    created = media(videos=1, tags=[f"ids-{uuid.uuid4().hex[:8]}"])
+    video_id = created.videos[0]
+    names = [f"ids-{uuid.uuid4().hex[:8]}" for _ in range(2)]
+    new_tags = media(tags=names).tags
+
+    def link(connection, tag_id):
+        connection.execute(text(
+            "INSERT INTO video_tags (id, video_id, tag_id, created_at) VALUES (gen_random_uuid(), :video, :tag, now())"
+        ), {"video": video_id, "tag": tag_id})
+
+    with database.connect() as a, database.connect() as b:
+        link(a, new_tags[names[0]])  # Holds the video row until commit
+        waiting = threading.Thread(target=link, args=(b, new_tags[names[1]]))
+        waiting.start()
+        time.sleep(0.2)
+        a.commit()
+        waiting.join()
+        b.commit()
+
+    with database.connect() as connection:
+        assert tag_ids(connection, "videos", video_id) == set(created.tags.values()) | set(new_tags.values())
+
+
+def join_match(connection, and_ids, or_ids, not_ids, scene_ids):
+    """Scene ids matching the tag expression, via the association table"""
+    return set(connection.scalars(text("""
+        SELECT s.id FROM scenes s
+        WHERE s.id = ANY(:scenes)
+          AND (SELECT count(DISTINCT st.tag_id) FROM scene_tags st
+               WHERE st.scene_id = s.id AND st.tag_id = ANY(:and_ids)) = cardinality(CAST(:and_ids AS uuid[]))
+          AND (cardinality(CAST(:or_ids AS uuid[])) = 0 OR EXISTS (
+               SELECT 1 FROM scene_tags st WHERE st.scene_id = s.id AND st.tag_id = ANY(:or_ids)))
+          AND NOT EXISTS (SELECT 1 FROM scene_tags st WHERE st.scene_id = s.id AND st.tag_id = ANY(:not_ids))
+    """), {"scenes": scene_ids, "and_ids": and_ids, "or_ids": or_ids, "not_ids": not_ids}))
+
+
+def test_array_match_equals_join_match(media, database):
+    names = [f"ids-{uuid.uuid4().hex[:8]}" for _ in range(4)]
+    tags = media(tags=names).tags
+    a, b, c, d = (tags[name] for name in names)
+    scenes = media(videos=1, scenes=16).scenes
+    with database.begin() as connection:
+        # Scene i carries the tags whose bit is set in i
+        for i, scene_id in enumerate(scenes):
+            for bit, tag_id in enumerate((a, b, c, d)):
+                if i & (1 << bit):
+                    connection.execute(text(
+                        "INSERT INTO scene_tags (id, scene_id, tag_id, created_at) "
+                        "VALUES (gen_random_uuid(), :scene, :tag, now())"
+                    ), {"scene": scene_id, "tag": tag_id})
+
+    filters = [([a], [], []), ([a, b], [], []), ([], [c, d], []), ([a], [b, c], [d]), ([], [], [a]), ([b], [], [b])]
+    with database.connect() as connection:
+        for and_ids, or_ids, not_ids in filters:
+            match = compile_match("scenes", TagFilter(and_ids=and_ids, or_ids=or_ids, not_ids=not_ids))
+            found = set(connection.scalars(match.where(text("scenes.id = ANY(:scenes)")), {"scenes": scenes}))
+            assert found == join_match(connection, and_ids, or_ids, not_ids, scenes), (and_ids, or_ids, not_ids)
+
+
+def execution_ms(connection, statement, params) -> float:
+    plan = connection.scalar(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {statement}"), params)
+    plan = plan if isinstance(plan, list) else json.loads(plan)
+    return plan[0]["Execution Time"]
+
+
+@pytest.mark.slow
+def test_benchmark_join_vs_array_plans(media, database):
+    """AND of two tags over BENCH_TAG_LINKS scene-tag links: association join vs tag_ids containment"""
+    names = [f"bench-{uuid.uuid4().hex[:8]}" for _ in range(20)]
+    tags = list(media(tags=names).tags.values())
+    video_id = media(videos=1).videos[0]
+    scenes = BENCH_LINKS // 4
+    with database.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO scenes (id, video_id, start_time, end_time, created_at) "
+            "SELECT gen_random_uuid(), :video, i, i + 1, now() FROM generate_series(1, :n) i"
+        ), {"video": video_id, "n": scenes})
+        # Four tags per scene, skewed so the filter tags are common but not universal
+        connection.execute(text("""
+            INSERT INTO scene_tags (id, scene_id, tag_id, created_at)
+            SELECT gen_random_uuid(), s.id, (CAST(:tags AS uuid[]))[1 + (abs(hashtext(s.id::text || k)) % 20)], now()
+            FROM scenes s, generate_series(1, 4) k
+            WHERE s.video_id = :video
+            ON CONFLICT DO NOTHING
+        """), {"video": video_id, "tags": tags})
+        connection.execute(text("ANALYZE scenes; ANALYZE scene_tags"))
+
+    params = {"and_ids": tags[:2]}
+    join = """
+        SELECT count(*) FROM (
+            SELECT st.scene_id FROM scene_tags st WHERE st.tag_id = ANY(CAST(:and_ids AS uuid[]))
+            GROUP BY st.scene_id HAVING count(DISTINCT st.tag_id) = 2
+        ) m
+    """
+    array = "SELECT count(*) FROM scenes WHERE tag_ids @> CAST(:and_ids AS uuid[])"
+    try:
+        with database.connect() as connection:
+            assert connection.scalar(text(join), params) == connection.scalar(text(array), params)
+            join_ms = min(execution_ms(connection, join, params) for _ in range(3))
+            array_ms = min(execution_ms(connection, array, params) for _ in range(3))
+        print(f"\n{BENCH_LINKS} links: join {join_ms:.1f} ms, tag_ids @> {array_ms:.1f} ms")
+    finally:
+        with database.begin() as connection:
+            connection.execute(text("DELETE FROM scene_tags WHERE tag_id = ANY(:tags)"), {"tags": tags})
+            connection.execute(text("DELETE FROM scenes WHERE video_id = :video"), {"video": video_id})
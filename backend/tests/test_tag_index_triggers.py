@@ -0,0 +1,124 @@
+import asyncio
+import json
+import uuid
+from datetime import datetime
+
+import asyncpg
+import pytest
+from sqlalchemy import text
+
+from app.services.db_events import get_listener_dsn
+from app.services.tag_bitmap_index import TAG_INDEX_TRIGGERS, TagBitmapIndex
+
+
+def create_video_with_scene(connection):
+    video_id, scene_id = uuid.uuid4(), uuid.uuid4()
+    now = datetime.utcnow()
+    connection.execute(text(
+        "INSERT INTO videos (id, filename, file_path, status, created_at, updated_at) "
+        "VALUES (:id, 'v.mp4', '/v.mp4', 'uploaded', :now, :now)"
+    ), {"id": video_id, "now": now})
+    connection.execute(text(
+        "INSERT INTO scenes (id, video_id, start_time, end_time, created_at) VALUES (:id, :video, 0, 5, :now)"
+    ), {"id": scene_id, "video": video_id, "now": now})
+    return video_id, scene_id
+
+
+def disabled_triggers(database):
+    with database.connect() as connection:
+        return connection.scalar(text(
+            "SELECT count(*) FROM pg_trigger WHERE tgname = ANY(:names) AND tgenabled = 'D'"
+        ), {"names": TAG_INDEX_TRIGGERS})
+
+
+@pytest.fixture
+def notifying(run, database):
+    """tag_index triggers enabled the way startup enables them for the bitmap index"""
+    index = TagBitmapIndex()
+    index.enabled = True
+    run(index.sync_triggers())
+    yield
+    index.enabled = False
+    run(index.sync_triggers())
+
+
+async def listen(write):
+    received = []
+    connection = await asyncpg.connect(get_listener_dsn())
+    try:
+        await connection.add_listener("tag_index", lambda *args: received.append(json.loads(args[3])))
+        await asyncio.get_running_loop().run_in_executor(None, write)
+        for _ in range(50):
+            await asyncio.sleep(0.05)
+            if received and sum(len(event["ids"]) for event in received) >= 200:
+                break
+    finally:
+        await connection.close()
+    return received
+
+
+def test_triggers_follow_the_index_setting(run, database):
+    assert disabled_triggers(database) == len(TAG_INDEX_TRIGGERS)  # Off by default
+
+    index = TagBitmapIndex()
+    index.enabled = True
+    run(index.sync_triggers())
+    assert disabled_triggers(database) == 0
+
+    index.enabled = False
+    run(index.sync_triggers())
+    assert disabled_triggers(database) == len(TAG_INDEX_TRIGGERS)
+
+
+def test_no_notifications_while_the_index_is_off(run, database):
+    def write():
+        with database.begin() as connection:
+            create_video_with_scene(connection)
+
+    assert run(listen(write)) == []
+
+
+def test_one_notification_per_chunk_of_rows(run, database, notifying):
+    tag_ids = [uuid.uuid4() for _ in range(200)]
+
+    def write():
+        with database.begin() as connection:
+            _, scene_id = create_video_with_scene(connection)
+            connection.execute(text(
+                "INSERT INTO tags (id, name, created_at) SELECT id, id::text, now() FROM unnest(CAST(:ids AS uuid[])) id"
+            ), {"ids": tag_ids})
+            connection.execute(text(
+                "INSERT INTO scene_tags (id, scene_id, tag_id, created_at) "
+                "SELECT gen_random_uuid(), :scene, id, now() FROM unnest(CAST(:ids AS uuid[])) id"
+            ), {"scene": scene_id, "ids": tag_ids})
+        write.scene_id = scene_id
+
+    events = run(listen(write))
+
+    links = [event for event in events if event["t"] == "scenes" and "tags" in event]
+    assert len(links) == 3  # 80 + 80 + 40 rows
+    assert all(event["op"] == "insert" for event in links)
+    assert {uuid.UUID(tag) for event in links for tag in event["tags"]} == set(tag_ids)
+    assert {item for event in links for item in event["ids"]} == {str(write.scene_id)}
+    entities = [event for event in events if "tags" not in event]
+    assert [(event["t"], len(event["ids"])) for event in entities] == [("videos", 1), ("scenes", 1)]
+
+
+def test_bitmap_index_applies_statement_events():
+    pytest.importorskip("pyroaring")
+    from app.services.search_compiler import TagFilter
+    from app.services.tag_bitmap_index import TagBitmapIndex, _TargetIndex
+
+    index = TagBitmapIndex(enabled=True)
+    index._targets = {"scenes": _TargetIndex()}
+    index.ready = True
+    scenes = [str(uuid.uuid4()) for _ in range(3)]
+    tag = str(uuid.uuid4())
+
+    index.handle_event({"t": "scenes", "op": "insert", "ids": scenes})
+    index.handle_event({"t": "scenes", "op": "insert", "ids": scenes, "tags": [tag] * 3})
+    index.handle_event({"t": "scenes", "op": "delete", "ids": scenes[:1], "tags": [tag]})
+    index.handle_event({"t": "scenes", "op": "delete", "ids": scenes[1:2]})
+
+    total, ids, _ = index.page("scenes", TagFilter(and_ids=[uuid.UUID(tag)]), 0, 10)
+    assert (total, ids) == (1, [uuid.UUID(scenes[2])])
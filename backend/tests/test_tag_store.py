@@ -0,0 +1,57 @@
+import asyncio
+import uuid
+from datetime import datetime
+
+from sqlalchemy import select, text
+
+from app.models.database import AsyncSessionLocal
+from app.models.tag import Tag
+from app.services.tag_store import upsert_tags, lookup_tags
+
+
+def test_upsert_creates_and_reuses_tags(run, db):
+    name = f"tag-{uuid.uuid4().hex[:8]}"
+
+    created = run(upsert_tags([name, f" {name} ", ""], db))
+    again = run(upsert_tags([name], db))
+
+    assert list(created) == [name]
+    assert again[name] == created[name]
+
+
+def test_upsert_sees_tag_committed_by_concurrent_transaction(run, database):
+    """A name another transaction commits while our INSERT waits on it must still resolve"""
+    name = f"race-{uuid.uuid4().hex[:8]}"
+    other_id = uuid.uuid4()
+
+    async def scenario():
+        async with AsyncSessionLocal() as other, AsyncSessionLocal() as db:
+            await other.execute(
+                Tag.__table__.insert().values(id=other_id, name=name, created_at=datetime.utcnow())
+            )
+            # Our statement takes its snapshot now and blocks on the uncommitted conflicting row
+            upsert = asyncio.ensure_future(upsert_tags([name, f"{name}-new"], db))
+            for _ in range(100):
+                waiting = await other.scalar(text(
+                    "SELECT count(*) FROM pg_stat_activity WHERE wait_event_type = 'Lock' AND query LIKE 'WITH inserted%'"
+                ))
+                if waiting:
+                    break
+                await asyncio.sleep(0.05)
+            await other.commit()
+            result = await upsert
+            await db.commit()
+            return result
+
+    result = run(scenario())
+
+    assert result[name] == other_id
+    assert f"{name}-new" in result
+
+
+def test_lookup_tags_skips_unknown_names(run, db):
+    name = f"tag-{uuid.uuid4().hex[:8]}"
+    tag_id = run(upsert_tags([name], db))[name]
+
+    assert run(lookup_tags([name, "no-such-tag-" + name], db)) == {name: tag_id}
+    assert run(db.scalar(select(Tag.id).where(Tag.name == name))) == tag_id
@@ -0,0 +1,95 @@
+import gc
+import random
+import time
+import uuid
+
+import pytest
+
+from app.services.tag_suggest import TagSuggestIndex, to_chosung, is_chosung_query
+
+BENCH_TAGS = 100_000
+BUDGET_MS = 10
+
+
+def index_of(tags):
+    index = TagSuggestIndex()
+    ids = {}
+    for name, usage in tags:
+        ids[name] = uuid.uuid4()
+        index.add(ids[name], name, usage)
+    index.ready = True
+    return index, ids
+
+
+def names(results):
+    return [name for _, name, _ in results]
+
+
+def test_chosung():
+    assert to_chosung("사람 dog") == "ㅅㄹ dog"
+    assert is_chosung_query("ㅅㄹ")
+    assert not is_chosung_query("사ㄹ")
+
+
+def test_prefix_infix_and_chosung_queries():
+    index, _ = index_of([("사람", 5), ("사랑", 1), ("강아지", 3), ("Street Dog", 2)])
+
+    assert names(index.suggest("사")) == ["사람", "사랑"]
+    assert names(index.suggest("아지")) == ["강아지"]
+    assert names(index.suggest("ㅅㄹ")) == ["사람", "사랑"]
+    assert names(index.suggest("ㄱㅇ")) == ["강아지"]
+    assert names(index.suggest("DOG")) == ["Street Dog"]
+    assert index.suggest("고양이") == []
+
+
+def test_exact_match_first_then_usage():
+    index, _ = index_of([("cat", 1), ("cats", 50), ("bobcat", 100)])
+
+    assert names(index.suggest("cat")) == ["cat", "bobcat", "cats"]
+    assert names(index.suggest("cat", limit=2)) == ["cat", "bobcat"]
+
+
+def test_tag_events_update_the_index():
+    index, ids = index_of([("사람", 1)])
+    created = uuid.uuid4()
+    assert names(index.suggest("ㅅ")) == ["사람"]  # Cached until the index changes
+
+    index.handle_event({"op": "create", "id": str(created), "name": "사과"})
+    index.handle_event({"op": "delete", "id": str(ids["사람"])})
+
+    assert [(tag_id, name) for tag_id, name, _ in index.suggest("ㅅ")] == [(created, "사과")]
+
+
+@pytest.mark.slow
+def test_benchmark_suggest_latency():
+    """p95 suggest latency over BENCH_TAGS mixed Hangul and Latin tags must stay within BUDGET_MS"""
+    rng = random.Random(0)
+    syllables = [chr(0xAC00 + rng.randrange(11172)) for _ in range(400)]
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    tags = set()
+    while len(tags) < BENCH_TAGS:
+        if rng.random() < 0.5:
+            tags.add("".join(rng.choices(syllables, k=rng.randint(2, 4))))
+        else:
+            tags.add("".join(rng.choices(letters, k=rng.randint(4, 10))))
+    index, _ = index_of((name, rng.randrange(1000)) for name in tags)
+
+    gc.collect()  # Collect the build garbage outside the timed loop
+    sample = rng.sample(sorted(tags), 200)
+    queries = [name[:2] for name in sample] + [name[1:3] for name in sample] + [to_chosung(name)[:2] for name in sample]
+    queries += list(letters) + syllables[:26]
+
+    def timed(query):
+        start = time.perf_counter()
+        index.suggest(query)
+        return (time.perf_counter() - start) * 1000
+
+    timings = sorted(timed(query) for query in queries)
+    p95 = timings[int(len(timings) * 0.95)]
+    cold = max(timed(letter) for letter in "ㅅㅇㄱ")
+    warm = max(timed(letter) for letter in "ㅅㅇㄱ")
+
+    print(f"\n{BENCH_TAGS} tags: p50 {timings[len(timings) // 2]:.2f} ms, p95 {p95:.2f} ms, "
+          f"single character {cold:.2f} ms cold, {warm:.2f} ms repeated")
+    assert p95 <= BUDGET_MS
+    assert warm <= BUDGET_MS
@@ -0,0 +1,79 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.models.database import AsyncSessionLocal
+from app.services.tag_store import fold_tag_usage, reconcile_tag_usage
+
+
+def create_scenes(connection, count):
+    video_id = uuid.uuid4()
+    now = datetime.utcnow()
+    connection.execute(text(
+        "INSERT INTO videos (id, filename, file_path, status, created_at, updated_at) "
+        "VALUES (:id, 'v.mp4', '/v.mp4', 'uploaded', :now, :now)"
+    ), {"id": video_id, "now": now})
+    scene_ids = [uuid.uuid4() for _ in range(count)]
+    for i, scene_id in enumerate(scene_ids):
+        connection.execute(text(
+            "INSERT INTO scenes (id, video_id, start_time, end_time, created_at) VALUES (:id, :video, :start, :end, :now)"
+        ), {"id": scene_id, "video": video_id, "start": i * 5.0, "end": i * 5.0 + 5, "now": now})
+    return scene_ids
+
+
+def link(connection, scene_id, tag_id):
+    connection.execute(text(
+        "INSERT INTO scene_tags (id, scene_id, tag_id, created_at) VALUES (gen_random_uuid(), :scene, :tag, now())"
+    ), {"scene": scene_id, "tag": tag_id})
+
+
+def scene_count(database, tag_id):
+    with database.connect() as connection:
+        return connection.scalar(text("SELECT scene_count FROM tags WHERE id = :id"), {"id": tag_id})
+
+
+async def fold():
+    async with AsyncSessionLocal() as db:
+        return await fold_tag_usage(db)
+
+
+def test_concurrent_tagging_does_not_wait_on_the_tag_row(run, database):
+    tag_id = uuid.uuid4()
+    with database.begin() as connection:
+        connection.execute(text("INSERT INTO tags (id, name, created_at) VALUES (:id, :name, now())"),
+                           {"id": tag_id, "name": f"usage-{tag_id.hex[:8]}"})
+        # Separate videos, so the writers share nothing but the tag
+        first, second = create_scenes(connection, 1) + create_scenes(connection, 1)
+
+    with database.connect() as a, database.connect() as b:
+        link(a, first, tag_id)  # Uncommitted
+        b.execute(text("SET lock_timeout = '1s'"))
+        link(b, second, tag_id)  # Would time out if the tag row were locked by a
+        a.commit()
+        b.commit()
+
+    assert scene_count(database, tag_id) == 0  # Not folded yet
+    assert run(fold()) >= 1
+    assert scene_count(database, tag_id) == 2
+
+    with database.begin() as connection:
+        connection.execute(text("DELETE FROM scene_tags WHERE scene_id = :id"), {"id": first})
+    run(fold())
+    assert scene_count(database, tag_id) == 1
+
+
+def test_reconcile_discards_deltas_it_already_counted(run, database):
+    tag_id = uuid.uuid4()
+    with database.begin() as connection:
+        connection.execute(text("INSERT INTO tags (id, name, created_at) VALUES (:id, :name, now())"),
+                           {"id": tag_id, "name": f"usage-{tag_id.hex[:8]}"})
+        link(connection, create_scenes(connection, 1)[0], tag_id)
+
+    async def reconcile():
+        async with AsyncSessionLocal() as db:
+            await reconcile_tag_usage(db)
+
+    run(reconcile())
+    run(fold())
+    assert scene_count(database, tag_id) == 1
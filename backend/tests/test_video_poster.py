@@ -0,0 +1,63 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import text
+
+
+def create_video(connection, thumbnails):
+    video_id = uuid.uuid4()
+    now = datetime.utcnow()
+    connection.execute(text(
+        "INSERT INTO videos (id, filename, file_path, status, created_at, updated_at) "
+        "VALUES (:id, 'v.mp4', '/v.mp4', 'uploaded', :now, :now)"
+    ), {"id": video_id, "now": now})
+    scene_ids = [uuid.uuid4() for _ in thumbnails]
+    for i, (scene_id, thumbnail) in enumerate(zip(scene_ids, thumbnails)):
+        connection.execute(text(
+            "INSERT INTO scenes (id, video_id, start_time, end_time, thumbnail_path, created_at) "
+            "VALUES (:id, :video, :start, :end, :thumbnail, :now)"
+        ), {"id": scene_id, "video": video_id, "start": i * 5.0, "end": i * 5.0 + 5, "thumbnail": thumbnail, "now": now})
+    return video_id, scene_ids
+
+
+def poster(connection, video_id):
+    return connection.scalar(text("SELECT poster_path FROM videos WHERE id = :id"), {"id": video_id})
+
+
+def test_poster_follows_first_scene(database):
+    with database.begin() as connection:
+        video_id, (first, second) = create_video(connection, ["/a.jpg", "/b.jpg"])
+        assert poster(connection, video_id) == "/a.jpg"
+
+        connection.execute(text("UPDATE scenes SET thumbnail_path = '/a2.jpg' WHERE id = :id"), {"id": first})
+        assert poster(connection, video_id) == "/a2.jpg"
+
+        connection.execute(text("UPDATE scenes SET start_time = 20 WHERE id = :id"), {"id": first})
+        assert poster(connection, video_id) == "/b.jpg"
+
+        connection.execute(text("DELETE FROM scenes WHERE id = :id"), {"id": second})
+        assert poster(connection, video_id) == "/a2.jpg"
+
+
+def test_moving_a_scene_refreshes_both_videos(database):
+    with database.begin() as connection:
+        source, (scene,) = create_video(connection, ["/moved.jpg"])
+        target, _ = create_video(connection, [])
+
+        connection.execute(text("UPDATE scenes SET video_id = :target WHERE id = :id"), {"target": target, "id": scene})
+
+        assert poster(connection, source) is None
+        assert poster(connection, target) == "/moved.jpg"
+
+
+def test_other_scene_updates_leave_the_video_row_alone(database):
+    with database.begin() as connection:
+        video_id, (scene,) = create_video(connection, ["/a.jpg"])
+
+    with database.connect() as holder, database.connect() as writer:
+        holder.execute(text("SELECT 1 FROM videos WHERE id = :id FOR UPDATE"), {"id": video_id})
+        writer.execute(text("SET lock_timeout = '1s'"))
+        # Would time out if the poster trigger updated the locked video
+        writer.execute(text("UPDATE scenes SET user_notes = 'note', start_time = 0 WHERE id = :id"), {"id": scene})
+        writer.commit()
+        holder.rollback()